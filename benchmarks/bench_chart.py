@@ -0,0 +1,155 @@
+"""Кадри за секунду графіка станції при перемиканні станцій і періодів (без бази даних).
+
+    python -m benchmarks.bench_chart --frames 200 --measurements 6
+
+legacy-* - як раніше: ax.clear(), побудова всіх художників заново і canvas.draw();
+bars / series - оновлення даних наявних художників і одне draw_idle на кадр;
+burst - кілька оновлень поспіль до обробки подій (зливаються в одне малювання);
+hover - рух миші з перехрестям, що малюється блітингом.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+
+class StubExecutor:
+    def __init__(self):
+        from PyQt5.QtCore import QObject, pyqtSignal
+
+        class Signals(QObject):
+            busy_changed = pyqtSignal(str, bool)
+
+        self.signals = Signals()
+        self.busy_changed = self.signals.busy_changed
+
+    def submit(self, channel, fn, *args, **kwargs):
+        pass
+
+    def cancel(self, channel):
+        pass
+
+
+def bar_results(rng, measurements):
+    values = np.sort(rng.random((measurements, 3)) * 100, axis=1)[:, [0, 2, 1]]
+    return [(f"Вимір {i}", *row) for i, row in enumerate(values.tolist())]
+
+
+def series_results(rng, measurements, points):
+    start = 1_700_000_000 + rng.integers(0, 86400 * 30)
+    x = (start + np.arange(points) * 600.0) / 86400.0
+    return [(f"Вимір {i}", x, np.cumsum(rng.standard_normal(points))) for i in range(measurements)]
+
+
+def legacy_bars(window, address, results):
+    ax = window.ax
+    ax.clear()
+    for name, min_val, max_val, avg_val in results:
+        ax.barh(f"{name}(min)", min_val, color='r')
+        ax.barh(f"{name}(max)", max_val, color='b', left=0)
+        ax.barh(f"{name}(avg)", avg_val, color='g', left=0)
+    ax.set_xlabel('Значення')
+    ax.set_ylabel('Величина вимірювання')
+    ax.set_title(f'Мінімальні, максимальні та середні значення для адреси: {address}')
+    ax.legend(['min', 'max', 'avg'])
+    ax.grid(True)
+    window.canvas.draw()
+
+
+def legacy_series(window, address, series):
+    ax = window.series_ax
+    ax.clear()
+    for name, x, y in series:
+        ax.plot(x, y, linewidth=1, label=name)
+    ax.xaxis_date()
+    ax.set_title(f'Виміри за період для адреси: {address}')
+    ax.legend()
+    ax.grid(True)
+    window.canvas.draw()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--measurements', type=int, default=6)
+    parser.add_argument('--points', type=int, default=1400, help='точок на лінію після проріджування')
+    parser.add_argument('--stations', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from matplotlib.backend_bases import MouseEvent
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+    import station_chart
+
+    window = station_chart.PowerBIApp_first_graphic(None, StubExecutor())
+    window.show()
+    app.processEvents()
+    canvas = window.canvas
+
+    draws = [0]
+    canvas.mpl_connect('draw_event', lambda event: draws.__setitem__(0, draws[0] + 1))
+
+    def settle():
+        # Обробляємо події, доки відкладене малювання не виконається
+        app.processEvents()
+        while getattr(canvas, '_draw_pending', False):
+            app.processEvents()
+
+    rng = np.random.default_rng(0)
+    bars = [bar_results(rng, args.measurements) for _ in range(args.stations)]
+    series = [series_results(rng, args.measurements, args.points) for _ in range(args.stations)]
+
+    def run(name, frame, updates_per_frame=1):
+        settle()
+        draws_before = draws[0]
+        started = time.perf_counter()
+        for i in range(args.frames):
+            frame(i)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<14} {args.frames / elapsed:8.1f} fps   "
+              f"{args.frames * updates_per_frame} updates -> {draws[0] - draws_before} draws")
+
+    def update_bars(i):
+        window.draw_chart(f"Станція {i % args.stations}", bars[i % args.stations])
+        settle()
+
+    def update_series(i):
+        window.draw_series(f"Станція {i % args.stations}", series[i % args.stations])
+        settle()
+
+    def burst(i):
+        for j in range(5):
+            window.draw_chart(f"Станція {(i + j) % args.stations}", bars[(i + j) % args.stations])
+        settle()
+
+    def hover(i):
+        bbox = window.series_ax.bbox
+        x = bbox.x0 + (i * 7) % int(bbox.width)
+        y = bbox.y0 + bbox.height * (0.2 + 0.6 * ((i * 13) % 100) / 100)
+        canvas.callbacks.process('motion_notify_event', MouseEvent('motion_notify_event', canvas, x, y))
+
+    window.show_axes(window.ax)
+    run('legacy-bars', lambda i: legacy_bars(window, f"Станція {i}", bars[i % args.stations]))
+    window.bar_labels = []
+    window.bars = None
+    window.ax.clear()
+    window.setup_axes()
+    run('bars', update_bars)
+    run('burst', burst, updates_per_frame=5)
+
+    window.show_axes(window.series_ax)
+    run('legacy-series', lambda i: legacy_series(window, f"Станція {i}", series[i % args.stations]))
+    window.lines = {}
+    window.series_ax.clear()
+    window.setup_axes()
+    window.hover.add_axes(window.series_ax, window.describe_point)
+    run('series', update_series)
+    run('hover', hover)
+
+
+if __name__ == '__main__':
+    main()
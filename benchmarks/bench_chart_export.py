@@ -0,0 +1,177 @@
+"""Розмір і час завантаження графіків: самодостатні файли Plotly проти chart_export.
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.bench_chart_export
+    python -m benchmarks.bench_chart_export --charts-per-day 200 --points 50000 --no-browser
+
+Розміри рахуються для файлів репозиторію (plotly_chart.html, plotly_scatter_chart.html)
+та для синтетичного часового ряду. Час завантаження вимірюється в QWebEngineView до
+появи готового графіка; якщо QtWebEngine недоступний, цей крок пропускається.
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from chart_export import (BUNDLE, SHARED, encode_arrays, export_chart, extract_figure, find_plotly_js,
+                          legacy_charts, series_figure)
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+LOAD_TIMEOUT = 30  # секунд
+
+
+def kb(size):
+    return f"{size / 1024:.1f}"
+
+
+def file_size(path):
+    return os.path.getsize(path)
+
+
+def assets_size(directory, gzipped=False):
+    assets = os.path.join(directory, 'assets')
+    if not os.path.isdir(assets):
+        return 0
+    return sum(os.path.getsize(os.path.join(assets, name)) for name in os.listdir(assets)
+               if name.endswith('.gz') == gzipped)
+
+
+def synthetic_series(points, measurements=3):
+    # Мітки часу раз на хвилину й значення як у датчика: тренд, добовий цикл і шум
+    rng = np.random.default_rng(1)
+    x = 1.7e12 + np.arange(points) * 60000.0
+    return [(f"Вимір {i + 1}", x, np.round(20 + 5 * np.sin(np.arange(points) / 1440 * 2 * np.pi)
+                                            + rng.normal(0, 0.5, points).cumsum() / 30, 2))
+            for i in range(measurements)]
+
+
+def legacy_series_html(figure, plotly_js):
+    # Так пише plotly.io.write_html(include_plotlyjs=True): бібліотека й дані як текст JSON
+    data = [dict(trace, x=trace['x'].tolist(), y=trace['y'].tolist()) for trace in figure['data']]
+    return (f"<html><head><meta charset=\"utf-8\" /></head><body><div><script>{plotly_js}</script>"
+            f"<div id=\"chart\"></div><script>Plotly.newPlot(\"chart\", {json.dumps(data)}, "
+            f"{json.dumps(figure['layout'])}, {json.dumps(figure['config'])})</script></div></body></html>")
+
+
+def size_rows(sources, out_dir, plotly_js):
+    rows = []
+    for name, source, figure in sources:
+        original = file_size(source)
+        variants = {}
+        for mode, gzipped in ((SHARED, False), (SHARED, True), (BUNDLE, False)):
+            target = export_chart(figure, os.path.join(out_dir, f'{mode}{"-gz" if gzipped else ""}', name + '.html'),
+                                  mode, gzipped, plotly_js, title=name)
+            variants[(mode, gzipped)] = target
+        rows.append((name, original, variants))
+    return rows
+
+
+def load_time(path, runs):
+    # Від setUrl до window.chartReady; перший прогін - з холодним кешем профілю
+    try:
+        from PyQt5.QtCore import QUrl
+        from PyQt5.QtWebEngineWidgets import QWebEngineView
+        from PyQt5.QtWidgets import QApplication
+    except ImportError as e:
+        return None, str(e)
+
+    app = QApplication.instance() or QApplication([])
+    view = QWebEngineView()
+    view.resize(1200, 700)
+    view.show()
+    times = []
+    for _ in range(runs):
+        state = {}
+        view.page().loadFinished.connect(lambda ok: state.setdefault('loaded', ok))
+        started = time.perf_counter()
+        view.setUrl(QUrl.fromLocalFile(os.path.abspath(path)))
+        while time.perf_counter() - started < LOAD_TIMEOUT:
+            app.processEvents()
+            if state.get('loaded'):
+                view.page().runJavaScript(
+                    "!!(window.chartReady || document.querySelector('.main-svg'))",
+                    lambda ready: state.__setitem__('ready', ready))
+            if state.get('ready'):
+                break
+            time.sleep(0.005)
+        else:
+            return None, 'timeout'
+        times.append(time.perf_counter() - started)
+        view.page().loadFinished.disconnect()
+    view.close()
+    return times, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--charts-per-day', type=int, default=100)
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--no-browser', action='store_true')
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp()
+    try:
+        plotly_js = find_plotly_js()
+        sources = []
+        for path in legacy_charts:
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    sources.append((os.path.splitext(os.path.basename(path))[0], path, extract_figure(f.read())))
+
+        figure = series_figure('Синтетичний ряд', synthetic_series(args.points))
+        synthetic_path = os.path.join(out_dir, 'synthetic_legacy.html')
+        with open(synthetic_path, 'w', encoding='utf-8') as f:
+            f.write(legacy_series_html(figure, plotly_js))
+        sources.append((f'synthetic_{args.points}', synthetic_path, figure))
+
+        rows = size_rows(sources, out_dir, plotly_js)
+        print(f"{'chart':<28} {'original, KB':>13} {'shared, KB':>11} {'shared.gz, KB':>14} {'bundle, KB':>11}")
+        for name, original, variants in rows:
+            print(f"{name:<28} {kb(original):>13} {kb(file_size(variants[(SHARED, False)])):>11} "
+                  f"{kb(file_size(variants[(SHARED, True)])):>14} {kb(file_size(variants[(BUNDLE, False)])):>11}")
+
+        shared_dir = os.path.join(out_dir, SHARED)
+        shared_assets = assets_size(shared_dir)
+        gz_assets = assets_size(os.path.join(out_dir, f'{SHARED}-gz'), gzipped=True)
+        print(f"\nспільні assets: {kb(shared_assets)} KB (gzip {kb(gz_assets)} KB), записуються один раз")
+
+        # Сховище за день: N графіків, схожих на файли репозиторію
+        per_chart = np.mean([original for _, original, _ in rows[:-1] or rows])
+        compact = np.mean([file_size(variants[(SHARED, False)]) for _, _, variants in rows[:-1] or rows])
+        compact_gz = np.mean([file_size(variants[(SHARED, True)]) for _, _, variants in rows[:-1] or rows])
+        n = args.charts_per_day
+        print(f"{n} графіків за день: {kb(per_chart * n)} KB -> {kb(compact * n + shared_assets)} KB "
+              f"(gzip {kb(compact_gz * n + gz_assets)} KB)")
+
+        # Числовий ряд: текст JSON проти base64 типізованих масивів
+        trace = figure['data'][0]
+        as_json = json.dumps([trace['x'].tolist(), trace['y'].tolist()]).encode()
+        typed = json.dumps(encode_arrays([trace['x'], trace['y']])).encode()
+        print(f"один ряд з {args.points} точок: JSON {kb(len(as_json))} KB, типізовані масиви {kb(len(typed))} KB "
+              f"(gzip {kb(len(gzip.compress(as_json)))} KB проти {kb(len(gzip.compress(typed)))} KB)")
+
+        if args.no_browser:
+            return
+        print(f"\nзавантаження в браузері, {args.runs} прогонів (перший - холодний):")
+        for (name, source, _), (_, _, variants) in zip(sources, rows):
+            for label, path in (('original', source), ('shared', variants[(SHARED, False)]),
+                                ('bundle', variants[(BUNDLE, False)])):
+                times, error = load_time(path, args.runs)
+                if error:
+                    print(f"час завантаження не виміряно: {error}")
+                    return
+                print(f"{name:<28} {label:<9} перший {times[0] * 1000:7.0f} мс, "
+                      f"медіана {np.median(times) * 1000:7.0f} мс")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
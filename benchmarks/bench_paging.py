@@ -0,0 +1,93 @@
+"""Час отримання сторінки з номером N: OFFSET проти KeysetPager переглядача таблиць.
+
+Потрібна база з даними; рядок підключення береться з MONITORAIR_DSN:
+    MONITORAIR_DSN="dbname=MonitorAir user=postgres" python -m benchmarks.bench_paging --table measument
+    MONITORAIR_DSN="..." python -m benchmarks.bench_paging --table measument --sort time_meas --desc
+
+keyset - прокручування: сторінка читається від останнього ключа попередньої (fetch_page з after);
+jump   - перетягування повзунка: спершу ключ рядка перед сторінкою запитом лише по ключу, потім сторінка.
+З --sort усі варіанти впорядковані за стовпчиком (як після кліку на заголовку в переглядачі),
+а також друкується план першої сторінки: без індексу за цим стовпчиком у ньому буде Sort
+усієї таблиці, з індексом - Limit над Index Scan (Backward) і перша сторінка повертається одразу.
+"""
+import argparse
+import os
+import time
+
+import psycopg2
+from psycopg2 import sql
+
+from paging import KeysetPager, suggest_indexes
+
+
+def time_offset_batch(connection, table, batch_number, batch_size, sort=None):
+    cursor = connection.cursor()
+    query = sql.SQL('SELECT * FROM {} OFFSET %s LIMIT %s').format(sql.Identifier(table))
+    if sort is not None:
+        query = sql.SQL('SELECT * FROM {} ORDER BY {}{} OFFSET %s LIMIT %s').format(
+            sql.Identifier(table), sql.Identifier(sort[0]), sql.SQL(' DESC' if sort[1] else ''))
+    started = time.perf_counter()
+    cursor.execute(query, (batch_number * batch_size, batch_size))
+    cursor.fetchall()
+    return (time.perf_counter() - started) * 1000
+
+
+def time_keyset_batches(connection, table, batch_numbers, batch_size, sort=None):
+    # Сторінки підряд, кожна від останнього ключа попередньої - як fetch_pages під час прокручування
+    pager = KeysetPager(table, sort)
+    pager.prepare(connection)
+    timings = {}
+    after = None
+    for batch_number in range(max(batch_numbers) + 1):
+        started = time.perf_counter()
+        _, rows, _, after = pager.fetch_page(connection, batch_number * batch_size, batch_size, after)
+        if batch_number in batch_numbers:
+            timings[batch_number] = (time.perf_counter() - started) * 1000
+        if not rows:
+            break
+    return pager, timings
+
+
+def time_jump(connection, pager, batch_number, batch_size):
+    # Сторінка без відомих сусідів - як після перетягування повзунка
+    started = time.perf_counter()
+    pager.fetch_page(connection, batch_number * batch_size, batch_size)
+    return (time.perf_counter() - started) * 1000
+
+
+def first_page_plan(connection, pager, batch_size):
+    query, params = pager.page_query(batch_size)
+    cursor = connection.cursor()
+    cursor.execute(sql.SQL('EXPLAIN ') + query, params)
+    return [line for line, in cursor.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--table', default='measument')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--sort', metavar='COLUMN', help='сортувати за стовпчиком')
+    parser.add_argument('--desc', action='store_true', help='за спаданням')
+    args = parser.parse_args()
+    sort = (args.sort, args.desc) if args.sort else None
+
+    connection = psycopg2.connect(os.environ.get('MONITORAIR_DSN', 'dbname=MonitorAir'))
+    pager, keyset = time_keyset_batches(connection, args.table, set(args.batches), args.batch_size, sort)
+    print(f"{args.table}: {pager.order_key}")
+    if sort is not None:
+        print('\n'.join(first_page_plan(connection, pager, args.batch_size)))
+        for hint in suggest_indexes(connection, args.table, pager.order_key, sort):
+            print(f"бракує індексу: {hint}")
+    print(f"{'batch':>6} {'OFFSET, ms':>11} {'keyset, ms':>11} {'jump, ms':>11}")
+    for batch_number in args.batches:
+        offset = time_offset_batch(connection, args.table, batch_number, args.batch_size, sort)
+        keyset_ms = keyset.get(batch_number)
+        keyset_text = f"{keyset_ms:11.2f}" if keyset_ms is not None else f"{'-':>11}"
+        jump = time_jump(connection, pager, batch_number, args.batch_size)
+        print(f"{batch_number:>6} {offset:11.2f} {keyset_text} {jump:11.2f}")
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Швидкість і пікова пам'ять експорту звіту в PDF: QTextDocument з HTML (як раніше) проти pdf_export.
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.bench_pdf --sizes 10000 100000
+    python -m benchmarks.bench_pdf --sizes 100000 --variants paged
+
+Кожен варіант виконується в окремому процесі; пікова пам'ять - це VmHWM процесу
+мінус RSS перед експортом. Рядки синтетичні й подаються порціями, як із серверного курсора.
+"""
+import argparse
+import html
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+BATCH = 2000
+HEADERS = ['Адреса', 'Статус', 'Вимір']
+
+
+def memory_kb(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def batches(size):
+    from benchmarks.synthetic import station_report_rows
+
+    for offset in range(0, size, BATCH):
+        yield station_report_rows(offset, min(BATCH, size - offset))
+
+
+def export_legacy(path, size):
+    from PyQt5.QtGui import QTextDocument
+    from PyQt5.QtPrintSupport import QPrinter
+
+    # Як PowerLikeBIApp.build_html + printToPdf: увесь звіт одним HTML-документом
+    rows = ''.join("<tr><td>{0}</td><td>{1}</td><td>{2}</td></tr>".format(
+        *(html.escape(str(value)) for value in row)) for batch in batches(size) for row in batch)
+    document = QTextDocument()
+    document.setHtml(f"<h1>Список підключених станцій</h1><table border='1'>"
+                     f"<tr>{''.join(f'<th>{h}</th>' for h in HEADERS)}</tr>{rows}</table>")
+    printer = QPrinter()
+    printer.setOutputFormat(QPrinter.PdfFormat)
+    printer.setOutputFileName(path)
+    # Розмір сторінки принтера, щоб pageCount рахував ті ж сторінки, що й друк
+    document.setPageSize(printer.pageRect(QPrinter.Point).size())
+    document.print_(printer)
+    return document.pageCount()
+
+
+def export_paged(path, size):
+    from pdf_export import pdf_writer, write_table
+
+    title = 'Список підключених станцій'
+    pages = 0
+    for _, _, pages in write_table(pdf_writer(path, title), batches(size), title, HEADERS, [5, 2, 3], size):
+        pass
+    return pages
+
+
+def run_one(variant, size):
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    app.processEvents()
+    path = os.path.join(tempfile.mkdtemp(), f'{variant}.pdf')
+    rss_before = memory_kb('VmRSS')
+    started = time.perf_counter()
+    pages = export_legacy(path, size) if variant == 'legacy' else export_paged(path, size)
+    seconds = time.perf_counter() - started
+    result = {
+        'variant': variant,
+        'rows': size,
+        'pages': pages,
+        'seconds': round(seconds, 2),
+        'pages_per_s': round(pages / seconds, 1),
+        'peak_mb': round((memory_kb('VmHWM') - rss_before) / 1024, 1),
+        'file_mb': round(os.path.getsize(path) / 2 ** 20, 1),
+    }
+    os.remove(path)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--variants', nargs='+', default=['legacy', 'paged'])
+    parser.add_argument('--one', nargs=2, metavar=('VARIANT', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.one[0], int(args.one[1]))))
+        return
+
+    print(f"{'variant':<8} {'rows':>8} {'pages':>7} {'time, s':>8} {'pages/s':>8} {'peak, MB':>9} {'file, MB':>9}")
+    for size in args.sizes:
+        for variant in args.variants:
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_pdf', '--one', variant, str(size)],
+                                    capture_output=True, text=True)
+            if output.returncode != 0:
+                print(f"{variant:<8} {size:>8} failed: {output.stderr.strip().splitlines()[-1:]}")
+                continue
+            r = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{variant:<8} {size:>8} {r['pages']:>7} {r['seconds']:>8} {r['pages_per_s']:>8} "
+                  f"{r['peak_mb']:>9} {r['file_mb']:>9}")
+
+
+if __name__ == '__main__':
+    main()
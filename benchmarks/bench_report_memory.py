@@ -0,0 +1,160 @@
+"""Пам'ять програми з усіма відкритими вікнами звітів: окремі QWebEngineView (як раніше) проти web_views.
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.bench_report_memory
+    python -m benchmarks.bench_report_memory --variants legacy --online
+
+legacy  - як до спільного профілю: кожне вікно має власний QWebEngineView у профілі
+          за замовчуванням (три сторінки Power BI і таблиця звіту; PowerLikeBIApp мав ще
+          один невикористаний переглядач). Без --online замість app.powerbi.com
+          завантажується та сама оболонка звіту, тож це нижня межа старого варіанта.
+current - усі вікна з tables_form.report_windows через ReportRegistry: звіти Qt/matplotlib
+          і один переглядач з пулу web_views.
+
+Кожен варіант виконується в окремому процесі; пам'ять - сума PSS процесу і всіх його
+нащадків (процесів QtWebEngine) після того, як сторінки завантажились.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+SETTLE_SECONDS = 5
+
+legacy_urls = [
+    "https://app.powerbi.com/groups/me/reports/9abc14ba-e6cb-4f5e-9507-6fc776b81356/ReportSection",
+    "https://app.powerbi.com/groups/me/reports/3afd1bfa-a43c-42a6-90dd-b6c284878b1e/ReportSection",
+    "https://app.powerbi.com/groups/me/reports/a202ae3c-3b0d-4c76-a8d8-71fbe0072101/ReportSectionfd2a5a13900278aa8244",
+]
+
+
+def descendants(pid):
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                # Ім'я процесу в дужках може містити пробіли, тому ділимо після ')'
+                ppid = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found = []
+    stack = [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def pss_kb(pid):
+    # PSS ділить спільні сторінки між процесами, тож суму по дереву процесів можна додавати
+    for name, field in (('smaps_rollup', 'Pss:'), ('status', 'VmRSS:')):
+        try:
+            with open(f'/proc/{pid}/{name}') as f:
+                for line in f:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+
+def settle(app, seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def open_legacy(online):
+    from PyQt5.QtCore import QUrl
+    from PyQt5.QtWebEngineWidgets import QWebEngineView
+    from PyQt5.QtWidgets import QMainWindow
+
+    from station_report import report_shell_html
+
+    windows = []
+    for url in legacy_urls + [None]:
+        window = QMainWindow()
+        view = QWebEngineView(window)
+        window.setCentralWidget(view)
+        if url and online:
+            view.load(QUrl(url))
+        else:
+            view.setHtml(report_shell_html)
+        window.resize(1200, 800)
+        window.show()
+        windows.append(window)
+    windows.append(QWebEngineView())  # PowerLikeBIApp.web_view, який ніколи не показувався
+    return windows
+
+
+def open_current():
+    from query_executor import QueryExecutor
+    from tables_form import ReportRegistry, report_windows
+
+    from benchmarks.bench_startup import OfflinePool
+
+    pool = OfflinePool()
+    registry = ReportRegistry(pool, QueryExecutor(pool))
+    for name in report_windows:
+        registry.show(name)
+    return registry
+
+
+def run_one(variant, online):
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtWidgets import QApplication
+
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    app = QApplication.instance() or QApplication([])
+    app.processEvents()
+    before = pss_kb(os.getpid())
+    keep = open_legacy(online) if variant == 'legacy' else open_current()
+    settle(app, SETTLE_SECONDS)
+    children = descendants(os.getpid())
+    own = pss_kb(os.getpid())
+    result = {
+        'variant': variant,
+        'processes': 1 + len(children),
+        'main_mb': round(own / 1024, 1),
+        'children_mb': round(sum(pss_kb(pid) for pid in children) / 1024, 1),
+        'added_mb': round((own - before + sum(pss_kb(pid) for pid in children)) / 1024, 1),
+    }
+    del keep
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--variants', nargs='+', default=['legacy', 'current'])
+    parser.add_argument('--online', action='store_true', help='завантажувати справжні сторінки Power BI')
+    parser.add_argument('--one', metavar='VARIANT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.one, args.online)))
+        return
+
+    print(f"{'variant':<8} {'processes':>9} {'main, MB':>9} {'children, MB':>13} {'added, MB':>10}")
+    for variant in args.variants:
+        command = [sys.executable, '-m', 'benchmarks.bench_report_memory', '--one', variant]
+        if args.online:
+            command.append('--online')
+        output = subprocess.run(command, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{variant:<8} failed: {output.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"{variant:<8} {r['processes']:>9} {r['main_mb']:>9} {r['children_mb']:>13} {r['added_mb']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Час від запуску процесу до інтерактивного вікна входу і до вікна таблиць.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --dsn "dbname=MonitorAir user=postgres password=..." --login postgres
+    python -m benchmarks.bench_startup --eager    # як раніше: усі вікна звітів створюються одразу
+
+Без --dsn вікно таблиць будується з пулом, який не має з'єднань (запити завершуються
+помилкою у фоні), тобто вимірюється лише побудова інтерфейсу.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('PyQt5.QtWebEngineWidgets', 'matplotlib', 'pdfkit')
+
+
+class OfflinePool:
+    maxconn = 4
+
+    def getconn(self, timeout=None):
+        import psycopg2
+        raise psycopg2.OperationalError('benchmark runs without a database')
+
+    def putconn(self, connection, discard=False):
+        pass
+
+    def stats(self):
+        return {'size': 0, 'max': self.maxconn, 'in_use': 0, 'idle': 0, 'peak_in_use': 0, 'checkouts': 0,
+                'waits': 0, 'avg_wait_ms': 0.0, 'avg_checkout_ms': 0.0, 'max_checkout_ms': 0.0, 'timeouts': 0,
+                'reconnects': 0, 'health_check_failures': 0}
+
+
+def child(process_started, args):
+    marks = {}
+
+    def mark(name):
+        marks[name] = round((time.time() - process_started) * 1000, 1)
+        marks[name + '_heavy_modules'] = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import Qt, QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    app = QApplication(sys.argv[:1])
+    import login_form
+    import tables_form
+
+    tables_form.PREWARM_REPORTS = False
+    window = login_form.AuthWindow()
+    window.show()
+
+    def login_ready():
+        mark('login_window_ms')
+        if args.dsn:
+            from db_pool import ConnectionPool
+            pool = ConnectionPool(minconn=2, maxconn=8, dsn=args.dsn)
+        else:
+            pool = OfflinePool()
+        tables_window = tables_form.TablesWindow(pool=pool, login=args.login)
+        if args.eager:
+            for name in tables_form.report_windows:
+                try:
+                    tables_window.reports.get(name)
+                except ImportError as e:
+                    marks.setdefault('errors', []).append(str(e))
+        tables_window.show()
+        window.close()
+        QTimer.singleShot(0, lambda: (mark('tables_window_ms'), app.quit()))
+
+    QTimer.singleShot(0, login_ready)
+    app.exec_()
+    print(json.dumps(marks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--dsn')
+    parser.add_argument('--login', default='postgres')
+    parser.add_argument('--eager', action='store_true')
+    parser.add_argument('--child', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args)
+        return
+
+    results = []
+    for _ in range(args.runs):
+        command = [sys.executable, '-m', 'benchmarks.bench_startup', '--login', args.login,
+                   '--child', repr(time.time())]
+        if args.dsn:
+            command += ['--dsn', args.dsn]
+        if args.eager:
+            command.append('--eager')
+        output = subprocess.run(command, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(output.stderr)
+            sys.exit(output.returncode)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    for key in ('login_window_ms', 'tables_window_ms'):
+        values = [r[key] for r in results]
+        print(f"{key:<18} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms   "
+              f"heavy modules loaded: {', '.join(results[-1][key + '_heavy_modules']) or '-'}")
+    if results[-1].get('errors'):
+        print('errors:', results[-1]['errors'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Час кадру карти станцій при зсуві й масштабуванні (без бази даних).
+
+    python -m benchmarks.bench_station_map --stations 50000 --frames 50
+
+naive - кожна станція малюється окремою позначкою, без індексу й кластерів;
+map - StationMapView: лише станції з видимих клітинок сітки, згруповані в кластери.
+Масштаби: країна (усі станції), область, місто.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Станції скупчені навколо міст, як на справжній карті
+CITY_CENTERS = [(30.52, 50.45), (24.03, 49.84), (36.23, 49.99), (30.73, 46.48), (35.05, 48.46),
+                (28.47, 49.23), (34.55, 49.59), (31.29, 51.49)]
+ZOOMS = (('country', 1.0), ('region', 16.0), ('city', 256.0))
+
+
+def station_rows(count, seed=42):
+    rng = np.random.default_rng(seed)
+    centers = np.array(CITY_CENTERS)[rng.integers(0, len(CITY_CENTERS), count)]
+    spread = rng.standard_normal((count, 2)) * [0.25, 0.15]
+    status = rng.random(count)
+    return [(f"Місто {i % 97}, Станція {i}", lon, lat, s > 0.1, s > 0.02)
+            for i, ((lon, lat), s) in enumerate(zip((centers + spread).tolist(), status.tolist()))]
+
+
+def paint_naive(view, image):
+    # Як без індексу: усі станції, кожна - окрема позначка
+    from PyQt5.QtCore import QRectF
+    from PyQt5.QtGui import QColor, QPainter
+
+    from station_map import MARKER_RADIUS, STATUS_COLORS
+
+    points = view.points
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.fillRect(image.rect(), QColor('#121212'))
+    screen_x, screen_y = view.to_screen(points.x, points.y)
+    for x, y, status in zip(screen_x.tolist(), screen_y.tolist(), points.status.tolist()):
+        painter.setBrush(QColor(STATUS_COLORS[status]))
+        painter.drawEllipse(QRectF(x - MARKER_RADIUS, y - MARKER_RADIUS, 2 * MARKER_RADIUS, 2 * MARKER_RADIUS))
+    painter.end()
+
+
+def paint_map(view, image):
+    view.render(image)
+
+
+def run(view, image, paint, frames):
+    # Кадр - зсув на 1/40 ширини вікна й повне малювання; карта ходить туди й назад
+    times = []
+    step = view.width() / 40 / view.scale
+    start_x, y = view.center
+    for frame in range(frames):
+        view.center = (start_x + step * min(frame % 20, 20 - frame % 20), y)
+        started = time.perf_counter()
+        paint(view, image)
+        times.append((time.perf_counter() - started) * 1000)
+    return float(np.median(times)), float(np.percentile(times, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stations', type=int, default=50000)
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--size', default='1200x800')
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtGui import QImage
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv)
+    from station_map import StationMapView, StationPoints
+
+    width, height = (int(v) for v in args.size.split('x'))
+    started = time.perf_counter()
+    points = StationPoints(station_rows(args.stations))
+    print(f"{args.stations} станцій, індекс за {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    view = StationMapView()
+    view.resize(width, height)
+    view.set_points(points)
+    fitted_center, fitted_scale = view.center, view.scale
+    image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    for name, zoom in ZOOMS:
+        for variant, paint in (('naive', paint_naive), ('map', paint_map)):
+            view.center, view.scale = (points.x[0], points.y[0]) if zoom > 1 else fitted_center, fitted_scale * zoom
+            median, p95 = run(view, image, paint, args.frames)
+            drawn = f"  позначок {len(view.clusters)}, станцій на екрані {view.visible}" if variant == 'map' else ''
+            print(f"{name:<8} {variant:<6} кадр: медіана {median:7.1f} мс, p95 {p95:7.1f} мс{drawn}")
+            app.processEvents()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Швидкість вивантаження таблиці: рядок за рядком через курсор проти COPY TO STDOUT.
+
+Запуск з кореня репозиторію (потрібна база):
+    python -m benchmarks.bench_table_export --dsn "dbname=MonitorAir user=postgres" --table measument
+    python -m benchmarks.bench_table_export --dsn "..." --table measument --variants copy npz
+
+rowloop - серверний курсор і csv.writer, як вивантажував би переглядач порціями;
+copy    - table_export.export_csv (COPY ... TO STDOUT);
+copy_gz - те саме з gzip;
+npz     - table_export.export_columnar у .npz.
+Кожен варіант виконується в окремому процесі; пам'ять - пік RSS процесу під час вивантаження.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def memory_kb(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def export_rowloop(connection, table, path):
+    from query_executor import stream_rows
+    from table_export import select_query
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for rows in stream_rows(connection, select_query(table), None, 2000):
+            writer.writerows(rows)
+
+
+def run_one(dsn, table, variant):
+    import psycopg2
+
+    from table_export import export_columnar, export_csv
+
+    connection = psycopg2.connect(dsn)
+    suffix = {'rowloop': '.csv', 'copy': '.csv', 'copy_gz': '.csv.gz', 'npz': '.npz'}[variant]
+    path = os.path.join(tempfile.mkdtemp(), table + suffix)
+    rss_before = memory_kb('VmRSS')
+    started = time.perf_counter()
+    if variant == 'rowloop':
+        export_rowloop(connection, table, path)
+        rows = None
+    else:
+        export = export_columnar(connection, table, path) if variant == 'npz' else export_csv(connection, table, path)
+        progress = None
+        for progress in export:
+            pass
+        rows = progress['rows'] if progress else 0
+    seconds = time.perf_counter() - started
+    size = os.path.getsize(path)
+    os.remove(path)
+    connection.close()
+    return {
+        'variant': variant,
+        'rows': rows,
+        'seconds': round(seconds, 2),
+        'mb_per_s': round(size / seconds / 2 ** 20, 1),
+        'file_mb': round(size / 2 ** 20, 1),
+        'peak_mb': round((memory_kb('VmHWM') - rss_before) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default='dbname=MonitorAir')
+    parser.add_argument('--table', default='measument')
+    parser.add_argument('--variants', nargs='+', default=['rowloop', 'copy', 'copy_gz', 'npz'])
+    parser.add_argument('--one', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.dsn, args.table, args.one)))
+        return
+
+    print(f"{'variant':<8} {'rows':>10} {'time, s':>8} {'MB/s':>7} {'file, MB':>9} {'peak, MB':>9}")
+    for variant in args.variants:
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_table_export', '--dsn', args.dsn,
+                                 '--table', args.table, '--one', variant], capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{variant:<8} failed: {output.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"{variant:<8} {str(r['rows'] or '-'):>10} {r['seconds']:>8} {r['mb_per_s']:>7} "
+              f"{r['file_mb']:>9} {r['peak_mb']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Пам'ять і прокручування: QTableWidget (старий LazyLoadTableWidget) проти PagedTableModel.
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.bench_table_model --sizes 10000 100000 1000000
+    python -m benchmarks.bench_table_model --variants paged --sizes 1000000
+
+legacy - усі рядки в QTableWidgetItem;
+paged  - PagedTableModel, як у переглядачі: розмір відомий наперед, а під час
+         прокручування читаються лише сторінки навколо видимої області
+         (RSS після прокручування всієї таблиці не залежить від її розміру).
+
+Кожен варіант виконується в окремому процесі, щоб RSS одного не впливав на інший.
+"""
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+LOAD_BATCH = 10000
+PAGE_SIZE = 200
+MAX_PAGES = 50
+
+
+def rss_bytes():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def populate_legacy(widget, fetch_batch, total_rows):
+    from PyQt5 import QtGui
+    from PyQt5.QtWidgets import QTableWidgetItem
+
+    # Той самий цикл, що був у LazyLoadTableWidget.load_more_data
+    loaded_rows = 0
+    while loaded_rows < total_rows:
+        description, data = fetch_batch(loaded_rows, LOAD_BATCH)
+        if loaded_rows == 0:
+            widget.setColumnCount(len(description))
+            widget.setHorizontalHeaderLabels([desc[0] for desc in description])
+        for row_data in data:
+            widget.insertRow(loaded_rows)
+            for col_num, col_data in enumerate(row_data):
+                item = QTableWidgetItem(str(col_data))
+                item.setFont(QtGui.QFont("Arial", 14))
+                widget.setItem(loaded_rows, col_num, item)
+            loaded_rows += 1
+
+
+def load_visible_pages(view, model):
+    # Те саме, що LazyLoadTableWidget.load_visible_pages, але синхронно і з синтетичних рядків
+    from benchmarks.synthetic import MEASUMENT_DESCRIPTION, measument_rows
+
+    first = max(view.rowAt(0), 0)
+    last = view.rowAt(view.viewport().height() - 1)
+    if last < 0:
+        last = model.rowCount() - 1
+    pages = range(max(first // PAGE_SIZE - 1, 0), min(last // PAGE_SIZE + 2, model.page_count()))
+    model.touch(pages)
+    for page in pages:
+        if page not in model.pages:
+            count = min(PAGE_SIZE, model.rowCount() - page * PAGE_SIZE)
+            model.put_page(page, MEASUMENT_DESCRIPTION, measument_rows(page * PAGE_SIZE, count))
+
+
+def populate_paged(view, total_rows):
+    from PyQt5 import QtGui
+    from table_model import PagedTableModel
+
+    view.setFont(QtGui.QFont("Arial", 14))
+    model = PagedTableModel(PAGE_SIZE, MAX_PAGES, parent=view)
+    view.setModel(model)
+    model.set_estimate(total_rows, True)
+    load_visible_pages(view, model)
+    return model
+
+
+def scroll_through(view, app, pages, on_scroll=None):
+    scrollbar = view.verticalScrollBar()
+    step = max(1, scrollbar.maximum() // pages)
+    started = time.perf_counter()
+    for value in range(0, scrollbar.maximum() + 1, step):
+        scrollbar.setValue(value)
+        if on_scroll is not None:
+            on_scroll()
+        view.viewport().repaint()
+        app.processEvents()
+    return (time.perf_counter() - started) / pages * 1000
+
+
+def run_one(variant, size, pages):
+    from PyQt5.QtWidgets import QApplication, QTableView, QTableWidget
+    from benchmarks.synthetic import measument_fetcher
+
+    app = QApplication.instance() or QApplication([])
+    fetch_batch = measument_fetcher(size)
+    view = QTableWidget() if variant == 'legacy' else QTableView()
+    view.resize(1000, 800)
+    view.show()
+    app.processEvents()
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    on_scroll = None
+    if variant == 'legacy':
+        populate_legacy(view, fetch_batch, size)
+    else:
+        model = populate_paged(view, size)
+        on_scroll = functools.partial(load_visible_pages, view, model)
+    app.processEvents()
+    load_seconds = time.perf_counter() - started
+    rss_after = rss_bytes()
+    scroll_ms = scroll_through(view, app, pages, on_scroll)
+
+    return {
+        'variant': variant,
+        'rows': size,
+        'load_s': round(load_seconds, 3),
+        'memory_mb': round((rss_after - rss_before) / 2 ** 20, 1),
+        'bytes_per_cell': round((rss_after - rss_before) / (size * 5), 1),
+        'scroll_ms_per_page': round(scroll_ms, 2),
+        'scrolled_mb': round((rss_bytes() - rss_before) / 2 ** 20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--variants', nargs='+', default=['legacy', 'paged'])
+    parser.add_argument('--pages', type=int, default=200, help='скільки сторінок прокрутити')
+    parser.add_argument('--one', nargs=2, metavar=('VARIANT', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.one[0], int(args.one[1]), args.pages)))
+        return
+
+    print(f"{'variant':<8} {'rows':>9} {'load, s':>9} {'RSS, MB':>9} {'B/cell':>8} {'scroll, ms/page':>16} "
+          f"{'after scroll, MB':>17}")
+    for size in args.sizes:
+        for variant in args.variants:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_table_model', '--one', variant, str(size),
+                 '--pages', str(args.pages)],
+                capture_output=True, text=True)
+            if output.returncode != 0:
+                print(f"{variant:<8} {size:>9} failed: {output.stderr.strip().splitlines()[-1:]}")
+                continue
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{variant:<8} {size:>9} {result['load_s']:>9} {result['memory_mb']:>9} "
+                  f"{result['bytes_per_cell']:>8} {result['scroll_ms_per_page']:>16} {result['scrolled_mb']:>17}")
+
+
+if __name__ == '__main__':
+    main()
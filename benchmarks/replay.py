@@ -0,0 +1,250 @@
+"""Запис і відтворення відповідей PostgreSQL для бенчмарків без бази даних.
+
+recording_pool - звичайний пул, з'єднання якого виконують кожен запит у базі
+і зберігають опис стовпчиків і рядки (у тому порядку, в якому їх прочитала програма).
+ReplayPool віддає ті самі відповіді без сервера, тож набір бенчмарків можна
+запускати на машині без PostgreSQL і порівнювати лише час самої програми
+(Qt, matplotlib, PDF). Запит, якого немає в записі, завершується помилкою
+ReplayMiss - так видно, що запис застарів і його треба перезаписати.
+
+    recording = Recording()
+    pool = recording_pool(recording, minconn=1, maxconn=4, dsn=dsn)
+    ...
+    recording.save('benchmarks/recorded.pickle.gz')
+
+    pool = ReplayPool.load('benchmarks/recorded.pickle.gz')
+"""
+import gzip
+import pickle
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+import psycopg2
+from psycopg2 import sql
+
+from query_cache import normalize_sql
+
+
+class ReplayMiss(psycopg2.OperationalError):
+    pass
+
+
+def render(query):
+    # Текст запиту для ключа запису; sql.Composed.as_string потребує справжнього з'єднання
+    if isinstance(query, sql.Composed):
+        return ''.join(render(part) for part in query.seq)
+    if isinstance(query, sql.SQL):
+        return query.string
+    if isinstance(query, sql.Identifier):
+        return '.'.join('"' + name.replace('"', '""') + '"' for name in query.strings)
+    if isinstance(query, sql.Literal):
+        return repr(query.wrapped)
+    if isinstance(query, sql.Placeholder):
+        return f"%({query.name})s" if query.name else '%s'
+    return str(query)
+
+
+def query_key(query, params):
+    return normalize_sql(render(query)), repr(params)
+
+
+class Recording:
+    # {ключ: [(description, rows), ...]} - повторні виконання того самого запиту
+    # відтворюються по черзі, останнє - скільки завгодно разів
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else {}
+        self.lock = threading.Lock()
+        self.served = {}
+
+    def add(self, key, entry):
+        # entry - [description, rows]; курсор дописує в нього рядки, поки їх читає
+        with self.lock:
+            self.entries.setdefault(key, []).append(entry)
+
+    def next(self, key):
+        with self.lock:
+            results = self.entries.get(key)
+            if not results:
+                raise ReplayMiss(f'query was not recorded: {key[0][:200]}')
+            index = self.served.get(key, 0)
+            self.served[key] = index + 1
+            return results[min(index, len(results) - 1)]
+
+    def rewind(self):
+        with self.lock:
+            self.served = {}
+
+    def save(self, path):
+        with gzip.open(path, 'wb') as file:
+            pickle.dump(self.entries, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rb') as file:
+            return cls(pickle.load(file))
+
+
+class RecordingCursor(psycopg2.extensions.cursor):
+    # Справжній курсор psycopg2 (sql.Composed.as_string з його з'єднанням працює як звичайно),
+    # який дописує в запис усе, що прочитала програма. Записуються самі запити, а не
+    # PREPARE/EXECUTE (data_access.execute_prepared): те, на якому з'єднанні запит уже
+    # підготовлено, залежить від того, яке з'єднання видав пул, і при відтворенні інше
+    prepared_statements = False
+
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        # У іменованого курсора опис стовпчиків з'являється лише після першого читання
+        self.entry = [self.description and tuple(tuple(c) for c in self.description), []]
+        self.connection.recording.add(query_key(query, params), self.entry)
+
+    def _fetched(self, rows):
+        if self.entry[0] is None and self.description is not None:
+            self.entry[0] = tuple(tuple(c) for c in self.description)
+        self.entry[1].extend(rows)
+        return rows
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._fetched([] if row is None else [row])
+        return row
+
+    def fetchmany(self, size=None):
+        return self._fetched(super().fetchmany() if size is None else super().fetchmany(size))
+
+    def fetchall(self):
+        return self._fetched(super().fetchall())
+
+
+class RecordingConnection(psycopg2.extensions.connection):
+    def __init__(self, dsn, *args, recording=None, **kwargs):
+        super().__init__(dsn, *args, **kwargs)
+        self.recording = recording
+        self.cursor_factory = RecordingCursor
+
+
+def recording_pool(recording, **pool_kwargs):
+    # db_pool.ConnectionPool, з'єднання якого записують відповіді в recording
+    from db_pool import ConnectionPool
+
+    return ConnectionPool(connection_factory=partial(RecordingConnection, recording=recording), **pool_kwargs)
+
+
+class ReplayCursor:
+    prepared_statements = False
+
+    def __init__(self, recording, name=None):
+        self.recording = recording
+        self.name = name
+        self.itersize = 2000
+        self.arraysize = 1
+        self.description = None
+        self.rows = []
+        self.position = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def rowcount(self):
+        return len(self.rows)
+
+    def execute(self, query, params=None):
+        self.description, self.rows = self.recording.next(query_key(query, params))
+        self.position = 0
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self.closed = True
+
+
+class _Info:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class ReplayConnection:
+    def __init__(self, recording):
+        self.recording = recording
+        self.closed = 0
+        self.autocommit = False
+        self.info = _Info()
+
+    def cursor(self, name=None):
+        return ReplayCursor(self.recording, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class ReplayPool:
+    # Замість з'єднань з базою - курсори, що читають із запису
+    maxconn = 4
+    connect_kwargs = {}
+
+    def __init__(self, recording):
+        self.recording = recording
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    @classmethod
+    def load(cls, path):
+        return cls(Recording.load(path))
+
+    def getconn(self, timeout=None):
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return ReplayConnection(self.recording)
+
+    def putconn(self, connection, discard=False):
+        with self.lock:
+            self.in_use -= 1
+
+    @contextmanager
+    def connection(self, timeout=None):
+        connection = self.getconn(timeout)
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    def closeall(self):
+        pass
+
+    def stats(self):
+        with self.lock:
+            return {'size': self.maxconn, 'max': self.maxconn, 'in_use': self.in_use,
+                    'idle': self.maxconn - self.in_use, 'peak_in_use': self.peak_in_use,
+                    'checkouts': self.checkouts, 'waits': 0, 'avg_wait_ms': 0.0, 'avg_checkout_ms': 0.0,
+                    'max_checkout_ms': 0.0, 'timeouts': 0, 'reconnects': 0, 'health_check_failures': 0}
@@ -0,0 +1,184 @@
+"""Синтетична база MonitorAir для бенчмарків: station, measument і представлення звітів.
+
+Створює в ПОРОЖНІЙ базі мінімальну схему, яку читають переглядач таблиць, звіти,
+графік і карта станцій, і заповнює її на боці сервера (generate_series, без передачі
+рядків по мережі), тож мільйони вимірювань з'являються за секунди. Значення детерміновані
+(setseed), тому записи відповідей (benchmarks.replay) з різних машин порівнянні.
+
+    createdb monitorair_bench
+    python -m benchmarks.seed --dsn "dbname=monitorair_bench" --scale medium
+    python -m benchmarks.seed --dsn "..." --stations 2000 --measurements 20000000 --drop --rollups
+
+Масштаби (станцій / вимірювань): small 50 / 100 тис., medium 500 / 1 млн, large 5000 / 10 млн.
+Вимірювання рівномірно розподілені по PERIOD_DAYS днях до SEED_END, по кожній
+станції - усі MEASURED_UNITS по черзі.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from benchmarks.synthetic import KYIV, MEASURED_UNITS
+
+SCALES = {
+    'small': (50, 100000),
+    'medium': (500, 1000000),
+    'large': (5000, 10000000),
+}
+SEED_END = datetime(2024, 1, 1, tzinfo=KYIV)
+PERIOD_DAYS = 90
+CITIES = ['Київ', 'Львів', 'Харків', 'Одеса', 'Дніпро', 'Вінниця', 'Полтава', 'Чернігів']
+CITY_COORDINATES = [(30.52, 50.45), (24.03, 49.84), (36.23, 49.99), (30.73, 46.48), (35.05, 48.46),
+                    (28.47, 49.23), (34.55, 49.59), (31.29, 51.49)]   # (довгота, широта)
+SERVERS = 4
+
+TABLES = ('measument', 'coordinates', 'mqtt_message_unit', 'station', 'measured_unit', 'mqtt_server')
+
+schema_sql = """
+CREATE TABLE mqtt_server (
+    id_server serial PRIMARY KEY,
+    url text NOT NULL,
+    server_status boolean NOT NULL DEFAULT true
+);
+CREATE TABLE measured_unit (
+    id_measured_unit serial PRIMARY KEY,
+    title text NOT NULL UNIQUE,
+    unit text
+);
+CREATE TABLE station (
+    id_station serial PRIMARY KEY,
+    city text NOT NULL,
+    name_station text NOT NULL,
+    status_station boolean NOT NULL DEFAULT true,
+    id_saveecobot text UNIQUE,
+    id_server integer REFERENCES mqtt_server
+);
+CREATE TABLE coordinates (
+    id_station integer PRIMARY KEY REFERENCES station,
+    longitude double precision NOT NULL,
+    latitude double precision NOT NULL
+);
+CREATE TABLE mqtt_message_unit (
+    id_server integer NOT NULL REFERENCES mqtt_server,
+    order_mqtt_unit integer NOT NULL,
+    measured_unit text NOT NULL,
+    PRIMARY KEY (id_server, order_mqtt_unit)
+);
+CREATE TABLE measument (
+    id_measument bigserial PRIMARY KEY,
+    id_station integer NOT NULL REFERENCES station,
+    time_meas timestamptz NOT NULL,
+    measured_unit varchar(50) NOT NULL,
+    value_meas double precision
+);
+
+CREATE VIEW measument_view AS
+    SELECT m.id_measument, s.city, s.name_station, m.time_meas, m.measured_unit, m.value_meas
+    FROM measument m JOIN station s USING (id_station);
+CREATE VIEW mqtt_message_unit_view AS
+    SELECT s.url, u.order_mqtt_unit, u.measured_unit
+    FROM mqtt_message_unit u JOIN mqtt_server s USING (id_server);
+CREATE VIEW station_measurment_time_view AS
+    SELECT s.city || ', ' || s.name_station AS "Адреса", m.time_meas AS "Дата",
+           m.measured_unit AS "Вимір", m.value_meas AS "Величина"
+    FROM measument m JOIN station s USING (id_station);
+CREATE VIEW connected_stations_without_dublicate AS
+    SELECT DISTINCT s.city || ', ' || s.name_station AS "Адреса",
+           CASE WHEN s.status_station THEN 'Підключена' ELSE 'Відключена' END AS "Статус",
+           u.measured_unit AS "Вимір"
+    FROM station s JOIN mqtt_message_unit u USING (id_server);
+"""
+
+data_sql = """
+SELECT setseed(0.42);
+INSERT INTO mqtt_server (url)
+    SELECT 'mqtt://broker' || i || '.monitorair.test:1883' FROM generate_series(1, %(servers)s) AS i;
+INSERT INTO measured_unit (title, unit)
+    SELECT title, NULL FROM unnest(%(units)s::text[]) AS title;
+INSERT INTO mqtt_message_unit (id_server, order_mqtt_unit, measured_unit)
+    SELECT s, u.ord, u.title FROM generate_series(1, %(servers)s) AS s,
+        unnest(%(units)s::text[]) WITH ORDINALITY AS u(title, ord);
+INSERT INTO station (city, name_station, status_station, id_saveecobot, id_server)
+    SELECT (%(cities)s::text[])[1 + i %% array_length(%(cities)s::text[], 1)],
+           'Станція ' || i, i %% 7 <> 0, 'SAVEDNIPRO_' || i, 1 + i %% %(servers)s
+    FROM generate_series(1, %(stations)s) AS i;
+-- Станції скупчені навколо міст (у межах ~0.3°), як на карті станцій
+INSERT INTO coordinates (id_station, longitude, latitude)
+    SELECT s.id_station, c.longitude + (random() - 0.5) * 0.6, c.latitude + (random() - 0.5) * 0.4
+    FROM station s
+    JOIN unnest(%(cities)s::text[], %(longitudes)s::float8[], %(latitudes)s::float8[]) AS c(city, longitude, latitude)
+        USING (city);
+-- Рядок i: станція i mod stations, вимір по черзі, час рівномірно до SEED_END
+INSERT INTO measument (id_station, time_meas, measured_unit, value_meas)
+    SELECT 1 + i %% %(stations)s,
+           %(end)s - (%(measurements)s - i) * %(step)s,
+           (%(units)s::text[])[1 + (i / %(stations)s) %% array_length(%(units)s::text[], 1)],
+           round((random() * 120)::numeric, 2)::float8
+    FROM generate_series(1, %(measurements)s) AS i;
+CREATE INDEX measument_station_time ON measument (id_station, time_meas);
+"""
+
+
+def existing_tables(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename = ANY(%s)",
+                   (list(TABLES),))
+    return [name for name, in cursor.fetchall()]
+
+
+def drop_schema(connection):
+    cursor = connection.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {', '.join(TABLES)} CASCADE")
+
+
+def seed(connection, stations, measurements):
+    step = timedelta(days=PERIOD_DAYS) / measurements
+    cursor = connection.cursor()
+    cursor.execute(schema_sql)
+    cursor.execute(data_sql, {
+        'servers': SERVERS, 'units': MEASURED_UNITS, 'cities': CITIES, 'stations': stations,
+        'longitudes': [c[0] for c in CITY_COORDINATES], 'latitudes': [c[1] for c in CITY_COORDINATES],
+        'measurements': measurements, 'end': SEED_END, 'step': step,
+    })
+    connection.commit()
+    # Статистика для планувальника й reltuples, з якого переглядач бере розмір таблиці
+    connection.autocommit = True
+    cursor.execute('VACUUM ANALYZE')
+    connection.autocommit = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', required=True)
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--stations', type=int)
+    parser.add_argument('--measurements', type=int)
+    parser.add_argument('--drop', action='store_true', help='видалити таблиці, створені попереднім запуском')
+    parser.add_argument('--rollups', action='store_true', help='також створити й заповнити агрегати rollups.py')
+    args = parser.parse_args()
+    stations, measurements = SCALES[args.scale]
+    stations = args.stations or stations
+    measurements = args.measurements or measurements
+
+    connection = psycopg2.connect(args.dsn)
+    existing = existing_tables(connection)
+    if existing and not args.drop:
+        parser.error(f"у базі вже є {', '.join(existing)}; для повторного заповнення додайте --drop")
+    started = time.perf_counter()
+    if existing:
+        drop_schema(connection)
+    seed(connection, stations, measurements)
+    print(f"{stations} станцій, {measurements} вимірювань за {time.perf_counter() - started:.1f} s")
+    if args.rollups:
+        from rollups import create_rollups, refresh_rollups
+
+        started = time.perf_counter()
+        create_rollups(connection)
+        refresh_rollups(connection, full=True)
+        print(f"агрегати за {time.perf_counter() - started:.1f} s")
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
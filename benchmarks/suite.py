@@ -0,0 +1,424 @@
+"""Набір бенчмарків гарячих шляхів програми: headless Qt (offscreen), результат у JSON.
+
+Вимірюється те, що бачить користувач, - від дії до показаних даних:
+    table_switch  - вибір таблиці у TablesWindow (on_combobox_change) до показаних сторінок;
+    table_pages   - сторінки LazyLoadTableWidget: прокручування на екран униз і стрибки повзунком;
+    report_build  - побудова звіту PowerLikeBIApp (усі рядки в таблиці звіту; потрібен QtWebEngine);
+    pdf_export    - експорт того ж звіту в PDF (pdf_export.export_pdf);
+    chart_bars    - графік PowerBIApp_first_graphic (мін/макс/середнє) за період, без кешу і з кешем;
+    chart_series  - часовий ряд того ж графіка.
+
+Дані - синтетична база з benchmarks.seed або запис відповідей (benchmarks.replay), з яким
+набір працює без PostgreSQL і вимірює лише час самої програми:
+
+    python -m benchmarks.seed --dsn "dbname=monitorair_bench" --scale medium
+    python -m benchmarks.suite --dsn "dbname=monitorair_bench" --out results/medium.json
+    python -m benchmarks.suite --dsn "dbname=monitorair_bench" --record benchmarks/medium.pickle.gz
+    python -m benchmarks.suite --replay benchmarks/medium.pickle.gz --baseline results/medium.json
+    python -m benchmarks.suite --compare results/before.json results/after.json
+
+З --baseline (або --compare) метрики, медіана яких зросла більше ніж на --threshold
+(і більше ніж на NOISE_MS), позначаються як регресії, а код виходу стає 1.
+Час очікування в циклі подій має роздільність близько мілісекунди; у table_* входить
+і затримка PAGE_DELAY_MS, з якою переглядач починає читати сторінки.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+TIMEOUT = 120  # секунд на одну дію
+NOISE_MS = 2.0
+CHART_DAYS = 30
+TABLES = ('station', 'measument_view', 'mqtt_server', 'mqtt_message_unit_view')
+SCROLL_PAGES = 20
+JUMPS = (0.25, 0.5, 0.75, 1.0)
+
+# Як station_report.report_sql_query; сам модуль station_report імпортує QtWebEngine
+REPORT_QUERY = "SELECT * FROM connected_stations_without_dublicate"
+REPORT_TITLE = 'Список підключених станцій'
+REPORT_HEADERS = ['Адреса', 'Статус', 'Вимір']
+REPORT_COLUMN_WIDTHS = [5, 2, 3]
+
+
+class Skipped(Exception):
+    pass
+
+
+def wait_until(predicate, timeout=TIMEOUT):
+    from PyQt5.QtCore import QEventLoop
+    from PyQt5.QtWidgets import QApplication
+
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f'no result after {timeout} s')
+        QApplication.processEvents(QEventLoop.AllEvents, 20)
+        time.sleep(0.0005)
+
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+class Context:
+    def __init__(self, pool, end):
+        from query_executor import QueryExecutor
+
+        self.pool = pool
+        self.executor = QueryExecutor(pool)
+        self.end = end
+        self.errors = []
+
+    def on_error(self, error):
+        self.errors.append(error)
+
+    def check_errors(self):
+        if self.errors:
+            error, self.errors = self.errors[0], []
+            raise RuntimeError(f'query failed: {error}')
+
+
+def open_tables_window(context):
+    import tables_form
+
+    # access_tables - переглядач без кнопок звітів і без їх фонового імпорту
+    window = tables_form.TablesWindow(pool=context.pool, login='access_tables')
+    window.setGeometry(0, 0, 1000, 800)
+    window.show()
+    wait_until(lambda: window.table_combobox.count() > 0)
+    widget = window.table_widget
+    widget.index_hints_changed.connect(
+        lambda text: context.on_error(text) if text.startswith('Помилка') else None)
+    return window
+
+
+def table_settled(widget):
+    # Розмір відомий, видимі сторінки прочитані й нових запитів не заплановано
+    executor = widget.executor
+    return (widget.pager is not None and not executor.is_busy('table') and not executor.is_busy('table_count')
+            and not widget.page_timer.isActive()
+            and all(page in widget.table_model.pages for page in widget.visible_pages()))
+
+
+def select_table(context, window, table):
+    from tables_form import table_translation_dict, table_view_translation_dict
+
+    title = table_view_translation_dict.get(table) or table_translation_dict.get(table)
+    index = window.table_combobox.findText(title)
+    if index < 0:
+        raise Skipped(f'table {table} is not in the database')
+    widget = window.table_widget
+    started = time.perf_counter()
+    if index == window.table_combobox.currentIndex():
+        window.on_combobox_change()
+    else:
+        window.table_combobox.setCurrentIndex(index)
+    wait_until(lambda: 0 in widget.table_model.pages or table_settled(widget) or context.errors)
+    first_page = elapsed_ms(started)
+    wait_until(lambda: table_settled(widget) or context.errors)
+    context.check_errors()
+    return first_page, elapsed_ms(started)
+
+
+def case_table_switch(context, runs):
+    window = open_tables_window(context)
+    results = []
+    for _ in range(runs):
+        metrics = {}
+        for table in TABLES:
+            try:
+                _, metrics[f'{table}_ms'] = select_table(context, window, table)
+            except Skipped:
+                continue
+        results.append(metrics)
+    window.close()
+    return results
+
+
+def case_table_pages(context, runs):
+    window = open_tables_window(context)
+    widget = window.table_widget
+    scrollbar = widget.verticalScrollBar()
+    results = []
+    for _ in range(runs):
+        first_page_ms, settled_ms = select_table(context, window, 'measument_view')
+        started = time.perf_counter()
+        for _ in range(SCROLL_PAGES):
+            scrollbar.setValue(scrollbar.value() + scrollbar.pageStep())
+            wait_until(lambda: table_settled(widget) or context.errors)
+        scroll_ms = elapsed_ms(started) / SCROLL_PAGES
+        jump_times = []
+        for fraction in JUMPS:
+            started = time.perf_counter()
+            scrollbar.setValue(int(scrollbar.maximum() * fraction))
+            wait_until(lambda: table_settled(widget) or context.errors)
+            jump_times.append(elapsed_ms(started))
+        context.check_errors()
+        results.append({'first_page_ms': first_page_ms, 'settled_ms': settled_ms, 'scroll_page_ms': scroll_ms,
+                        'jump_ms': statistics.mean(jump_times), 'rows': widget.table_model.rowCount()})
+    window.close()
+    return results
+
+
+def case_report_build(context, runs):
+    try:
+        from station_report import PowerLikeBIApp
+    except ImportError as e:
+        raise Skipped(f'QtWebEngine is not available: {e}')
+    results = []
+    for _ in range(runs):
+        window = PowerLikeBIApp(context.pool, context.executor)
+        window.resize(1000, 800)
+        shown = []
+        started = time.perf_counter()
+        window.show()
+        wait_until(lambda: window.page_loaded and not context.executor.is_busy('report'))
+        # Виклики JavaScript виконуються по черзі, тож відповідь приходить після всіх appendRows
+        window.report_view.page().runJavaScript('Report.rows.length', shown.append)
+        wait_until(lambda: shown)
+        results.append({'ms': elapsed_ms(started), 'rows': shown[0]})
+        window.close()
+        window.deleteLater()
+    return results
+
+
+def case_pdf_export(context, runs):
+    from pdf_export import export_pdf
+
+    path = os.path.join(tempfile.mkdtemp(), 'report.pdf')
+    results = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = pages = 0
+        with context.pool.connection() as connection:
+            for rows, _, pages in export_pdf(connection, path, REPORT_QUERY, None, REPORT_TITLE, REPORT_HEADERS,
+                                             REPORT_COLUMN_WIDTHS):
+                pass
+        results.append({'ms': elapsed_ms(started), 'rows': rows, 'pages': pages})
+        os.remove(path)
+    return results
+
+
+def open_chart_window(context, mode):
+    from PyQt5.QtCore import QDate
+
+    from station_chart import PowerBIApp_first_graphic
+
+    window = PowerBIApp_first_graphic(context.pool, context.executor)
+    window.show()
+    wait_until(lambda: window.comboBox.count() > 0)
+    end = QDate(context.end.year, context.end.month, context.end.day)
+    window.end_date_edit.setDate(end)
+    window.start_date_edit.setDate(end.addDays(-CHART_DAYS))
+    window.mode_combobox.setCurrentText(mode)
+    draws = []
+    window.canvas.mpl_connect('draw_event', draws.append)
+    return window, draws
+
+
+def show_chart(window, draws, executor):
+    started = time.perf_counter()
+    drawn = len(draws)
+    window.handle_combobox_change()
+    wait_until(lambda: not executor.is_busy('chart'))
+    try:
+        # Малювання (draw_idle) відбувається в наступній ітерації циклу подій після результату
+        wait_until(lambda: len(draws) > drawn, timeout=5)
+    except TimeoutError:
+        raise RuntimeError('chart was not drawn - the query failed?')
+    return elapsed_ms(started)
+
+
+def case_chart_bars(context, runs):
+    from query_cache import query_cache
+    from station_chart import BARS_MODE
+
+    window, draws = open_chart_window(context, BARS_MODE)
+    results = []
+    for _ in range(runs):
+        query_cache.invalidate()
+        ms = show_chart(window, draws, context.executor)
+        results.append({'ms': ms, 'cached_ms': show_chart(window, draws, context.executor)})
+    window.close()
+    return results
+
+
+def case_chart_series(context, runs):
+    from station_chart import SERIES_MODE
+
+    window, draws = open_chart_window(context, SERIES_MODE)
+    results = [{'ms': show_chart(window, draws, context.executor)} for _ in range(runs)]
+    window.close()
+    return results
+
+
+CASES = {
+    'table_switch': case_table_switch,
+    'table_pages': case_table_pages,
+    'report_build': case_report_build,
+    'pdf_export': case_pdf_export,
+    'chart_bars': case_chart_bars,
+    'chart_series': case_chart_series,
+}
+
+
+def summarize(runs):
+    # {метрика: {median, min, max, runs}}; метрики *_ms порівнюються з базовими
+    summary = {}
+    for name in runs[0]:
+        values = [run[name] for run in runs if name in run]
+        summary[name] = {'median': statistics.median(values), 'min': min(values), 'max': max(values),
+                         'runs': values}
+    return summary
+
+
+def git_revision():
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return output.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(pool, source, names, repeat, warmup, end):
+    from PyQt5.QtCore import QT_VERSION_STR
+
+    context = Context(pool, end)
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'repeat': repeat,
+        'cases': {},
+    }
+    for name in names:
+        started = time.perf_counter()
+        try:
+            runs = CASES[name](context, warmup + repeat)[warmup:]
+            results['cases'][name] = summarize(runs)
+            status = f"{time.perf_counter() - started:.1f} s"
+        except Skipped as e:
+            results['cases'][name] = {'skipped': str(e)}
+            status = f"skipped: {e}"
+        except Exception as e:
+            results['cases'][name] = {'error': f"{type(e).__name__}: {e}"}
+            status = f"error: {e}"
+        context.executor.cancel_all()
+        print(f"{name:<14} {status}", file=sys.stderr)
+    return results
+
+
+def compare(baseline, results, threshold):
+    # -> (рядки таблиці, кількість регресій)
+    lines = [f"{'case':<14} {'metric':<28} {'before, ms':>11} {'after, ms':>11} {'change':>8}"]
+    regressions = 0
+    for case, metrics in results['cases'].items():
+        before_metrics = baseline['cases'].get(case, {})
+        for metric, value in metrics.items():
+            before = before_metrics.get(metric)
+            if not metric.endswith('ms') or not isinstance(value, dict) or not isinstance(before, dict):
+                continue
+            old, new = before['median'], value['median']
+            change = (new - old) / old if old else 0.0
+            flag = ''
+            if change > threshold and new - old > NOISE_MS:
+                flag = '  REGRESSION'
+                regressions += 1
+            elif change < -threshold and old - new > NOISE_MS:
+                flag = '  faster'
+            lines.append(f"{case:<14} {metric:<28} {old:>11.1f} {new:>11.1f} {change:>+8.0%}{flag}")
+    return lines, regressions
+
+
+def print_results(results):
+    for case, metrics in results['cases'].items():
+        if 'skipped' in metrics or 'error' in metrics:
+            print(f"{case:<14} {metrics.get('skipped') or metrics.get('error')}")
+            continue
+        for metric, value in metrics.items():
+            print(f"{case:<14} {metric:<28} median {value['median']:>10.1f}   "
+                  f"min {value['min']:>10.1f}   max {value['max']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--dsn', help='база, заповнена benchmarks.seed')
+    source.add_argument('--replay', metavar='FILE', help='відповіді, записані з --record')
+    source.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='лише порівняти два результати')
+    parser.add_argument('--record', metavar='FILE', help='з --dsn: записати відповіді бази для --replay')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--end', type=lambda text: datetime.strptime(text, '%Y-%m-%d').date(),
+                        help='останній день періоду графіків (за замовчуванням - кінець даних benchmarks.seed)')
+    parser.add_argument('--out', metavar='FILE', help='зберегти результат у JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='попередній результат для порівняння')
+    parser.add_argument('--threshold', type=float, default=0.2, help='допустиме уповільнення медіани, частка')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            lines, regressions = compare(json.load(before), json.load(after), args.threshold)
+        print('\n'.join(lines))
+        sys.exit(1 if regressions else 0)
+    if not (args.dsn or args.replay):
+        parser.error('потрібен --dsn або --replay')
+    if args.record and not args.dsn:
+        parser.error('--record працює лише з --dsn')
+
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtWidgets import QApplication
+    try:
+        # QtWebEngine має бути імпортований до створення QApplication
+        importlib.import_module('PyQt5.QtWebEngineWidgets')
+    except ImportError:
+        pass
+    from benchmarks.replay import Recording, ReplayPool, recording_pool
+    from benchmarks.seed import SEED_END
+
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    app = QApplication(sys.argv[:1])
+    recording = None
+    if args.replay:
+        pool, source = ReplayPool.load(args.replay), f'replay:{os.path.basename(args.replay)}'
+    elif args.record:
+        recording = Recording()
+        pool, source = recording_pool(recording, minconn=1, maxconn=8, dsn=args.dsn), 'postgres'
+    else:
+        from db_pool import ConnectionPool
+
+        pool, source = ConnectionPool(minconn=1, maxconn=8, dsn=args.dsn), 'postgres'
+
+    results = run_suite(pool, source, args.cases, args.repeat, args.warmup, args.end or SEED_END.date())
+    pool.closeall()
+    app.processEvents()
+    if recording is not None:
+        recording.save(args.record)
+    print_results(results)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            lines, regressions = compare(json.load(file), results, args.threshold)
+        print('\n'.join(lines))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+# Опис стовпчиків у форматі cursor.description: (name, type_code, ...)
+MEASUMENT_DESCRIPTION = (
+    ('id_measument', 23, None, None, None, None, None),
+    ('id_station', 23, None, None, None, None, None),
+    ('time_meas', 1184, None, None, None, None, None),
+    ('measured_unit', 1043, None, None, None, None, None),
+    ('value_meas', 701, None, None, None, None, None),
+)
+
+MEASURED_UNITS = ['PM2.5', 'PM10', 'Temperature', 'Humidity', 'Pressure', 'Air Quality Index']
+KYIV = timezone(timedelta(hours=2))
+
+
+def measument_rows(offset, count, seed=42):
+    rng = random.Random(seed + offset)
+    start = datetime(2023, 1, 1, tzinfo=KYIV)
+    rows = []
+    for i in range(offset, offset + count):
+        rows.append((
+            i + 1,
+            i % 500 + 1,
+            start + timedelta(minutes=i),
+            MEASURED_UNITS[i % len(MEASURED_UNITS)],
+            round(rng.uniform(0, 120), 2),
+        ))
+    return rows
+
+
+def measument_fetcher(total_rows, seed=42):
+    def fetch_batch(loaded_rows, batch_size):
+        count = max(0, min(batch_size, total_rows - loaded_rows))
+        return MEASUMENT_DESCRIPTION, measument_rows(loaded_rows, count, seed)
+    return fetch_batch
+
+
+STATION_STATUSES = ['Підключена', 'Відключена']
+STREETS = ['вул. Хрещатик', 'просп. Перемоги', 'вул. Саксаганського', 'бульв. Лесі Українки', 'вул. Антоновича']
+
+
+def station_report_rows(offset, count):
+    # Рядки у форматі connected_stations_without_dublicate: (Адреса, Статус, Вимір)
+    return [(f"{STREETS[i % len(STREETS)]}, {i % 300 + 1}, Київ",
+             STATION_STATUSES[i % 7 == 0],
+             MEASURED_UNITS[i % len(MEASURED_UNITS)]) for i in range(offset, offset + count)]
@@ -0,0 +1,292 @@
+"""Експорт графіків Plotly у компактні HTML-файли.
+
+Самодостатній файл Plotly (як plotly_chart.html) містить у кожному графіку 3.6 МБ
+plotly.js і шаблон оформлення. Тут бібліотека й шаблон записуються один раз у спільну
+папку assets під іменами з хешем вмісту - їх можна кешувати назавжди, а різні версії
+не конфліктують. Файл графіка містить лише свої дані; числові ряди записуються як
+base64 типізованих масивів (Float64Array тощо), а не як текст JSON.
+
+Режими:
+    shared - бібліотека й шаблон у спільних assets (типово);
+    bundle - один самодостатній файл на звіт (для пересилання), але з компактними даними.
+З gzip=True файл графіка пишеться як .html.gz, а поруч зі спільними файлами кладуться
+їхні .gz-версії для веб-сервера.
+
+plotly.js береться з --plotly-js, з пакета plotly (якщо встановлено) або з уже
+наявного самодостатнього HTML-файлу (типово - plotly_chart.html поруч із програмою).
+
+    python chart_export.py migrate plotly_chart.html plotly_scatter_chart.html --out charts
+    python chart_export.py migrate plotly_chart.html --out charts --gzip
+    python chart_export.py migrate plotly_chart.html --out charts --mode bundle
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+
+import numpy as np
+
+ASSETS_DIR = 'assets'
+SHARED = 'shared'
+BUNDLE = 'bundle'
+TYPED_ARRAY_MIN = 8  # коротші числові списки залишаються звичайним JSON
+
+# Самодостатні файли, з яких можна взяти plotly.js, якщо пакета plotly немає
+legacy_charts = [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                 for name in ('plotly_chart.html', 'plotly_scatter_chart.html')]
+
+_plotly_js_marker = '/**\n* plotly.js'
+_new_plot_call = 'Plotly.newPlot('
+
+loader_js = """
+var TYPES = {i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+             i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array};
+function decode(value) {
+    if (Array.isArray(value)) {
+        return value.map(decode);
+    }
+    if (value && typeof value === 'object') {
+        if (typeof value.bdata === 'string' && TYPES[value.dtype]) {
+            var text = atob(value.bdata), bytes = new Uint8Array(text.length);
+            for (var i = 0; i < text.length; i++) {
+                bytes[i] = text.charCodeAt(i);
+            }
+            return new TYPES[value.dtype](bytes.buffer);
+        }
+        var result = {};
+        for (var key in value) {
+            result[key] = decode(value[key]);
+        }
+        return result;
+    }
+    return value;
+}
+var figure = decode(JSON.parse(document.getElementById('figure').textContent));
+if (figure.template_ref) {
+    figure.layout.template = window.PlotlyTemplates[figure.template_ref];
+}
+Plotly.newPlot('chart', figure.data, figure.layout, figure.config).then(function () {
+    window.chartReady = true;
+});
+"""
+
+page_html = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body style="margin: 0">
+<div id="chart" style="width: 100%; height: 100vh"></div>
+{scripts}
+<script type="application/json" id="figure">{figure}</script>
+<script>{loader}</script>
+</body>
+</html>
+"""
+
+
+def find_plotly_js(path=None, fallback_html=legacy_charts):
+    if path:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    try:
+        import plotly
+    except ImportError:
+        pass
+    else:
+        with open(os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js'),
+                  encoding='utf-8') as f:
+            return f.read()
+    for html_path in fallback_html:
+        if not os.path.exists(html_path):
+            continue
+        with open(html_path, encoding='utf-8') as f:
+            plotly_js = extract_plotly_js(f.read())
+        if plotly_js:
+            return plotly_js
+    raise FileNotFoundError('plotly.js not found: pass --plotly-js or install plotly')
+
+
+def extract_plotly_js(html_text):
+    # Бібліотека, вбудована plotly.io.write_html(include_plotlyjs=True)
+    start = html_text.find(_plotly_js_marker)
+    if start < 0:
+        return None
+    return html_text[start:html_text.index('</script>', start)]
+
+
+def extract_figure(html_text):
+    # Аргументи Plotly.newPlot(id, data, layout, config) з самодостатнього файлу
+    rest = html_text[html_text.rindex(_new_plot_call) + len(_new_plot_call):]
+    decoder = json.JSONDecoder()
+    args = []
+    position = 0
+    while len(args) < 4:
+        while rest[position] in ' \t\r\n,':
+            position += 1
+        value, position = decoder.raw_decode(rest, position)
+        args.append(value)
+    _, data, layout, config = args
+    return {'data': data, 'layout': layout, 'config': config}
+
+
+def _typed_dtype(array):
+    if array.dtype.kind in 'iu':
+        for dtype in ('i1', 'u1', 'i2', 'u2', 'i4', 'u4'):
+            info = np.iinfo(dtype)
+            if array.min() >= info.min and array.max() <= info.max:
+                return dtype
+        return 'f8'
+    # float32, лише якщо це не втрачає точності
+    if np.array_equal(array.astype('f4'), array, equal_nan=True):
+        return 'f4'
+    return 'f8'
+
+
+def encode_typed(values):
+    array = np.asarray(values)
+    dtype = _typed_dtype(array)
+    data = array.astype('<' + dtype).tobytes()
+    return {'dtype': dtype, 'bdata': base64.b64encode(data).decode('ascii')}
+
+
+def _is_numeric_list(value):
+    return (len(value) >= TYPED_ARRAY_MIN
+            and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value))
+
+
+def encode_arrays(value):
+    # Рекурсивно замінює довгі числові списки й масиви NumPy на типізовані масиви
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in 'iuf' and value.ndim == 1 and len(value) >= TYPED_ARRAY_MIN:
+            return encode_typed(value)
+        return encode_arrays(value.tolist())
+    if isinstance(value, dict):
+        return {key: encode_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if _is_numeric_list(value):
+            return encode_typed(np.array(value, dtype=float if any(isinstance(v, float) for v in value) else None))
+        return [encode_arrays(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def write_asset(assets_dir, prefix, suffix, content, gzipped=False):
+    # Ім'я з хешем вмісту: однаковий вміст записується один раз, змінений - під новим іменем
+    content = content.encode('utf-8')
+    name = f"{prefix}-{hashlib.sha256(content).hexdigest()[:16]}{suffix}"
+    path = os.path.join(assets_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(assets_dir, exist_ok=True)
+        _write_atomic(path, content)
+    if gzipped and not os.path.exists(path + '.gz'):
+        _write_atomic(path + '.gz', gzip.compress(content, 9))
+    return path
+
+
+def _write_atomic(path, content):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(content)
+    os.replace(temporary, path)
+
+
+def _json_for_script(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def export_chart(figure, path, mode=SHARED, gzipped=False, plotly_js=None, assets_dir=None, title='Графік'):
+    # figure - {'data': [...], 'layout': {...}, 'config': {...}} у форматі Plotly
+    if plotly_js is None:
+        plotly_js = find_plotly_js()
+    layout = dict(figure.get('layout', {}))
+    compact = {
+        'data': encode_arrays(figure['data']),
+        'layout': layout,
+        'config': figure.get('config', {'responsive': True}),
+    }
+
+    if mode == BUNDLE:
+        scripts = f"<script>{plotly_js}</script>"
+        compact['layout'] = encode_arrays(layout)
+    else:
+        if assets_dir is None:
+            assets_dir = os.path.join(os.path.dirname(os.path.abspath(path)), ASSETS_DIR)
+        chart_dir = os.path.dirname(os.path.abspath(path))
+        sources = [write_asset(assets_dir, 'plotly', '.min.js', plotly_js, gzipped)]
+        template = layout.pop('template', None)
+        if template is not None:
+            template_js = "window.PlotlyTemplates = window.PlotlyTemplates || {};\n"
+            template_json = _json_for_script(template)
+            template_ref = hashlib.sha256(template_json.encode('utf-8')).hexdigest()[:16]
+            template_js += f"window.PlotlyTemplates['{template_ref}'] = {template_json};\n"
+            sources.append(write_asset(assets_dir, 'template', '.js', template_js, gzipped))
+            compact['template_ref'] = template_ref
+        compact['layout'] = encode_arrays(layout)
+        scripts = '\n'.join(f'<script src="{os.path.relpath(source, chart_dir).replace(os.sep, "/")}"></script>'
+                            for source in sources)
+
+    page = page_html.format(title=title, scripts=scripts, figure=_json_for_script(compact), loader=loader_js)
+    content = page.encode('utf-8')
+    if gzipped:
+        path += '.gz'
+        content = gzip.compress(content, 9)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    _write_atomic(path, content)
+    return path
+
+
+def series_figure(title, series, x_title='Дата', y_title='Значення'):
+    # series - [(назва, мітки часу в мілісекундах, значення)]; мітки вже зсунуті у місцевий час
+    return {
+        'data': [{'type': 'scattergl' if len(x) > 5000 else 'scatter', 'mode': 'lines', 'name': name,
+                  'x': np.asarray(x, dtype=float), 'y': np.asarray(y, dtype=float)}
+                 for name, x, y in series],
+        'layout': {'title': {'text': title}, 'xaxis': {'type': 'date', 'title': {'text': x_title}},
+                   'yaxis': {'title': {'text': y_title}}},
+        'config': {'responsive': True},
+    }
+
+
+def bar_figure(title, labels, values, colors, x_title='Значення', y_title='Величина вимірювання'):
+    return {
+        'data': [{'type': 'bar', 'orientation': 'h', 'y': list(labels), 'x': np.asarray(values, dtype=float),
+                  'marker': {'color': list(colors)}}],
+        'layout': {'title': {'text': title}, 'xaxis': {'title': {'text': x_title}},
+                   'yaxis': {'title': {'text': y_title}, 'automargin': True}},
+        'config': {'responsive': True},
+    }
+
+
+def migrate(html_paths, out_dir, mode=SHARED, gzipped=False, plotly_js=None):
+    # Переводить самодостатні файли Plotly у компактний формат; повертає [(старий, новий)]
+    if plotly_js is None:
+        plotly_js = find_plotly_js(fallback_html=html_paths)
+    written = []
+    for html_path in html_paths:
+        with open(html_path, encoding='utf-8') as f:
+            figure = extract_figure(f.read())
+        name = os.path.splitext(os.path.basename(html_path))[0]
+        target = export_chart(figure, os.path.join(out_dir, name + '.html'), mode, gzipped, plotly_js, title=name)
+        written.append((html_path, target))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--out', default='charts')
+    parser.add_argument('--mode', choices=[SHARED, BUNDLE], default=SHARED)
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--plotly-js')
+    args = parser.parse_args()
+
+    plotly_js = find_plotly_js(args.plotly_js, fallback_html=args.files)
+    for source, target in migrate(args.files, args.out, args.mode, args.gzip, plotly_js):
+        print(f"{source}: {os.path.getsize(source) / 1024:.1f} KB -> {target}: {os.path.getsize(target) / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""Доступ до даних: каталог схеми, прочитаний один раз за сесію, і підготовлені запити.
+
+Каталог (catalog) - таблиці й представлення схеми public з їхніми стовпчиками, типами,
+NOT NULL і найкращим унікальним ключем. Він читається двома запитами під час першого
+звернення, а далі переглядач таблиць, пошук і експорт беруть усе з пам'яті. Назви таблиць
+і стовпчиків, що потрапляють у текст запиту, перевіряються за каталогом (identifier):
+невідома назва - помилка UnknownIdentifier, а не довільний текст у SQL.
+
+execute_prepared виконує запит як підготовлений: перший раз на з'єднанні - PREPARE
+(запит розбирається й планується один раз), далі лише EXECUTE з параметрами. Так
+виконуються запити, що повторюються з різними параметрами: сторінки переглядача,
+агрегати станцій, запити звітів. Серверні (іменовані) курсори так не вміють - DECLARE
+приймає лише SELECT, тож потокове читання графіка лишається звичайним запитом.
+
+    python data_access.py --dsn "dbname=MonitorAir user=postgres" tables
+    python data_access.py --dsn "..." columns measument_view
+    python data_access.py --dsn "..." prepare "SELECT * FROM station WHERE id_station = %s" 1 --repeat 100
+"""
+import argparse
+import hashlib
+import itertools
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import partial
+
+import psycopg2
+from psycopg2 import sql
+
+SCHEMA = 'public'
+TABLE_KINDS = ('r', 'p')       # звичайні й секціоновані таблиці (як у pg_tables)
+TEXT_TYPES = ('text', 'character varying', 'character')
+MAX_PREPARED = 100             # підготовлених запитів на одне з'єднання; найдавніші звільняються (LRU)
+
+columns_query = """
+    SELECT c.relname::text, c.relkind::text, a.attname::text, format_type(a.atttypid, a.atttypmod),
+           a.attnotnull
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    WHERE n.nspname = %s AND c.relkind IN ('r', 'p', 'v', 'm')
+    ORDER BY c.relname, a.attnum
+"""
+
+# Унікальні індекси без умови й виразів, усі стовпчики яких NOT NULL: першим - первинний ключ,
+# далі - з найменшою кількістю стовпчиків
+keys_query = """
+    SELECT c.relname::text, array_agg(a.attname::text ORDER BY k.ord)
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+    WHERE n.nspname = %s AND i.indisunique AND i.indisvalid AND i.indpred IS NULL AND i.indexprs IS NULL
+    GROUP BY c.relname, i.indexrelid, i.indisprimary
+    HAVING bool_and(a.attnotnull)
+    ORDER BY c.relname, i.indisprimary DESC, count(*)
+"""
+
+
+class UnknownIdentifier(psycopg2.ProgrammingError):
+    pass
+
+
+class Relation:
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.columns = []
+        self.types = {}
+        self.not_null = {}
+        self.unique_key = None
+
+    def __repr__(self):
+        return f"Relation({self.name!r}, {self.kind!r}, {self.columns!r})"
+
+    @property
+    def text_columns(self):
+        return tuple(c for c in self.columns if self.types[c].split('(')[0] in TEXT_TYPES)
+
+    def has_column(self, column):
+        return column in self.types
+
+
+class SchemaCatalog:
+    # Структура схеми під час роботи програми не змінюється, тож читається один раз;
+    # після DDL (нові таблиці, індекси) - invalidate()
+    def __init__(self, schema=SCHEMA):
+        self.schema = schema
+        self.relations = None
+        self.lock = threading.Lock()
+        self.loads = 0
+
+    def load(self, connection):
+        cursor = connection.cursor()
+        cursor.execute(columns_query, (self.schema,))
+        relations = {}
+        for name, kind, column, column_type, not_null in cursor.fetchall():
+            relation = relations.get(name)
+            if relation is None:
+                relation = relations[name] = Relation(name, kind)
+            relation.columns.append(column)
+            relation.types[column] = column_type
+            relation.not_null[column] = not_null
+        cursor.execute(keys_query, (self.schema,))
+        for name, columns in cursor.fetchall():
+            if name in relations and relations[name].unique_key is None:
+                relations[name].unique_key = tuple(columns)
+        self.loads += 1
+        return relations
+
+    def ensure(self, connection):
+        with self.lock:
+            if self.relations is None:
+                self.relations = self.load(connection)
+            return self.relations
+
+    def invalidate(self):
+        with self.lock:
+            self.relations = None
+
+    def relation(self, connection, name):
+        relation = self.ensure(connection).get(name)
+        if relation is None:
+            raise UnknownIdentifier(f'relation "{name}" is not in schema {self.schema}')
+        return relation
+
+    def table_names(self, connection):
+        return [name for name, relation in sorted(self.ensure(connection).items()) if relation.kind in TABLE_KINDS]
+
+    def check_columns(self, connection, table, columns):
+        relation = self.relation(connection, table)
+        for column in columns:
+            if not relation.has_column(column):
+                raise UnknownIdentifier(f'column "{column}" is not in {table}')
+        return relation
+
+    def identifier(self, connection, table, *columns):
+        # sql.Identifier таблиці (або її стовпчиків) лише після перевірки за каталогом
+        self.check_columns(connection, table, columns)
+        if not columns:
+            return sql.Identifier(table)
+        return sql.SQL(', ').join(sql.Identifier(c) for c in columns)
+
+
+catalog = SchemaCatalog()
+
+
+_prepared = weakref.WeakKeyDictionary()   # з'єднання -> OrderedDict(назва -> True/False)
+# RLock: _forget_connection викликається збирачем сміття, і це може статися в тому ж потоці під замком
+_prepared_lock = threading.RLock()
+prepared_queries = {}                     # назва -> текст запиту (для журналу запитів)
+_query_refs = {}                          # назва -> на скількох з'єднаннях вона є
+_placeholders = re.compile(r'%%|%s')
+
+
+def statement_name(text):
+    # Назва залежить лише від тексту, тож той самий запит має ту саму назву на всіх з'єднаннях
+    return 'q_' + hashlib.md5(text.encode('utf-8')).hexdigest()[:16]
+
+
+def positional(text):
+    # %s -> $1, $2, ... у тому ж порядку, у якому psycopg2 підставляє параметри; %% -> %
+    numbers = itertools.count(1)
+    return _placeholders.sub(lambda m: '%' if m.group(0) == '%%' else f'${next(numbers)}', text)
+
+
+def _prepare(cursor, name, text, has_params):
+    # У точці збереження: запит, для якого сервер не може вивести типи параметрів,
+    # не ламає транзакцію і далі просто виконується без підготовки
+    savepoint = not cursor.connection.autocommit
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT prepare_statement')
+        cursor.execute(f'PREPARE {name} AS {positional(text) if has_params else text}')
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT prepare_statement')
+        return True
+    except psycopg2.Error as e:
+        if savepoint:
+            cursor.execute('ROLLBACK TO SAVEPOINT prepare_statement')
+        print(f"Error in prepare {name}: {e}")
+        return False
+
+
+def _remember(name, text):
+    # Текст живе в prepared_queries, поки назва є хоча б на одному з'єднанні
+    with _prepared_lock:
+        prepared_queries[name] = text
+        _query_refs[name] = _query_refs.get(name, 0) + 1
+
+
+def _forget(names):
+    with _prepared_lock:
+        for name in names:
+            refs = _query_refs.pop(name, 1) - 1
+            if refs > 0:
+                _query_refs[name] = refs
+            else:
+                prepared_queries.pop(name, None)
+
+
+def _forget_connection(statements):
+    # З'єднання закрите й зібране - його запитів на сервері вже немає
+    _forget(list(statements))
+
+
+def _statements(connection):
+    with _prepared_lock:
+        statements = _prepared.get(connection)
+        if statements is None:
+            statements = _prepared[connection] = OrderedDict()
+            weakref.finalize(connection, _forget_connection, statements)
+        return statements
+
+
+def execute_prepared(cursor, query, params=None):
+    # Той самий виклик, що й cursor.execute(query, params); іменовані параметри (%(name)s)
+    # і курсори без підтримки підготовки (записи benchmarks.replay) - звичайним execute
+    if (cursor.name is not None or isinstance(params, dict)
+            or not getattr(cursor, 'prepared_statements', True)):
+        return cursor.execute(query, params)
+    connection = cursor.connection
+    text = query if isinstance(query, str) else query.as_string(connection)
+    if '%(' in text:
+        return cursor.execute(query, params)
+    name = statement_name(text)
+    statements = _statements(connection)
+    prepared = statements.get(name)
+    if prepared is None:
+        prepared = statements[name] = _prepare(cursor, name, text, params is not None)
+        _remember(name, text)
+        if len(statements) > MAX_PREPARED:
+            old_name, old_prepared = statements.popitem(last=False)
+            _forget([old_name])
+            if old_prepared:
+                cursor.execute(f'DEALLOCATE {old_name}')
+    else:
+        statements.move_to_end(name)
+    if not prepared:
+        return cursor.execute(query, params)
+    if not params:
+        return cursor.execute(f'EXECUTE {name}')
+    return cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+
+def prepared_count(connection):
+    with _prepared_lock:
+        return sum(1 for prepared in _prepared.get(connection, {}).values() if prepared)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default='dbname=MonitorAir')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('tables')
+    columns_parser = commands.add_parser('columns')
+    columns_parser.add_argument('table')
+    prepare_parser = commands.add_parser('prepare', help='порівняти звичайне й підготовлене виконання')
+    prepare_parser.add_argument('query')
+    prepare_parser.add_argument('params', nargs='*')
+    prepare_parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(args.dsn)
+    if args.command == 'tables':
+        for name in catalog.table_names(connection):
+            print(name)
+    elif args.command == 'columns':
+        relation = catalog.relation(connection, args.table)
+        for column in relation.columns:
+            flags = ' NOT NULL' if relation.not_null[column] else ''
+            flags += ' KEY' if column in (relation.unique_key or ()) else ''
+            print(f"{column:<24} {relation.types[column]}{flags}")
+    else:
+        params = args.params or None
+        cursor = connection.cursor()
+        for label, execute in (('execute', cursor.execute), ('prepared', partial(execute_prepared, cursor))):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                execute(args.query, params)
+                cursor.fetchall()
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"{label:<10} {elapsed / args.repeat:8.2f} мс на запит")
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    # Потокобезпечний пул з'єднань: кожна операція бере окреме з'єднання і повертає його,
+    # тож запити з різних вікон виконуються паралельно, а помилка транзакції в одному вікні
+    # не "отруює" решту.
+    def __init__(self, minconn=1, maxconn=8, health_check_interval=30, checkout_timeout=30, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.connect_kwargs = connect_kwargs
+
+        self.condition = threading.Condition()
+        self.idle = []          # (connection, time_returned)
+        self.in_use = set()
+        self.opening = 0        # з'єднання, які саме відкриваються
+        self.closed = False
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.checkout_time = 0.0
+        self.max_checkout_time = 0.0
+        self.peak_in_use = 0
+        self.reconnects = 0
+        self.health_check_failures = 0
+        self.timeouts = 0
+
+        for _ in range(minconn):
+            self.idle.append((self._connect(), time.monotonic()))
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.in_use) + self.opening
+
+    def _connect(self):
+        return psycopg2.connect(**self.connect_kwargs)
+
+    def _is_healthy(self, connection, idle_since):
+        if connection.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        # З'єднання давно не використовувалось - перевіряємо, що сокет ще живий
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        waited = False
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise psycopg2.InterfaceError('connection pool is closed')
+                if self.idle:
+                    connection, idle_since = self.idle.pop()
+                    reserved = False
+                    break
+                if self.size < self.maxconn:
+                    connection, idle_since = None, None
+                    reserved = True
+                    self.opening += 1  # резервуємо місце, поки відкривається нове з'єднання
+                    break
+                waited = True
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f'no free connection in the pool after {timeout} s')
+                self.condition.wait(remaining)
+
+        try:
+            if reserved:
+                connection = self._connect()
+            elif not self._is_healthy(connection, idle_since):
+                self.health_check_failures += 1
+                self._close_quietly(connection)
+                connection = self._connect()
+                self.reconnects += 1
+        except psycopg2.Error:
+            with self.condition:
+                if reserved:
+                    self.opening -= 1
+                self.condition.notify()
+            raise
+
+        elapsed = time.monotonic() - started
+        with self.condition:
+            if reserved:
+                self.opening -= 1
+            self.in_use.add(connection)
+            self.checkouts += 1
+            self.checkout_time += elapsed
+            self.max_checkout_time = max(self.max_checkout_time, elapsed)
+            if waited:
+                self.waits += 1
+                self.wait_time += elapsed
+            self.peak_in_use = max(self.peak_in_use, len(self.in_use))
+        return connection
+
+    def putconn(self, connection, discard=False):
+        if not discard and not connection.closed:
+            try:
+                # Незавершена або зламана транзакція не повинна дістатися наступній операції
+                if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self.condition:
+            self.in_use.discard(connection)
+            if discard or connection.closed or self.closed:
+                self._close_quietly(connection)
+            else:
+                self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        connection = self.getconn(timeout)
+        broken = False
+        try:
+            yield connection
+        except psycopg2.OperationalError:
+            broken = connection.closed != 0
+            raise
+        finally:
+            self.putconn(connection, discard=broken)
+
+    def closeall(self):
+        with self.condition:
+            self.closed = True
+            for connection, _ in self.idle:
+                self._close_quietly(connection)
+            self.idle = []
+            self.condition.notify_all()
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def stats(self):
+        with self.condition:
+            checkouts = self.checkouts or 1
+            return {
+                'size': self.size,
+                'max': self.maxconn,
+                'in_use': len(self.in_use),
+                'idle': len(self.idle),
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'avg_wait_ms': self.wait_time / (self.waits or 1) * 1000,
+                'avg_checkout_ms': self.checkout_time / checkouts * 1000,
+                'max_checkout_ms': self.max_checkout_time * 1000,
+                'timeouts': self.timeouts,
+                'reconnects': self.reconnects,
+                'health_check_failures': self.health_check_failures,
+            }
+
+
+def format_pool_stats(stats):
+    return (f"З'єднання: {stats['in_use']}/{stats['size']} (макс. {stats['max']}, пік {stats['peak_in_use']})  "
+            f"очікувань: {stats['waits']} (сер. {stats['avg_wait_ms']:.1f} мс)  "
+            f"видача: сер. {stats['avg_checkout_ms']:.1f} мс, макс. {stats['max_checkout_ms']:.1f} мс  "
+            f"перепідключень: {stats['reconnects']}")
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: залишає threshold точок, які найкраще зберігають форму лінії.
+    # x має бути відсортований за зростанням.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # Межі кошиків для всіх точок, крім першої та останньої
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Середня точка кожного кошика - "третя вершина" трикутника для попереднього кошика
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        bx, by = x[start:end], y[start:end]
+        # Подвоєна площа трикутника (a, точка кошика, середня точка наступного кошика)
+        areas = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+
+def minmax_downsample(x, y, buckets):
+    # Для кожного кошика зберігає мінімум і максимум - піки не губляться навіть на дуже щільних даних
+    n = len(x)
+    if n <= buckets * 2:
+        return x, y
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+    # Перший мінімум і перший максимум у кожному кошику, у порядку часу
+    min_idx = _first_per_bucket(np.flatnonzero(y == mins[bucket_of]), bucket_of)
+    max_idx = _first_per_bucket(np.flatnonzero(y == maxs[bucket_of]), bucket_of)
+    keep = np.union1d(min_idx, max_idx)
+    return x[keep], y[keep]
+
+
+def _first_per_bucket(indexes, bucket_of):
+    buckets = bucket_of[indexes]
+    return indexes[np.r_[True, buckets[1:] != buckets[:-1]]]
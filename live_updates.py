@@ -0,0 +1,131 @@
+"""Оновлення наживо: сповіщення PostgreSQL (LISTEN/NOTIFY) про нові вимірювання.
+
+Тригер на measument після кожного INSERT-запиту (FOR EACH STATEMENT) надсилає в канал
+measument_inserted найбільший id_measument серед вставлених рядків. Програма слухає
+канал на окремому з'єднанні в режимі autocommit; сокет цього з'єднання стежить
+QSocketNotifier у циклі подій Qt, тож окремого потоку чи опитування за таймером немає.
+Сповіщення, що приходять пачкою, зливаються в одне оновлення інтерфейсу раз на COALESCE_MS.
+
+    python live_updates.py --dsn "dbname=MonitorAir user=postgres" install
+    python live_updates.py --dsn "dbname=MonitorAir user=postgres" uninstall
+"""
+import argparse
+
+import psycopg2
+from psycopg2 import sql
+from PyQt5.QtCore import QObject, QSocketNotifier, QTimer, pyqtSignal
+
+CHANNEL = 'measument_inserted'
+COALESCE_MS = 250
+
+install_sql = f"""
+CREATE OR REPLACE FUNCTION measument_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{CHANNEL}', max_id::text)
+    FROM (SELECT MAX(id_measument) AS max_id FROM new_rows) AS inserted
+    WHERE max_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS measument_notify ON measument;
+CREATE TRIGGER measument_notify AFTER INSERT ON measument
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION measument_notify();
+"""
+
+uninstall_sql = """
+DROP TRIGGER IF EXISTS measument_notify ON measument;
+DROP FUNCTION IF EXISTS measument_notify();
+"""
+
+
+class LiveListener(QObject):
+    measurements_added = pyqtSignal(int)  # найбільший id_measument серед нових рядків
+    failed = pyqtSignal(object)
+
+    def __init__(self, connect_kwargs, channel=CHANNEL, coalesce_ms=COALESCE_MS, parent=None):
+        super().__init__(parent)
+        self.connect_kwargs = connect_kwargs
+        self.channel = channel
+        self.connection = None
+        self.notifier = None
+        self.pending_id = None
+        self.received = 0  # сповіщень від сервера
+        self.emitted = 0   # оновлень інтерфейсу
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(coalesce_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def start(self):
+        self.connection = psycopg2.connect(**self.connect_kwargs)
+        # Сповіщення доставляються лише поза транзакцією
+        self.connection.autocommit = True
+        cursor = self.connection.cursor()
+        cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+        cursor.close()
+        self.notifier = QSocketNotifier(self.connection.fileno(), QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self.on_readable)
+
+    def stop(self):
+        self.timer.stop()
+        self.pending_id = None
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+            self.notifier.deleteLater()
+            self.notifier = None
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except psycopg2.Error:
+                pass
+            self.connection = None
+
+    def on_readable(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error as e:
+            self.stop()
+            self.failed.emit(e)
+            return
+        notifies = self.connection.notifies
+        if not notifies:
+            return
+        for notify in notifies:
+            try:
+                max_id = int(notify.payload)
+            except ValueError:
+                continue
+            if self.pending_id is None or max_id > self.pending_id:
+                self.pending_id = max_id
+        self.received += len(notifies)
+        notifies.clear()
+        # Перше сповіщення після паузи запускає таймер; усі наступні до його спрацювання
+        # потрапляють у те саме оновлення
+        if self.pending_id is not None and not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        if self.pending_id is None:
+            return
+        max_id, self.pending_id = self.pending_id, None
+        self.emitted += 1
+        self.measurements_added.emit(max_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default='dbname=MonitorAir')
+    parser.add_argument('command', choices=['install', 'uninstall'])
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(args.dsn)
+    with connection, connection.cursor() as cursor:
+        cursor.execute(install_sql if args.command == 'install' else uninstall_sql)
+    connection.close()
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,9 @@ from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButto
     QTableWidgetItem, QMessageBox, QDesktopWidget
 from PyQt5.QtCore import Qt
 import psycopg2
+from db_pool import ConnectionPool
+from perf_panel import slow_log_path
+from query_log import InstrumentedCursor, query_log
 from tables_form import TablesWindow
 
 
@@ -80,11 +83,14 @@ class AuthWindow(QWidget):
         password = self.pass_textbox.text()
 
         try:
-            connection = psycopg2.connect(user=login, password=password, host="localhost", port="5432",
-                                          database="MonitorAir")
-            cursor = connection.cursor()
-
-            self.tables_window = TablesWindow(connection=connection, login=login)  # Создаем объект TablesWindow
+            # Пул з'єднань на всю сесію: кожне вікно бере з'єднання лише на час запиту
+            # Курсори пулу записують кожен запит у query_log (панель продуктивності)
+            pool = ConnectionPool(minconn=2, maxconn=8, user=login, password=password, host="localhost",
+                                  port="5432", database="MonitorAir", cursor_factory=InstrumentedCursor)
+            query_log.configure_slow_log(slow_log_path())
+            QApplication.instance().aboutToQuit.connect(pool.closeall)
+
+            self.tables_window = TablesWindow(pool=pool, login=login)  # Создаем объект TablesWindow
             self.tables_window.show()
             self.close()
         except psycopg2.Error as e:
@@ -95,6 +101,8 @@ class AuthWindow(QWidget):
 
 
 if __name__ == '__main__':
+    # QtWebEngine імпортується лише під час відкриття звітів, тобто вже після створення QApplication
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     window = AuthWindow()
     window.show()
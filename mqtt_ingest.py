@@ -0,0 +1,499 @@
+"""Приймання вимірювань з MQTT-серверів і запис у measument порціями.
+
+Сервери беруться з mqtt_server, а відповідність позицій значень у повідомленні
+вимірюваним величинам - з mqtt_message_unit.order_mqtt_unit (позиції рахуються з 1).
+Станція визначається за останнім сегментом топіка, який порівнюється з
+station.id_saveecobot. Повідомлення - JSON-масив або рядок значень, розділених
+комами, крапками з комою чи пробілами; порожні, нечислові та нескінченні значення
+(nan, inf) пропускаються.
+
+Рядки накопичуються в обмеженій черзі й записуються окремим потоком одним
+COPY FROM STDIN (або багаторядковим INSERT) щойно набирається --flush-size рядків
+або минає --flush-interval секунд. Коли черга заповнена, потік MQTT-клієнта чекає
+(--on-full block: брокер притримує повідомлення) або нові повідомлення відкидаються
+і рахуються (--on-full drop). Якщо база недоступна, порція повторюється з паузою,
+а черга тим часом працює як буфер. Порцію, яку база відхиляє (наприклад, невідома
+станція чи величина), ділиться навпіл, доки не знайдуться відхилені рядки, і
+відкидаються лише вони. Раз на --metrics-interval друкується статистика.
+Тригер з live_updates.py спрацьовує один раз на порцію, а не на кожне повідомлення.
+
+    python mqtt_ingest.py --dsn "dbname=MonitorAir user=postgres" run
+    python mqtt_ingest.py --dsn "..." run --flush-size 10000 --flush-interval 0.5 --method insert
+    python mqtt_ingest.py --dsn "..." simulate --rate 20000 --seconds 30
+
+simulate замість справжніх серверів використовує LocalBroker - брокер у тому ж процесі
+з тим самим інтерфейсом, що й MqttSource; MQTT-клієнт потрібен лише для run:
+paho-mqtt>=2.0 (зворотні виклики версії 2, CallbackAPIVersion.VERSION2).
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+FLUSH_SIZE = 5000         # рядків
+FLUSH_INTERVAL = 1.0      # секунд
+QUEUE_SIZE = 20000        # повідомлень
+METRICS_INTERVAL = 10.0   # секунд
+RETRY_DELAYS = (0.5, 1, 2, 5, 10)  # секунд між спробами записати порцію
+ORDER_BASE = 1            # order_mqtt_unit першого значення в повідомленні
+DEFAULT_TOPIC = '#'
+
+COPY, INSERT = 'copy', 'insert'
+BLOCK, DROP = 'block', 'drop'
+
+servers_query = "SELECT id_server, url FROM mqtt_server ORDER BY id_server"
+units_query = """
+    SELECT id_server, order_mqtt_unit, measured_unit FROM mqtt_message_unit
+    ORDER BY id_server, order_mqtt_unit
+"""
+stations_query = "SELECT id_saveecobot, id_station FROM station WHERE id_saveecobot IS NOT NULL"
+
+measument_columns = ('id_station', 'time_meas', 'measured_unit', 'value_meas')
+copy_sql = f"COPY measument ({', '.join(measument_columns)}) FROM STDIN WITH (FORMAT csv)"
+insert_sql = f"INSERT INTO measument ({', '.join(measument_columns)}) VALUES %s"
+
+_value_separators = re.compile(r'[,;\s]+')
+
+
+def parse_payload(payload):
+    # -> список значень за позиціями; None там, де значення немає або воно не число
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8', errors='replace')
+    payload = payload.strip()
+    if payload.startswith('['):
+        values = json.loads(payload)
+    else:
+        values = _value_separators.split(payload) if payload else []
+    parsed = []
+    for value in values:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = None
+        # nan та inf (JSON NaN, рядки "nan", "inf") - не вимірювання
+        parsed.append(value if value is not None and math.isfinite(value) else None)
+    return parsed
+
+
+class MessageMapper:
+    # Перетворює повідомлення на рядки measument за довідниками з бази
+    def __init__(self, units, stations):
+        self.units = {}  # id_server -> [(позиція, measured_unit)]
+        for server_id, order, unit in units:
+            self.units.setdefault(server_id, []).append((order - ORDER_BASE, unit))
+        self.stations = {str(key): station_id for key, station_id in stations}
+
+    @classmethod
+    def load(cls, connection):
+        cursor = connection.cursor()
+        cursor.execute(units_query)
+        units = cursor.fetchall()
+        cursor.execute(stations_query)
+        stations = cursor.fetchall()
+        connection.rollback()
+        return cls(units, stations)
+
+    def rows(self, server_id, topic, payload, received_at):
+        station_id = self.stations.get(topic.rstrip('/').rsplit('/', 1)[-1])
+        units = self.units.get(server_id)
+        if station_id is None or not units:
+            return None
+        values = parse_payload(payload)
+        return [(station_id, received_at, unit, values[position])
+                for position, unit in units
+                if 0 <= position < len(values) and values[position] is not None]
+
+
+class IngestMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.counters = dict.fromkeys(
+            ('messages', 'unmapped', 'bad_payload', 'dropped', 'rows_queued', 'rows_written',
+             'rows_failed', 'flushes', 'retries'), 0)
+        self.flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.last = (self.started, 0, 0)
+
+    def add(self, **counts):
+        with self.lock:
+            for name, count in counts.items():
+                self.counters[name] += count
+
+    def flushed(self, rows, seconds):
+        with self.lock:
+            self.counters['rows_written'] += rows
+            self.counters['flushes'] += 1
+            self.flush_time += seconds
+            self.max_flush_time = max(self.max_flush_time, seconds)
+
+    def snapshot(self, queue_depth=0):
+        # Швидкості - за час від попереднього знімка
+        with self.lock:
+            now = time.perf_counter()
+            last_time, last_messages, last_rows = self.last
+            interval = max(now - last_time, 1e-9)
+            snapshot = dict(self.counters)
+            snapshot.update(
+                queue_depth=queue_depth,
+                messages_per_s=(snapshot['messages'] - last_messages) / interval,
+                rows_per_s=(snapshot['rows_written'] - last_rows) / interval,
+                avg_flush_ms=self.flush_time / snapshot['flushes'] * 1000 if snapshot['flushes'] else 0.0,
+                max_flush_ms=self.max_flush_time * 1000,
+                uptime=now - self.started,
+            )
+            self.last = (now, snapshot['messages'], snapshot['rows_written'])
+            return snapshot
+
+
+def format_metrics(snapshot):
+    return (f"повідомлень: {snapshot['messages']} ({snapshot['messages_per_s']:.0f}/с)  "
+            f"записано рядків: {snapshot['rows_written']} ({snapshot['rows_per_s']:.0f}/с)  "
+            f"черга: {snapshot['queue_depth']}  порцій: {snapshot['flushes']} "
+            f"(сер. {snapshot['avg_flush_ms']:.1f} мс, макс. {snapshot['max_flush_ms']:.1f} мс)  "
+            f"відкинуто: {snapshot['dropped']}  без станції/величин: {snapshot['unmapped']}  "
+            f"помилок: {snapshot['bad_payload']}  повторів запису: {snapshot['retries']}")
+
+
+class BatchWriter(threading.Thread):
+    # Єдиний потік, що пише в базу; connect() відкриває нове з'єднання (і після обриву)
+    def __init__(self, connect, metrics, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 queue_size=QUEUE_SIZE, method=COPY, on_full=BLOCK, retry_delays=RETRY_DELAYS):
+        super().__init__(name='measument-writer', daemon=True)
+        self.connect = connect
+        self.metrics = metrics
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.method = method
+        self.on_full = on_full
+        self.retry_delays = retry_delays
+        self.queue = queue.Queue(queue_size)
+        self.stopping = threading.Event()
+        self.connection = None
+
+    def put(self, rows, timeout=None):
+        # False - повідомлення відкинуто (черга повна в режимі drop або минув timeout)
+        try:
+            if self.on_full == BLOCK:
+                self.queue.put(rows, timeout=timeout)
+            else:
+                self.queue.put_nowait(rows)
+        except queue.Full:
+            self.metrics.add(dropped=1)
+            return False
+        self.metrics.add(rows_queued=len(rows))
+        return True
+
+    def stop(self, timeout=None):
+        # Дописує все, що вже в черзі, і зупиняє потік
+        self.stopping.set()
+        self.join(timeout)
+
+    def run(self):
+        batch = []
+        deadline = None
+        while not (self.stopping.is_set() and self.queue.empty()):
+            # Чекаємо не довше, ніж до терміну поточної порції
+            timeout = 0.2 if deadline is None else min(max(deadline - time.monotonic(), 0), 0.2)
+            try:
+                batch_rows = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                batch_rows = None
+            if batch_rows:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.extend(batch_rows)
+            if batch and (len(batch) >= self.flush_size or time.monotonic() >= deadline):
+                self.flush(batch)
+                batch = []
+                deadline = None
+        if batch:
+            self.flush(batch)
+        if self.connection is not None:
+            self.connection.close()
+
+    def flush(self, batch):
+        # Порцію, яку база відхиляє, ділимо навпіл, доки не лишаться окремі погані рядки:
+        # відкидаються лише вони, решта записується
+        chunks = [batch]  # ще не записані частини; наступна - остання в списку
+        rejected = 0
+        for attempt, delay in enumerate((0,) + tuple(self.retry_delays)):
+            if delay:
+                self.metrics.add(retries=1)
+                time.sleep(delay)
+            try:
+                while chunks:
+                    chunk = chunks.pop()
+                    if self.connection is None or self.connection.closed:
+                        self.connection = self.connect()
+                    started = time.perf_counter()
+                    try:
+                        self.write(chunk)
+                        self.connection.commit()
+                    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                        chunks.append(chunk)
+                        raise
+                    except psycopg2.Error as e:
+                        # Дані, які база не приймає, повтор не виправить
+                        self.rollback()
+                        if len(chunk) == 1:
+                            print(f"Error in flush, row skipped: {chunk[0]!r}: {e}")
+                            rejected += 1
+                            self.metrics.add(rows_failed=1)
+                        else:
+                            middle = len(chunk) // 2
+                            chunks.extend((chunk[middle:], chunk[:middle]))
+                        continue
+                    self.metrics.flushed(len(chunk), time.perf_counter() - started)
+                return not rejected
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                # З'єднання втрачено - відкриємо нове і повторимо незаписані рядки
+                print(f"Error in flush (attempt {attempt + 1}): {e}")
+                self.close_connection()
+        self.metrics.add(rows_failed=sum(len(chunk) for chunk in chunks))
+        return False
+
+    def rollback(self):
+        try:
+            self.connection.rollback()
+        except psycopg2.Error as e:
+            print(f"Error in rollback: {e}")
+            self.close_connection()
+
+    def close_connection(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except psycopg2.Error:
+                pass
+        self.connection = None
+
+    def write(self, batch):
+        cursor = self.connection.cursor()
+        if self.method == COPY:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                (station_id, received_at.isoformat(), unit, repr(value))
+                for station_id, received_at, unit, value in batch)
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+        else:
+            execute_values(cursor, insert_sql, batch, page_size=1000)
+
+
+class Ingestor:
+    # Зв'язує джерела повідомлень, довідники й потік запису
+    def __init__(self, mapper, writer, metrics):
+        self.mapper = mapper
+        self.writer = writer
+        self.metrics = metrics
+        self.sources = []
+
+    def on_message(self, server_id, topic, payload):
+        self.metrics.add(messages=1)
+        try:
+            rows = self.mapper.rows(server_id, topic, payload, datetime.now(timezone.utc))
+        except ValueError:
+            self.metrics.add(bad_payload=1)
+            return
+        if not rows:
+            self.metrics.add(unmapped=1)
+            return
+        self.writer.put(rows)
+
+    def add_source(self, source):
+        self.sources.append(source)
+        source.start(self.on_message)
+
+    def stop(self):
+        for source in self.sources:
+            source.stop()
+        self.writer.stop()
+
+
+class MqttSource:
+    # Підписка на один сервер з mqtt_server через paho-mqtt
+    def __init__(self, server_id, url, topic=DEFAULT_TOPIC, qos=1):
+        self.server_id = server_id
+        parts = urlsplit(url if '://' in url else f'mqtt://{url}')
+        self.host = parts.hostname
+        self.port = parts.port or (8883 if parts.scheme in ('mqtts', 'ssl') else 1883)
+        self.tls = parts.scheme in ('mqtts', 'ssl')
+        self.username = parts.username
+        self.password = parts.password
+        self.topic = topic
+        self.qos = qos
+        self.client = None
+        self.on_message = None
+
+    def start(self, on_message):
+        import paho.mqtt.client as mqtt
+
+        if not hasattr(mqtt, 'CallbackAPIVersion'):
+            raise RuntimeError('paho-mqtt>=2.0 is required')
+        self.on_message = on_message
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        if self.username:
+            self.client.username_pw_set(self.username, self.password)
+        if self.tls:
+            self.client.tls_set()
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_client_message
+        self.client.connect_async(self.host, self.port)
+        self.client.loop_start()
+
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        # Підписка після кожного (пере)підключення; відмову брокера лише друкуємо - клієнт повторить
+        if reason_code.is_failure:
+            print(f"Error in connect to {self.host}:{self.port}: {reason_code}")
+            return
+        client.subscribe(self.topic, self.qos)
+
+    def on_client_message(self, client, userdata, message):
+        # Виклик блокується, коли черга запису повна, - клієнт перестає читати сокет
+        self.on_message(self.server_id, message.topic, message.payload)
+
+    def stop(self):
+        if self.client is not None:
+            self.client.disconnect()
+            self.client.loop_stop()
+
+
+class LocalBroker:
+    # Брокер у тому ж процесі для перевірки й навантажувального тесту без мережі:
+    # publish() доставляє повідомлення підписаним джерелам у потоці відправника
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def source(self, server_id, topic=DEFAULT_TOPIC):
+        return LocalSource(self, server_id, topic)
+
+    def publish(self, topic, payload):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for source in subscribers:
+            if topic_matches(source.topic, topic):
+                source.on_message(source.server_id, topic, payload)
+
+
+class LocalSource:
+    def __init__(self, broker, server_id, topic):
+        self.broker = broker
+        self.server_id = server_id
+        self.topic = topic
+        self.on_message = None
+
+    def start(self, on_message):
+        self.on_message = on_message
+        with self.broker.lock:
+            self.broker.subscribers.append(self)
+
+    def stop(self):
+        with self.broker.lock:
+            if self in self.broker.subscribers:
+                self.broker.subscribers.remove(self)
+
+
+def topic_matches(pattern, topic):
+    # Шаблони MQTT: + - один рівень, # - решта рівнів
+    pattern_levels = pattern.split('/')
+    topic_levels = topic.split('/')
+    for i, level in enumerate(pattern_levels):
+        if level == '#':
+            return True
+        if i >= len(topic_levels) or (level != '+' and level != topic_levels[i]):
+            return False
+    return len(pattern_levels) == len(topic_levels)
+
+
+def report_metrics(metrics, writer, interval, stopped):
+    while not stopped.wait(interval):
+        print(format_metrics(metrics.snapshot(writer.queue.qsize())), flush=True)
+
+
+def simulate(ingestor, broker, mapper, rate, seconds):
+    # Синтетичні повідомлення для всіх відомих станцій і серверів із заданою частотою
+    stations = list(mapper.stations)
+    servers = list(mapper.units)
+    if not stations or not servers:
+        raise SystemExit('no stations with id_saveecobot or no mqtt_message_unit rows')
+    rng = random.Random(1)
+    width = max(position for units in mapper.units.values() for position, _ in units) + 1
+    sent = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        due = int((time.perf_counter() - started) * rate)
+        while sent < due:
+            payload = ','.join(f'{rng.uniform(0, 120):.2f}' for _ in range(width))
+            broker.publish(f'stations/{servers[sent % len(servers)]}/{stations[sent % len(stations)]}', payload)
+            sent += 1
+        time.sleep(0.001)
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default='dbname=MonitorAir')
+    parser.add_argument('command', choices=['run', 'simulate'])
+    parser.add_argument('--topic', default=DEFAULT_TOPIC)
+    parser.add_argument('--flush-size', type=int, default=FLUSH_SIZE)
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL)
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE)
+    parser.add_argument('--method', choices=[COPY, INSERT], default=COPY)
+    parser.add_argument('--on-full', choices=[BLOCK, DROP], default=BLOCK)
+    parser.add_argument('--metrics-interval', type=float, default=METRICS_INTERVAL)
+    parser.add_argument('--rate', type=int, default=10000, help='повідомлень за секунду для simulate')
+    parser.add_argument('--seconds', type=float, default=30, help='тривалість simulate')
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(args.dsn)
+    mapper = MessageMapper.load(connection)
+    cursor = connection.cursor()
+    cursor.execute(servers_query)
+    servers = cursor.fetchall()
+    connection.close()
+
+    metrics = IngestMetrics()
+    writer = BatchWriter(lambda: psycopg2.connect(args.dsn), metrics, args.flush_size, args.flush_interval,
+                         args.queue_size, args.method, args.on_full)
+    writer.start()
+    ingestor = Ingestor(mapper, writer, metrics)
+    stopped = threading.Event()
+    threading.Thread(target=report_metrics, args=(metrics, writer, args.metrics_interval, stopped),
+                     daemon=True).start()
+
+    try:
+        if args.command == 'simulate':
+            broker = LocalBroker()
+            for server_id in mapper.units:
+                # Топік stations/<id_server>/<id_saveecobot>: кожне джерело отримує лише свій сервер
+                ingestor.add_source(broker.source(server_id, f'stations/{server_id}/+'))
+            sent = simulate(ingestor, broker, mapper, args.rate, args.seconds)
+            print(f"Надіслано повідомлень: {sent}")
+        else:
+            for server_id, url in servers:
+                ingestor.add_source(MqttSource(server_id, url, args.topic))
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ingestor.stop()
+        stopped.set()
+        print(format_metrics(metrics.snapshot(writer.queue.qsize())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+import json
+import re
+
+from psycopg2 import sql
+
+from data_access import catalog, execute_prepared
+from table_search import escape_like, missing_trigram_indexes, search_condition, search_pattern, text_columns
+
+# Порядок сторінок у переглядачі таблиць:
+#   1. первинний ключ або унікальний індекс зі стовпчиками NOT NULL -
+#      WHERE (key) > (last_seen) ORDER BY key LIMIT n;
+#   2. представлення (view) з ключем, описаним у view_order_keys, - так само;
+#   3. звичайна таблиця без ключа - за фізичною адресою рядка ctid
+#      (WHERE ctid > last_seen; стабільно, поки таблицю не оновлюють);
+#   4. все інше - ORDER BY текстом усього рядка з OFFSET: порядок стабільний,
+#      але кожна наступна сторінка дорожча за попередню.
+# Сортування за стовпчиком у 1-3 додає його попереду ключа (ctid для таблиць без ключа):
+# ORDER BY col, key і WHERE (col, key) > (останній рядок); фільтри і пошук (table_search) -
+# додаткові умови WHERE.
+KEYSET, CTID, OFFSET = 'keyset', 'ctid', 'offset'
+
+# Представлення не мають індексів, тому ключ для них вказуємо явно
+view_order_keys = {
+    "measument_view": ("id_measument",),
+}
+
+EXACT_COUNT_LIMIT = 200000  # до стількох рядків (за оцінкою) count(*) займає десятки мілісекунд
+
+
+class OrderKey:
+    def __init__(self, kind, columns=()):
+        self.kind = kind
+        self.columns = tuple(columns)
+
+    def __repr__(self):
+        return f"OrderKey({self.kind!r}, {self.columns!r})"
+
+
+def find_order_key(connection, table):
+    # З каталогу схеми (data_access): таблиця, якої немає в каталозі, - UnknownIdentifier
+    relation = catalog.relation(connection, table)
+    if relation.kind in ('r', 'p', 'm'):
+        if relation.unique_key is not None:
+            return OrderKey(KEYSET, relation.unique_key)
+        if relation.kind != 'p':
+            return OrderKey(CTID)
+    elif relation.kind == 'v' and table in view_order_keys:
+        if all(relation.has_column(c) for c in view_order_keys[table]):
+            return OrderKey(KEYSET, view_order_keys[table])
+    return OrderKey(OFFSET)
+
+
+_comparison = re.compile(r'^\s*(>=|<=|<>|!=|=|>|<)\s*(.+?)\s*$')
+
+
+def filter_condition(column, text, literal=False):
+    # Поле фільтра: "> 5", "<= 2023-11-01", "= PM10" - порівняння в типі стовпчика
+    # (значення передається параметром, PostgreSQL сам приводить його до типу);
+    # будь-що інше - пошук підрядка без урахування регістру в текстовому поданні.
+    # literal=True підставляє значення в сам запит (для COPY, де параметрів немає)
+    column = sql.Identifier(column)
+    match = _comparison.match(text)
+    if match:
+        operator, value = match.groups()
+        operator = '<>' if operator == '!=' else operator
+    else:
+        value = f"%{escape_like(text.strip())}%"
+    placeholder = sql.Literal(value) if literal else sql.Placeholder()
+    if match:
+        condition = sql.SQL('{} {} {}').format(column, sql.SQL(operator), placeholder)
+    else:
+        condition = sql.SQL('{}::text ILIKE {}').format(column, placeholder)
+    return condition, [] if literal else [value]
+
+
+def filters_where(filters, search_columns=(), pattern=None):
+    # Умова WHERE для table_export.select_query або None, якщо фільтрів і пошуку немає;
+    # pattern - шаблон ILIKE з table_search.search_pattern
+    conditions = [filter_condition(column, text, literal=True)[0] for column, text in filters.items()]
+    if pattern is not None:
+        conditions.append(search_condition(search_columns, pattern, literal=True)[0])
+    if not conditions:
+        return None
+    return sql.SQL(' AND ').join(sql.SQL('({})').format(c) for c in conditions)
+
+
+def is_comparison(text):
+    return _comparison.match(text) is not None
+
+
+def column_nullable(connection, table, column):
+    # Для представлень attnotnull завжди false, тобто стовпчик вважається nullable
+    return not catalog.relation(connection, table).not_null.get(column, False)
+
+
+def suggest_indexes(connection, table, order_key, sort=None, filters=None):
+    # CREATE INDEX для стовпчика сортування (разом із ключем - для однозначного порядку)
+    # і для стовпчиків з фільтром-порівнянням, якщо жоден btree-індекс з них не починається
+    if catalog.relation(connection, table).kind not in ('r', 'm'):
+        return []
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT DISTINCT a.attname::text
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = c.relam
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = to_regclass(%s) AND i.indisvalid AND i.indpred IS NULL AND am.amname = 'btree'
+    """, (table,))
+    indexed = {name for name, in cursor.fetchall()}
+
+    wanted = []
+    if sort is not None:
+        key_columns = [c for c in order_key.columns if c != sort[0]] if order_key.kind == KEYSET else []
+        wanted.append([sort[0]] + key_columns)
+    for column, text in (filters or {}).items():
+        if is_comparison(text):
+            wanted.append([column])
+    hints = []
+    for columns in wanted:
+        if columns[0] in indexed:
+            continue
+        indexed.add(columns[0])
+        name = f"{table}_{'_'.join(columns)}_idx"[:63]
+        hints.append(sql.SQL('CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} ({})').format(
+            sql.Identifier(name), sql.Identifier(table),
+            sql.SQL(', ').join(sql.Identifier(c) for c in columns)).as_string(connection))
+    return hints
+
+
+class KeysetPager:
+    # fetch_page/fetch_pages/count_rows виконуються у робочих потоках QueryExecutor, після prepare().
+    # sort - (стовпчик, за спаданням) або None (порядок ключа), filters - {стовпчик: текст фільтра},
+    # search - рядок пошуку по всіх текстових стовпчиках (див. table_search).
+    # Сортування за стовпчиком доповнюється ключем таблиці, тож наступна сторінка
+    # продовжується з (значення, ключ) останнього рядка, як і без сортування.
+    def __init__(self, table, sort=None, filters=None, search=None):
+        self.table = table
+        self.sort = sort
+        self.filters = dict(filters or {})
+        self.search = search_pattern(search) if search else None
+        self.search_columns = None
+        self.order_key = None
+        self.sort_nullable = False
+        self.key_positions = None
+
+    def export_where(self, connection):
+        # Ті самі умови, що й у переглядачі, зі значеннями в тексті запиту (для COPY);
+        # стовпчики пошуку - ті самі, що й у запитах сторінок
+        self.prepare(connection)
+        return filters_where(self.filters, self.search_columns, self.search)
+
+    def key_columns(self):
+        if self.order_key.kind == KEYSET:
+            tie_columns = list(self.order_key.columns)
+        elif self.order_key.kind == CTID:
+            tie_columns = ['ctid']
+        else:
+            tie_columns = []
+        if self.sort is not None:
+            return [self.sort[0]] + [c for c in tie_columns if c != self.sort[0]]
+        return tie_columns
+
+    def _placeholders(self, columns):
+        return sql.SQL(', ').join(sql.SQL('%s::tid') if c == 'ctid' else sql.Placeholder() for c in columns)
+
+    def keyset_condition(self, columns, params, key, descending):
+        operator = sql.SQL('<' if descending else '>')
+        identifiers = [sql.Identifier(c) for c in columns]
+        if not (self.sort is not None and self.sort_nullable):
+            params.extend(key)
+            return sql.SQL('({}) {} ({})').format(
+                sql.SQL(', ').join(identifiers), operator, self._placeholders(columns))
+
+        # Рядкове порівняння з NULL дає NULL, тому для nullable-стовпчика умова розписується явно.
+        # NULL - в кінці при зростанні і на початку при спаданні, як у PostgreSQL за замовчуванням
+        # (тому зворотний напрямок - це просто протилежний descending)
+        value, tie_values = key[0], list(key[1:])
+        column, tie = identifiers[0], sql.SQL(', ').join(identifiers[1:])
+        tie_condition = sql.SQL('({}) {} ({})').format(tie, operator, self._placeholders(columns[1:]))
+        if value is None:
+            params.extend(tie_values)
+            template = ('({column} IS NULL AND {tie}) OR {column} IS NOT NULL' if descending
+                        else '{column} IS NULL AND {tie}')
+        else:
+            params.extend([value, value] + tie_values)
+            template = ('{column} < %s OR ({column} = %s AND {tie})' if descending
+                        else '{column} > %s OR ({column} = %s AND {tie}) OR {column} IS NULL')
+        return sql.SQL('(' + template + ')').format(column=column, tie=tie_condition)
+
+    def conditions(self, params):
+        conditions = []
+        for column, text in self.filters.items():
+            condition, condition_params = filter_condition(column, text)
+            conditions.append(condition)
+            params.extend(condition_params)
+        if self.search is not None:
+            condition, condition_params = search_condition(self.search_columns, self.search)
+            conditions.append(condition)
+            params.extend(condition_params)
+        return conditions
+
+    def _where(self, conditions):
+        if not conditions:
+            return sql.SQL('')
+        return sql.SQL(' WHERE ') + sql.SQL(' AND ').join(sql.SQL('({})').format(c) for c in conditions)
+
+    def page_query(self, size, key=None, offset=None, reverse=False, key_only=False):
+        # Сторінка після key (reverse - перед key, у зворотному порядку) або з OFFSET;
+        # key_only - лише стовпчики ключа (для пошуку ключа рядка з номером offset)
+        table = sql.Identifier(self.table)
+        params = []
+        conditions = self.conditions(params)
+        descending = (self.sort is not None and self.sort[1]) != reverse
+        if self.order_key.kind in (KEYSET, CTID):
+            columns = self.key_columns()
+            if key is not None:
+                conditions.append(self.keyset_condition(columns, params, key, descending))
+            direction = sql.SQL(' DESC' if descending else '')
+            order_by = sql.SQL(', ').join(sql.SQL('{}{}').format(sql.Identifier(c), direction) for c in columns)
+            if key_only:
+                select = sql.SQL('SELECT ') + sql.SQL(', ').join(sql.Identifier(c) for c in columns)
+            else:
+                select = sql.SQL('SELECT *, ctid' if self.order_key.kind == CTID else 'SELECT *')
+        else:
+            # Текстове подання всього рядка впорядковується для будь-яких типів стовпчиків
+            order_by = sql.SQL('t::text')
+            if self.sort is not None:
+                order_by = sql.SQL('{}{}, t::text').format(sql.Identifier(self.sort[0]),
+                                                           sql.SQL(' DESC' if descending else ''))
+            select = sql.SQL('SELECT *')
+        limit = sql.SQL('LIMIT %s')
+        if offset is not None:
+            limit = sql.SQL('OFFSET %s LIMIT %s')
+            params.append(offset)
+        params.append(size)
+        query = sql.SQL('{} FROM {} AS t{} ORDER BY {} {}').format(select, table, self._where(conditions),
+                                                                   order_by, limit)
+        return query, params
+
+    def prepare(self, connection):
+        # Усе, що залежить від схеми, визначається тут один раз, до запитів сторінок і кількості рядків
+        # (переглядач виконує prepare окремим завданням); далі pager лише читається, тож його
+        # одночасно використовують кілька робочих потоків
+        if self.order_key is not None:
+            return
+        # Назви таблиці й стовпчиків ідуть у текст запиту - лише ті, що є в каталозі схеми
+        relation = catalog.check_columns(connection, self.table,
+                                         list(self.filters) + ([self.sort[0]] if self.sort else []))
+        order_key = find_order_key(connection, self.table)
+        if self.sort is not None and self.sort[0] not in order_key.columns:
+            # Стовпчики ключа - NOT NULL (для представлень це гарантує view_order_keys)
+            self.sort_nullable = column_nullable(connection, self.table, self.sort[0])
+        if self.search is not None:
+            self.search_columns = text_columns(connection, self.table)
+        self.order_key = order_key
+        if order_key.kind in (KEYSET, CTID):
+            # Позиції стовпчиків ключа в рядку SELECT * (ctid - додатковий останній стовпчик)
+            self.key_positions = [len(relation.columns) if c == 'ctid' else relation.columns.index(c)
+                                  for c in self.key_columns()]
+
+    def _execute(self, connection, query, params):
+        # (description, rows, перший ключ, останній ключ); ctid потрібен лише для ключа - у таблиці його не показуємо
+        cursor = connection.cursor()
+        execute_prepared(cursor, query, params)
+        description, rows = cursor.description, cursor.fetchall()
+        first_key = last_key = None
+        if self.order_key.kind in (KEYSET, CTID) and rows:
+            first_key = tuple(rows[0][i] for i in self.key_positions)
+            last_key = tuple(rows[-1][i] for i in self.key_positions)
+        if self.order_key.kind == CTID:
+            description, rows = description[:-1], [row[:-1] for row in rows]
+        return description, rows, first_key, last_key
+
+    def fetch_page(self, connection, offset, size, after=None, before=None):
+        # Сторінка з рядка offset. Якщо відомий останній ключ попередньої сторінки (after) або
+        # перший ключ наступної (before), сторінка читається від нього за індексом; інакше
+        # спершу шукається ключ рядка offset - 1 запитом лише по стовпчиках ключа
+        # (index-only scan замість читання всіх попередніх рядків), а сторінка - вже від нього
+        self.prepare(connection)
+        if self.order_key.kind not in (KEYSET, CTID):
+            return self._execute(connection, *self.page_query(size, offset=offset))
+        if after is None and before is not None:
+            description, rows, last_key, first_key = self._execute(
+                connection, *self.page_query(size, key=before, reverse=True))
+            return description, rows[::-1], first_key, last_key
+        if after is None and offset > 0:
+            cursor = connection.cursor()
+            execute_prepared(cursor, *self.page_query(1, offset=offset - 1, key_only=True))
+            row = cursor.fetchone()
+            if row is None:
+                size = 0  # таблиця коротша, ніж offset: лише опис стовпчиків
+            after = tuple(row) if row is not None else None
+        return self._execute(connection, *self.page_query(size, key=after))
+
+    def fetch_pages(self, connection, plan, size):
+        # plan - [(номер сторінки, after, before)]; генератор для QueryExecutor.submit_stream.
+        # Сторінки одного плану продовжуються від ключів уже прочитаних сусідів.
+        fetched = {}
+        for page, after, before in plan:
+            after = fetched.get(page - 1, (None, after))[1]
+            before = fetched.get(page + 1, (before, None))[0]
+            description, rows, first_key, last_key = self.fetch_page(connection, page * size, size, after, before)
+            if rows:
+                fetched[page] = (first_key, last_key)
+            yield page, description, rows, first_key, last_key
+
+    def count_rows(self, connection, exact=False):
+        # (кількість рядків, точна, підказки щодо індексів) для розміру смуги прокрутки:
+        # reltuples з pg_class або оцінка планувальника (EXPLAIN) для представлень і відфільтрованих
+        # запитів; якщо оцінка невелика, рахуємо точно. Підказки - CREATE INDEX для
+        # сортування/фільтра/пошуку; повертаються, а не зберігаються, бо pager спільний для потоків.
+        # exact=True - одразу count(*) без підказок: сторінки вже показали, що оцінка завищена
+        self.prepare(connection)
+        params = []
+        where = self._where(self.conditions(params))
+        cursor = connection.cursor()
+        hints = []
+        if not exact:
+            if self.sort is not None or self.filters:
+                hints = suggest_indexes(connection, self.table, self.order_key, self.sort, self.filters)
+            if self.search is not None:
+                hints += missing_trigram_indexes(connection, self.table)
+
+            estimate = None
+            if not params:
+                execute_prepared(cursor, "SELECT reltuples, relkind FROM pg_class WHERE oid = to_regclass(%s)",
+                                 (self.table,))
+                row = cursor.fetchone()
+                if row is not None and row[1] in ('r', 'm') and row[0] > 0:
+                    estimate = int(row[0])
+            if estimate is None:
+                cursor.execute(sql.SQL('EXPLAIN (FORMAT JSON) SELECT * FROM {} AS t{}').format(
+                    sql.Identifier(self.table), where), params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                estimate = int(plan[0]['Plan']['Plan Rows'])
+            if estimate > EXACT_COUNT_LIMIT:
+                return estimate, False, hints
+        execute_prepared(cursor, sql.SQL('SELECT count(*) FROM {} AS t{}').format(sql.Identifier(self.table), where),
+                         params)
+        return cursor.fetchone()[0], True, hints
@@ -0,0 +1,165 @@
+"""Експорт таблиць звітів у PDF або на принтер без зовнішніх програм (QPdfWriter/QPrinter + QPainter).
+
+Рядки читаються серверним курсором порціями й одразу малюються сторінка за сторінкою,
+тож у пам'яті одночасно лише одна порція рядків, скільки б рядків не мав звіт.
+Функції export_pdf і print_report - генератори для QueryExecutor.submit_stream: після
+кожної порції вони віддають (рядків готово, рядків усього, сторінок), а якщо задачу
+скасовано, недописаний файл видаляється.
+"""
+import os
+
+from PyQt5.QtCore import QLineF, QMarginsF, QRectF, Qt
+from PyQt5.QtGui import QColor, QFont, QFontMetricsF, QPageLayout, QPageSize, QPainter, QPdfWriter
+
+from query_executor import stream_rows
+
+EXPORT_ITERSIZE = 2000
+PDF_RESOLUTION = 300
+PAGE_MARGIN_MM = 15
+
+HEADER_COLOR = QColor('#723d7f')
+STRIPE_COLOR = QColor('#d7eaf9')
+TITLE_COLOR = QColor('#44244c')
+GRID_COLOR = QColor('#dddddd')
+
+
+class PagedTableWriter:
+    # Малює таблицю на будь-якому QPagedPaintDevice (QPdfWriter, QPrinter): заголовок звіту
+    # на першій сторінці, шапка таблиці й номер сторінки - на кожній. Кожен рядок займає
+    # один рядок тексту, задовгі значення обрізаються з "…".
+    def __init__(self, device, title, headers, column_widths=None, font_size=9):
+        self.device = device
+        self.title = title
+        self.headers = headers
+        self.painter = QPainter(device)
+        self.painter.setRenderHint(QPainter.TextAntialiasing)
+
+        self.body_font = QFont('Arial', font_size)
+        self.header_font = QFont('Arial', font_size, QFont.Bold)
+        self.title_font = QFont('Arial', font_size * 2, QFont.Bold)
+        self.body_metrics = QFontMetricsF(self.body_font, device)
+        self.row_height = self.body_metrics.height() * 1.6
+        self.padding = self.body_metrics.averageCharWidth()
+
+        self.width = device.width()
+        self.height = device.height()
+        widths = column_widths or [1] * len(headers)
+        total = sum(widths)
+        self.columns = []
+        left = 0.0
+        for width in widths:
+            width = self.width * width / total
+            self.columns.append((left, width))
+            left += width
+
+        self.pages = 0
+        self.rows = 0
+        self.y = 0.0
+        self.start_page()
+
+    def start_page(self):
+        self.pages += 1
+        painter = self.painter
+        self.y = 0.0
+        if self.pages == 1:
+            painter.setFont(self.title_font)
+            painter.setPen(TITLE_COLOR)
+            title_height = QFontMetricsF(self.title_font, self.device).height() * 1.5
+            painter.drawText(QRectF(0, 0, self.width, title_height), Qt.AlignCenter, self.title)
+            self.y = title_height
+
+        painter.fillRect(QRectF(0, self.y, self.width, self.row_height), HEADER_COLOR)
+        painter.setFont(self.header_font)
+        painter.setPen(Qt.white)
+        for (left, width), header in zip(self.columns, self.headers):
+            painter.drawText(QRectF(left + self.padding, self.y, width - 2 * self.padding, self.row_height),
+                             Qt.AlignVCenter | Qt.AlignLeft, header)
+        self.y += self.row_height
+
+        # Номер сторінки внизу, під останнім рядком таблиці
+        painter.setFont(self.body_font)
+        painter.setPen(Qt.gray)
+        footer = QRectF(0, self.height - self.row_height, self.width, self.row_height)
+        painter.drawText(footer, Qt.AlignVCenter | Qt.AlignRight, f"Сторінка {self.pages}")
+        painter.setPen(Qt.black)
+        self.bottom = self.height - self.row_height
+
+    def write_rows(self, rows):
+        painter = self.painter
+        metrics = self.body_metrics
+        for row in rows:
+            if self.y + self.row_height > self.bottom:
+                self.device.newPage()
+                self.start_page()
+            if self.rows % 2:
+                painter.fillRect(QRectF(0, self.y, self.width, self.row_height), STRIPE_COLOR)
+            for (left, width), value in zip(self.columns, row):
+                text_width = width - 2 * self.padding
+                text = metrics.elidedText('' if value is None else str(value), Qt.ElideRight, text_width)
+                painter.drawText(QRectF(left + self.padding, self.y, text_width, self.row_height),
+                                 Qt.AlignVCenter | Qt.AlignLeft, text)
+            self.y += self.row_height
+            painter.setPen(GRID_COLOR)
+            painter.drawLine(QLineF(0, self.y, self.width, self.y))
+            painter.setPen(Qt.black)
+            self.rows += 1
+
+    def close(self):
+        self.painter.end()
+
+
+def pdf_writer(path, title, resolution=PDF_RESOLUTION):
+    writer = QPdfWriter(path)
+    writer.setResolution(resolution)
+    writer.setPageSize(QPageSize(QPageSize.A4))
+    writer.setPageMargins(QMarginsF(PAGE_MARGIN_MM, PAGE_MARGIN_MM, PAGE_MARGIN_MM, PAGE_MARGIN_MM),
+                          QPageLayout.Millimeter)
+    writer.setTitle(title)
+    writer.setCreator('Засоби монітору якості повітря')
+    return writer
+
+
+def write_table(device, batches, title, headers, column_widths=None, total_rows=None):
+    # batches - будь-який ітератор порцій рядків; після кожної віддає (рядків, усього, сторінок)
+    table = PagedTableWriter(device, title, headers, column_widths)
+    try:
+        for rows in batches:
+            table.write_rows(rows)
+            yield table.rows, total_rows, table.pages
+    except BaseException:
+        # Незавершене завдання друку не відправляємо на принтер
+        if hasattr(device, 'abort'):
+            device.abort()
+        raise
+    finally:
+        table.close()
+
+
+def count_rows(connection, query, params=None):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT count(*) FROM ({query}) AS report", params)
+    return cursor.fetchone()[0]
+
+
+def export_pdf(connection, path, query, params, title, headers, column_widths=None, itersize=EXPORT_ITERSIZE):
+    total_rows = count_rows(connection, query, params)
+    batches = stream_rows(connection, query, params, itersize)
+    finished = False
+    try:
+        yield from write_table(pdf_writer(path, title), batches, title, headers, column_widths, total_rows)
+        finished = True
+    finally:
+        batches.close()
+        if not finished and os.path.exists(path):
+            # Скасовано або помилка - недописаний PDF не залишаємо
+            os.remove(path)
+
+
+def print_report(connection, printer, query, params, title, headers, column_widths=None,
+                 itersize=EXPORT_ITERSIZE):
+    total_rows = count_rows(connection, query, params)
+    batches = stream_rows(connection, query, params, itersize)
+    try:
+        yield from write_table(printer, batches, title, headers, column_widths, total_rows)
+    finally:
+        batches.close()
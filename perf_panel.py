@@ -0,0 +1,193 @@
+"""Панель продуктивності: перцентилі часу запитів і витрат інтерфейсу з query_log.
+
+Панель - QDockWidget: у вікнах звітів (QMainWindow) вона прикріплюється знизу, у вікні
+таблиць відкривається окремим плаваючим вікном. Відкривається кнопкою у вікні таблиць
+або Ctrl+Shift+P у будь-якому вікні програми; оновлюється раз на секунду, поки видима.
+
+    from perf_panel import install_perf_shortcut, show_perf_panel
+    install_perf_shortcut(window)
+"""
+import os
+from datetime import datetime
+
+from PyQt5 import sip
+from PyQt5.QtCore import QStandardPaths, Qt, QTimer
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import (
+    QCheckBox,
+    QDockWidget,
+    QHBoxLayout,
+    QLabel,
+    QMainWindow,
+    QPushButton,
+    QShortcut,
+    QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QTabWidget,
+    QVBoxLayout,
+    QWidget
+)
+
+from query_log import SQL, query_log
+
+REFRESH_MS = 1000
+RECENT_ROWS = 200
+SHORTCUT = 'Ctrl+Shift+P'
+SUMMARY_HEADERS = ['Тип', 'Запит / дія', 'Кількість', 'p50, мс', 'p95, мс', 'p99, мс', 'макс, мс', 'Рядків',
+                   'Помилок']
+SOURCE_HEADERS = ['Тип', 'Вікно / канал'] + SUMMARY_HEADERS[2:]
+RECENT_HEADERS = ['Час', 'Вікно / канал', 'Усього, мс', 'execute, мс', 'fetch, мс', 'Рядків', 'Запит / дія',
+                  'Помилка']
+KINDS = {SQL: 'SQL', 'ui': 'UI'}
+
+_panel = None
+
+
+def slow_log_path():
+    root = os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation) or os.getcwd(), 'MonitorAir')
+    os.makedirs(root, exist_ok=True)
+    return os.path.join(root, 'slow_queries.log')
+
+
+def _item(value):
+    item = QTableWidgetItem()
+    # Числа як числа - сортування за стовпчиком числове
+    item.setData(Qt.DisplayRole, round(value, 1) if isinstance(value, float) else value)
+    return item
+
+
+def _fill(table, rows):
+    table.setUpdatesEnabled(False)
+    table.setSortingEnabled(False)
+    table.setRowCount(len(rows))
+    for row_index, row in enumerate(rows):
+        for column, value in enumerate(row):
+            table.setItem(row_index, column, _item(value))
+    table.setSortingEnabled(True)
+    table.setUpdatesEnabled(True)
+
+
+def _table(headers, parent):
+    table = QTableWidget(0, len(headers), parent)
+    table.setHorizontalHeaderLabels(headers)
+    table.setEditTriggers(QTableWidget.NoEditTriggers)
+    table.verticalHeader().setHidden(True)
+    table.horizontalHeader().setStretchLastSection(True)
+    return table
+
+
+class PerfPanel(QDockWidget):
+    def __init__(self, parent=None):
+        super().__init__('Продуктивність', parent)
+        self.setObjectName('perf_panel')
+        widget = QWidget(self)
+        layout = QVBoxLayout(widget)
+
+        controls = QHBoxLayout()
+        self.summary_label = QLabel(widget)
+        controls.addWidget(self.summary_label, 1)
+        controls.addWidget(QLabel('Повільні від, мс:', widget))
+        self.slow_spin = QSpinBox(widget)
+        self.slow_spin.setRange(1, 600000)
+        self.slow_spin.setValue(int(query_log.slow_ms))
+        self.slow_spin.valueChanged.connect(self.on_slow_ms_changed)
+        controls.addWidget(self.slow_spin)
+        self.explain_checkbox = QCheckBox('EXPLAIN (ANALYZE, BUFFERS)', widget)
+        self.explain_checkbox.setToolTip('До повільних SELECT у журналі додається план; запит виконується ще раз')
+        self.explain_checkbox.setChecked(query_log.explain)
+        self.explain_checkbox.toggled.connect(self.on_explain_toggled)
+        controls.addWidget(self.explain_checkbox)
+        clear_button = QPushButton('Очистити', widget)
+        clear_button.clicked.connect(self.clear)
+        controls.addWidget(clear_button)
+        layout.addLayout(controls)
+
+        self.tabs = QTabWidget(widget)
+        self.queries_table = _table(SUMMARY_HEADERS, widget)
+        self.sources_table = _table(SOURCE_HEADERS, widget)
+        self.recent_table = _table(RECENT_HEADERS, widget)
+        self.tabs.addTab(self.queries_table, 'Запити')
+        self.tabs.addTab(self.sources_table, 'Вікна')
+        self.tabs.addTab(self.recent_table, 'Останні')
+        self.tabs.currentChanged.connect(self.refresh)
+        layout.addWidget(self.tabs)
+        self.setWidget(widget)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def on_slow_ms_changed(self, value):
+        query_log.slow_ms = value
+
+    def on_explain_toggled(self, checked):
+        query_log.explain = checked
+
+    def clear(self):
+        query_log.clear()
+        self.refresh()
+
+    def refresh(self):
+        records = query_log.snapshot()
+        self.summary_label.setText(f"Записів: {len(records)}  повільних: {query_log.slow_count}  "
+                                   f"журнал: {query_log.slow_log_path or '-'}")
+        # Перераховується лише видима вкладка
+        table = self.tabs.currentWidget()
+        if table is self.recent_table:
+            rows = [(datetime.fromtimestamp(r.started).strftime('%H:%M:%S.%f')[:-3], r.source, r.total_ms,
+                     r.execute_ms, r.fetch_ms, r.rows, r.text, r.error or '') for r in reversed(records[-RECENT_ROWS:])]
+        else:
+            key = 'source' if table is self.sources_table else 'text'
+            summary = query_log.summary(key)
+            rows = [(KINDS.get(kind, kind), name, s['count'], s['p50'], s['p95'], s['p99'], s['max'], s['rows'],
+                     s['errors'])
+                    for (kind, name), s in sorted(summary.items(), key=lambda item: -item[1]['p95'])]
+        _fill(table, rows)
+
+
+def perf_panel():
+    global _panel
+    if _panel is None or sip.isdeleted(_panel):
+        _panel = PerfPanel()
+    return _panel
+
+
+def show_perf_panel(host):
+    # У QMainWindow панель прикріплюється знизу, в інших вікнах - плаває над ними
+    panel = perf_panel()
+    if isinstance(host, QMainWindow):
+        if panel.parent() is not host:
+            host.addDockWidget(Qt.BottomDockWidgetArea, panel)
+        panel.setFloating(False)
+    else:
+        if panel.parent() is not host:
+            panel.setParent(host)
+        panel.setFloating(True)
+        if not panel.isVisible():
+            panel.resize(1000, 400)
+    panel.show()
+    panel.raise_()
+
+
+def toggle_perf_panel(host):
+    panel = perf_panel()
+    if panel.isVisible() and panel.parent() is host:
+        panel.hide()
+    else:
+        show_perf_panel(host)
+
+
+def install_perf_shortcut(window):
+    shortcut = QShortcut(QKeySequence(SHORTCUT), window)
+    shortcut.activated.connect(lambda: toggle_perf_panel(window))
+    return shortcut
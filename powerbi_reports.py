@@ -0,0 +1,340 @@
+"""Звіти, які раніше відкривалися як сторінки app.powerbi.com у QWebEngineView.
+
+Тепер вони рахуються прямо з представлень PostgreSQL і малюються matplotlib у самому
+вікні - без окремого процесу Chromium, без мережі й сертифікатів:
+    PowerBIApp_first          - список підключених станцій;
+    PowerBIApp_second         - результати вимірювань станції за період, по добах;
+    PowerBIReportCountValues  - кількість отриманих значень за період.
+Звіти за період беруть повні години з погодинних агрегатів (rollups.daily_aggregates),
+а сирі рядки - лише на краях періоду.
+"""
+import time as timer
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QComboBox,
+    QPushButton,
+    QMainWindow,
+    QDateEdit,
+    QLabel,
+    QTableWidget,
+    QTableWidgetItem,
+    QSplitter,
+    QSizePolicy
+)
+from PyQt5.QtCore import QDate, Qt
+from matplotlib import dates as mdates
+from matplotlib.figure import Figure
+
+from query_cache import cached_fetch_all
+from query_log import ui_timer
+from rollups import daily_aggregates
+from station_chart import STATION_LIST_TTL, STATION_TZ, ChartCanvas
+from tables_form import default_for_buttons, default_for_combobox, default_for_datetime, set_busy
+
+DEFAULT_PERIOD_DAYS = 30
+TOP_STATIONS = 15  # скільки станцій показувати на графіку кількості значень
+NO_STATUS = 'без статусу'  # замість NULL у "Статус"
+
+stations_query = 'SELECT "Адреса", "Статус", "Вимір" FROM connected_stations_without_dublicate'
+station_names_query = "SELECT DISTINCT Адреса FROM connected_stations_without_dublicate"
+
+
+def summarize_stations(rows):
+    # (Адреса, Статус, Вимір) -> [(адреса, статус, кількість вимірів, виміри)], статуси, виміри
+    units = defaultdict(set)
+    statuses = {}
+    for address, status, unit in rows:
+        statuses[address] = NO_STATUS if status is None else status
+        if unit is not None:
+            units[address].add(unit)
+    table = [(address, statuses[address], len(units[address]), ', '.join(sorted(units[address])))
+             for address in sorted(statuses)]
+    status_counts = Counter(statuses.values())
+    unit_counts = Counter(unit for address_units in units.values() for unit in address_units)
+    return table, status_counts, unit_counts
+
+
+def summarize_daily(rows):
+    # Рядки daily_aggregates -> підсумок по кожному виміру за весь період і середнє по добах
+    totals = {}
+    daily = defaultdict(list)
+    for _, unit, day, min_value, max_value, sum_value, count_value in rows:
+        if not count_value:
+            continue
+        total = totals.setdefault(unit, [min_value, max_value, 0, 0, 0])
+        total[0] = min(total[0], min_value)
+        total[1] = max(total[1], max_value)
+        total[2] += sum_value
+        total[3] += count_value
+        total[4] += 1
+        daily[unit].append((day, float(sum_value) / count_value))
+    table = [(unit, float(min_value), float(max_value), float(sum_value) / count, count, days)
+             for unit, (min_value, max_value, sum_value, count, days) in sorted(totals.items())]
+    return table, daily
+
+
+def summarize_counts(rows):
+    # Рядки daily_aggregates -> кількість значень по добах, по вимірах і по станціях
+    per_day = Counter()
+    per_unit = Counter()
+    per_station = defaultdict(Counter)
+    for address, unit, day, _, _, _, count_value in rows:
+        per_day[day] += count_value
+        per_unit[unit] += count_value
+        per_station[address][unit] += count_value
+    return per_day, per_unit, per_station
+
+
+def fill_table(table, headers, rows):
+    table.setUpdatesEnabled(False)
+    table.setSortingEnabled(False)
+    table.clear()
+    table.setColumnCount(len(headers))
+    table.setHorizontalHeaderLabels(headers)
+    table.setRowCount(len(rows))
+    for row_index, row in enumerate(rows):
+        for column, value in enumerate(row):
+            item = QTableWidgetItem()
+            # Числа кладемо як числа, щоб сортування за стовпчиком було числовим
+            if isinstance(value, float):
+                item.setData(Qt.DisplayRole, round(value, 2))
+            else:
+                item.setData(Qt.DisplayRole, value)
+            table.setItem(row_index, column, item)
+    table.setSortingEnabled(True)
+    table.resizeColumnsToContents()
+    table.setUpdatesEnabled(True)
+
+
+class LocalReportWindow(QMainWindow):
+    # Спільна частина звітів: рядок керування, графік matplotlib і таблиця під ним.
+    # Запит виконується у фоні через QueryExecutor у власному каналі звіту;
+    # звіт визначає, що запитати (refresh), і як показати результат (show_result).
+    channel = None
+
+    def __init__(self, pool, executor, title):
+        super().__init__()
+        self.setWindowTitle(title)
+        self.setGeometry(100, 100, 1500, 900)
+        self.pool = pool
+        self.executor = executor
+        self.started = None
+        self.status_text = ''
+
+        main_layout = QVBoxLayout()
+        self.controls_layout = QHBoxLayout()
+        main_layout.addLayout(self.controls_layout)
+
+        self.show_button = QPushButton('Показати', self)
+        self.show_button.setStyleSheet(default_for_buttons)
+        self.show_button.clicked.connect(self.refresh)
+
+        self.status_label = QLabel(self)
+        main_layout.addWidget(self.status_label)
+
+        self.figure = Figure(figsize=(5, 4))
+        self.canvas = ChartCanvas(self.figure, self.channel)
+        self.table = QTableWidget(self)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        splitter = QSplitter(Qt.Vertical, self)
+        splitter.addWidget(self.canvas)
+        splitter.addWidget(self.table)
+        splitter.setSizes([600, 300])
+        main_layout.addWidget(splitter)
+
+        central_widget = QWidget()
+        central_widget.setLayout(main_layout)
+        self.setCentralWidget(central_widget)
+
+        self.executor.busy_changed.connect(self.on_busy_changed)
+
+    def add_period_controls(self):
+        end_date = QDate.currentDate()
+        self.start_date_edit = QDateEdit(end_date.addDays(-DEFAULT_PERIOD_DAYS + 1))
+        self.end_date_edit = QDateEdit(end_date)
+        for date_edit in (self.start_date_edit, self.end_date_edit):
+            date_edit.setStyleSheet(default_for_datetime)
+            date_edit.setCalendarPopup(True)
+            date_edit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+            date_edit.dateChanged.connect(self.cancel_query)
+            self.controls_layout.addWidget(date_edit, stretch=1)
+
+    def period(self):
+        # Як і в графіку станції: повні доби з поясом +03
+        start_date = datetime.combine(self.start_date_edit.date().toPyDate(), time.min, STATION_TZ)
+        end_date = datetime.combine(self.end_date_edit.date().toPyDate(), time(23, 59, 59), STATION_TZ)
+        return start_date, end_date
+
+    def submit(self, fn, *args):
+        self.started = timer.perf_counter()
+        self.executor.submit(self.channel, fn, *args, on_result=self.on_result, on_error=self.on_error)
+
+    def cancel_query(self):
+        self.executor.cancel(self.channel)
+
+    def on_busy_changed(self, channel, busy):
+        if channel == self.channel:
+            set_busy(self.canvas, busy)
+            self.show_button.setEnabled(not busy)
+
+    def on_result(self, rows):
+        try:
+            with ui_timer(f'{type(self).__name__}.show_result', self.channel, rows=len(rows)):
+                self.show_result(rows)
+        except Exception as e:
+            print(f"Error in {type(self).__name__}.show_result: {e}")
+            return
+        self.canvas.draw_idle()
+        elapsed = (timer.perf_counter() - self.started) * 1000
+        self.status_label.setText(f"{self.status_text}    (сформовано за {elapsed:.0f} мс)")
+
+    def on_error(self, error):
+        self.status_label.setText(f"Помилка: {error}")
+        print(f"Error in {type(self).__name__}: {error}")
+
+    def refresh(self):
+        # Запит звіту через self.submit
+        raise NotImplementedError
+
+    def show_result(self, rows):
+        # Таблиця й графік за рядками результату; status_text - підсумок для рядка стану
+        raise NotImplementedError
+
+
+class PowerBIApp_first(LocalReportWindow):
+    channel = 'stations_report'
+
+    def __init__(self, pool, executor):
+        super().__init__(pool, executor, 'Список підключених станцій')
+        self.show_button.setText('Оновити')
+        self.controls_layout.addWidget(self.show_button)
+        self.status_ax, self.units_ax = self.figure.subplots(1, 2, gridspec_kw={'width_ratios': [1, 2]})
+        self.refresh()
+
+    def refresh(self):
+        self.submit(cached_fetch_all, stations_query, None, STATION_LIST_TTL)
+
+    def show_result(self, rows):
+        table, status_counts, unit_counts = summarize_stations(rows)
+        fill_table(self.table, ['Адреса', 'Статус', 'Кількість вимірів', 'Виміри'], table)
+
+        self.status_ax.clear()
+        # Статус у поданні може бути й не текстом - порядок і підписи за текстовим поданням
+        statuses = sorted(status_counts, key=str)
+        self.status_ax.bar([str(status) for status in statuses], [status_counts[status] for status in statuses],
+                           color='tab:blue')
+        self.status_ax.set_title('Станції за статусом')
+        self.status_ax.set_ylabel('Кількість станцій')
+
+        self.units_ax.clear()
+        units = sorted(unit_counts, key=unit_counts.get)
+        self.units_ax.barh(units, [unit_counts[unit] for unit in units], color='tab:green')
+        self.units_ax.set_title('Скільки станцій вимірює кожну величину')
+        self.units_ax.set_xlabel('Кількість станцій')
+        self.units_ax.grid(True, axis='x')
+        self.figure.tight_layout()
+        self.status_text = f"Станцій: {len(table)}  " + '  '.join(
+            f"{status}: {status_counts[status]}" for status in statuses)
+
+
+class PowerBIApp_second(LocalReportWindow):
+    channel = 'period_report'
+
+    def __init__(self, pool, executor):
+        super().__init__(pool, executor, 'Результати вимірювань станції за часовий період')
+        self.address_combobox = QComboBox(self)
+        self.address_combobox.setStyleSheet(default_for_combobox)
+        self.address_combobox.currentIndexChanged.connect(self.cancel_query)
+        self.controls_layout.addWidget(self.address_combobox, stretch=2)
+        self.add_period_controls()
+        self.controls_layout.addWidget(self.show_button)
+        self.ax = self.figure.subplots()
+        self.populate_addresses()
+
+    def populate_addresses(self):
+        self.executor.submit('period_report_stations', cached_fetch_all, station_names_query, None, STATION_LIST_TTL,
+                             on_result=self.on_address_names)
+
+    def on_address_names(self, rows):
+        self.address_combobox.addItems(sorted(row[0] for row in rows))
+
+    def refresh(self):
+        address = self.address_combobox.currentText()
+        if not address:
+            return
+        start_date, end_date = self.period()
+        self.submit(daily_aggregates, start_date, end_date, address, STATION_TZ.utcoffset(None))
+
+    def show_result(self, rows):
+        table, daily = summarize_daily(rows)
+        fill_table(self.table, ['Вимір', 'Мінімум', 'Максимум', 'Середнє', 'Кількість значень', 'Днів з даними'],
+                   table)
+
+        self.ax.clear()
+        for unit, points in sorted(daily.items()):
+            days, values = zip(*points)
+            self.ax.plot(days, values, marker='o', markersize=3, linewidth=1, label=unit)
+        self.ax.set_title(f'Середні за добу значення: {self.address_combobox.currentText()}')
+        self.ax.set_xlabel('Дата')
+        self.ax.set_ylabel('Значення')
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        self.ax.tick_params(axis='x', labelrotation=30)
+        self.ax.grid(True)
+        if daily:
+            self.ax.legend(loc='upper left')
+        self.figure.tight_layout()
+        self.status_text = f"Вимірів: {len(table)}  значень: {sum(row[4] for row in table)}"
+
+
+class PowerBIReportCountValues(LocalReportWindow):
+    channel = 'count_values_report'
+
+    def __init__(self, pool, executor):
+        super().__init__(pool, executor, 'Кількість отриманих значень')
+        self.add_period_controls()
+        self.controls_layout.addWidget(self.show_button)
+        grid = self.figure.add_gridspec(2, 2)
+        self.day_ax = self.figure.add_subplot(grid[0, :])
+        self.unit_ax = self.figure.add_subplot(grid[1, 0])
+        self.station_ax = self.figure.add_subplot(grid[1, 1])
+        self.refresh()
+
+    def refresh(self):
+        start_date, end_date = self.period()
+        self.submit(daily_aggregates, start_date, end_date, None, STATION_TZ.utcoffset(None))
+
+    def show_result(self, rows):
+        per_day, per_unit, per_station = summarize_counts(rows)
+        units = sorted(per_unit)
+        table = sorted(((address, sum(counts.values()), *(counts[unit] for unit in units))
+                        for address, counts in per_station.items()), key=lambda row: -row[1])
+        fill_table(self.table, ['Адреса', 'Усього'] + units, table)
+
+        self.day_ax.clear()
+        # Усі доби періоду, включно з тими, коли не надійшло жодного значення
+        first_day, last_day = (day.date() for day in self.period())
+        days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+        self.day_ax.bar(days, [per_day.get(day, 0) for day in days], color='tab:blue', width=0.8)
+        self.day_ax.set_title('Отримано значень по добах')
+        self.day_ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        self.day_ax.grid(True, axis='y')
+
+        self.unit_ax.clear()
+        units_by_count = sorted(units, key=per_unit.get)
+        self.unit_ax.barh(units_by_count, [per_unit[unit] for unit in units_by_count], color='tab:green')
+        self.unit_ax.set_title('По вимірах')
+        self.unit_ax.grid(True, axis='x')
+
+        self.station_ax.clear()
+        top = table[:TOP_STATIONS][::-1]
+        self.station_ax.barh([row[0] for row in top], [row[1] for row in top], color='tab:orange')
+        self.station_ax.set_title(f'Станції з найбільшою кількістю значень (перші {TOP_STATIONS})')
+        self.station_ax.tick_params(axis='y', labelsize=8)
+        self.station_ax.grid(True, axis='x')
+        self.figure.tight_layout()
+        self.status_text = f"Усього значень: {sum(per_unit.values())}  станцій: {len(per_station)}"
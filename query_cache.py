@@ -0,0 +1,117 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from data_access import execute_prepared
+
+DEFAULT_TTL = object()
+
+# Рядки в лапках залишаємо як є, а будь-які інші пробіли й переноси стискаємо до одного пробілу
+_sql_tokens = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|\s+")
+
+
+def normalize_sql(query):
+    if not isinstance(query, str):
+        query = str(query)
+    return _sql_tokens.sub(lambda m: m.group(1) or ' ', query).strip()
+
+
+def _freeze(params):
+    if params is None:
+        return ()
+    if isinstance(params, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in params.items()))
+    if isinstance(params, (list, tuple)):
+        return tuple(_freeze(p) for p in params)
+    return params
+
+
+class QueryCache:
+    # LRU-кеш результатів запитів з окремим терміном життя для кожного запису.
+    # ttl=None - запис не застаріває (наприклад, агрегати за період, що вже минув).
+    def __init__(self, maxsize=256, default_ttl=60):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()   # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(query, params=None):
+        return normalize_sql(query), _freeze(params)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, ttl=DEFAULT_TTL):
+        if ttl is DEFAULT_TTL:
+            ttl = self.default_ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate=None):
+        with self.lock:
+            if predicate is None:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if predicate(key[0])]:
+                del self.entries[key]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+query_cache = QueryCache()
+
+
+def cached_fetch_all(connection, query, params=None, ttl=DEFAULT_TTL, cache=query_cache, fetch=None):
+    # fetch(connection, *params) - інший спосіб отримати той самий результат, що й query
+    # (наприклад, з агрегатів); ключем кешу все одно лишається query
+    key = cache.key(query, params)
+    hit, rows = cache.get(key)
+    if hit:
+        return rows
+    if fetch is not None:
+        rows = fetch(connection, *params)
+    else:
+        # Після закінчення ttl той самий запит виконується знову - вже підготовленим
+        cursor = connection.cursor()
+        execute_prepared(cursor, query, params)
+        rows = cursor.fetchall()
+    cache.put(key, rows, ttl)
+    return rows
+
+
+def format_cache_stats(stats):
+    return (f"Кеш запитів: {stats['size']}/{stats['maxsize']}  влучань: {stats['hits']}  "
+            f"промахів: {stats['misses']} ({stats['hit_rate']:.0%})")
@@ -0,0 +1,219 @@
+import itertools
+import threading
+
+import psycopg2
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from query_log import query_source
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class _TaskSignals(QObject):
+    started = pyqtSignal(int)
+    batch = pyqtSignal(int, object)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+
+
+class QueryTask(QRunnable):
+    def __init__(self, job, fn, args, stream):
+        super().__init__()
+        self.job = job
+        self.fn = fn
+        self.args = args
+        self.stream = stream
+        self.signals = _TaskSignals()
+
+    def run(self):
+        # Запити завдання записуються в query_log під назвою його каналу
+        with query_source(self.job.channel):
+            self._run()
+
+    def _run(self):
+        job = self.job
+        if job.cancelled:
+            self.signals.failed.emit(job.job_id, QueryCancelled())
+            return
+        pool = job.executor.pool
+        try:
+            connection = pool.getconn()
+        except psycopg2.Error as e:
+            self.signals.failed.emit(job.job_id, e)
+            return
+        # Під тим самим замком, що й QueryJob.cancel: скасування або бачить з'єднання і зупиняє
+        # запит на сервері, або вже позначене і запит не починається
+        with job.lock:
+            cancelled = job.cancelled
+            if not cancelled:
+                job.connection = connection
+        if cancelled:
+            pool.putconn(connection)
+            self.signals.failed.emit(job.job_id, QueryCancelled())
+            return
+        self.signals.started.emit(job.job_id)
+        batches = None
+        broken = False
+        try:
+            if self.stream:
+                # Генератор віддає результат частинами - кожна частина йде у віджет окремим сигналом
+                batches = self.fn(connection, *self.args)
+                for batch in batches:
+                    if job.cancelled:
+                        raise QueryCancelled()
+                    self.signals.batch.emit(job.job_id, batch)
+                result = None
+            else:
+                result = self.fn(connection, *self.args)
+            self.signals.finished.emit(job.job_id, result)
+        except Exception as e:
+            if batches is not None:
+                batches.close()
+            broken = connection.closed != 0
+            if job.cancelled or isinstance(e, psycopg2.extensions.QueryCanceledError):
+                e = QueryCancelled()
+            self.signals.failed.emit(job.job_id, e)
+        finally:
+            with job.lock:
+                job.connection = None
+            # Пул сам відкотить незавершену транзакцію і замінить зламане з'єднання
+            pool.putconn(connection, discard=broken)
+
+
+class QueryJob:
+    def __init__(self, executor, job_id, channel, on_result, on_error, on_batch):
+        self.executor = executor
+        self.job_id = job_id
+        self.channel = channel
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_batch = on_batch
+        self.cancelled = False
+        self.connection = None
+        self.signals = None
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            if self.connection is not None:
+                # Зупиняємо запит на сервері, а не лише ігноруємо його результат
+                try:
+                    self.connection.cancel()
+                except psycopg2.Error:
+                    pass
+
+
+class QueryExecutor(QObject):
+    # Виконує запити у пулі робочих потоків і повертає результати віджетам через сигнали.
+    # Канал (channel) - це "місце" у вікні, яке чекає на дані: новий запит у тому ж каналі
+    # скасовує попередній, і його застарілий результат уже не потрапить у віджет.
+    busy_changed = pyqtSignal(str, bool)
+
+    _ids = itertools.count(1)
+
+    def __init__(self, pool, parent=None):
+        super().__init__(parent)
+        self.pool = pool
+        # Кожен робочий потік бере власне з'єднання з пулу, тож потоків не більше, ніж з'єднань
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(pool.maxconn)
+        self.jobs = {}
+        self.current = {}
+
+    def submit(self, channel, fn, *args, on_result=None, on_error=None, on_batch=None, stream=False):
+        self.cancel(channel)
+        job = QueryJob(self, next(self._ids), channel, on_result, on_error, on_batch)
+        self.jobs[job.job_id] = job
+        self.current[channel] = job.job_id
+
+        task = QueryTask(job, fn, args, stream)
+        job.signals = task.signals
+        task.signals.batch.connect(self._on_batch)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self.busy_changed.emit(channel, True)
+        self.thread_pool.start(task)
+        return job.job_id
+
+    def submit_stream(self, channel, fn, *args, on_batch=None, on_result=None, on_error=None):
+        return self.submit(channel, fn, *args, on_result=on_result, on_error=on_error, on_batch=on_batch,
+                           stream=True)
+
+    def cancel(self, channel):
+        job_id = self.current.pop(channel, None)
+        if job_id is None:
+            return
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+        self.busy_changed.emit(channel, False)
+
+    def cancel_all(self):
+        for channel in list(self.current):
+            self.cancel(channel)
+
+    def is_busy(self, channel):
+        return channel in self.current
+
+    def _is_current(self, job):
+        return self.current.get(job.channel) == job.job_id and not job.cancelled
+
+    def _on_batch(self, job_id, batch):
+        job = self.jobs.get(job_id)
+        if job is not None and self._is_current(job) and job.on_batch is not None:
+            job.on_batch(batch)
+
+    def _finish(self, job_id):
+        job = self.jobs.pop(job_id, None)
+        if job is None:
+            return None
+        current = self._is_current(job)
+        if current:
+            del self.current[job.channel]
+            self.busy_changed.emit(job.channel, False)
+        return job if current else None
+
+    def _on_finished(self, job_id, result):
+        job = self._finish(job_id)
+        if job is not None and job.on_result is not None:
+            job.on_result(result)
+
+    def _on_failed(self, job_id, error):
+        job = self._finish(job_id)
+        if job is None or isinstance(error, QueryCancelled):
+            return
+        if job.on_error is not None:
+            job.on_error(error)
+        else:
+            print(f'Error: {error}')
+
+
+def fetch_all(connection, query, params=None):
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+_cursor_names = itertools.count(1)
+
+
+def stream_rows(connection, query, params=None, itersize=2000):
+    # Іменований (серверний) курсор: PostgreSQL віддає рядки порціями по itersize,
+    # тож у пам'яті клієнта ніколи не буває більше однієї порції
+    cursor = connection.cursor(name=f'stream_{next(_cursor_names)}')
+    cursor.itersize = itersize
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(itersize)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            cursor.close()
+        except psycopg2.Error:
+            pass
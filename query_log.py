@@ -0,0 +1,322 @@
+"""Журнал запитів і витрат інтерфейсу: кільцевий буфер, перцентилі й журнал повільних запитів.
+
+Кожен курсор з'єднань пулу - InstrumentedCursor (cursor_factory у psycopg2.connect), тож
+для кожного запиту без змін у місцях виклику зберігаються текст, параметри, кількість
+рядків, час execute і час читання рядків (fetch*), а також помилка, якщо запит упав.
+Запис прив'язується до каналу QueryExecutor, у якому виконувався запит ('table', 'chart',
+'report', ...), - тобто до місця у вікні, що чекає на дані. Витрати інтерфейсу (заповнення
+таблиці, малювання графіка) додаються через ui_timer з тими самими назвами каналів.
+
+Запити, довші за SLOW_QUERY_MS, дописуються у файл журналу повільних запитів; з explain=True
+для SELECT до запису додається план EXPLAIN (ANALYZE, BUFFERS). ANALYZE виконує запит ще раз,
+тож це вмикається лише на час пошуку причини.
+
+    python query_log.py --dsn "dbname=MonitorAir" --slow-ms 50 --explain \\
+        "SELECT * FROM station_measurment_time_view WHERE \\"Адреса\\" = %s" "Київ, ..."
+"""
+import argparse
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import psycopg2
+from psycopg2 import sql
+
+from data_access import prepared_queries
+from query_cache import normalize_sql
+
+RING_SIZE = 5000      # останніх записів у пам'яті
+SLOW_QUERY_MS = 500
+PARAMS_CHARS = 200    # параметри в журналі обрізаються до цієї довжини
+SQL, UI = 'sql', 'ui'
+
+_local = threading.local()
+
+
+class QueryRecord:
+    # Курсор дописує в запис час читання й рядки, поки програма їх читає
+    __slots__ = ('started', 'kind', 'source', 'text', 'params', 'rows', 'execute_ms', 'fetch_ms', 'error')
+
+    def __init__(self, kind, source, text, params=None):
+        self.started = time.time()
+        self.kind = kind
+        self.source = source
+        self.text = text
+        self.params = params
+        self.rows = 0
+        self.execute_ms = 0.0
+        self.fetch_ms = 0.0
+        self.error = None
+
+    @property
+    def total_ms(self):
+        return self.execute_ms + self.fetch_ms
+
+
+def percentile(sorted_values, fraction):
+    # Найближчий ранг: значення, не менше за яке fraction усіх вимірів
+    if not sorted_values:
+        return 0.0
+    # round(..., 9) - щоб похибка множення (0.07 * 100 = 7.000000000000001) не додавала ранг
+    index = min(len(sorted_values) - 1, max(0, math.ceil(round(fraction * len(sorted_values), 9)) - 1))
+    return sorted_values[index]
+
+
+class QueryLog:
+    def __init__(self, size=RING_SIZE, slow_ms=SLOW_QUERY_MS):
+        self.records = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.slow_ms = slow_ms
+        self.slow_log_path = None
+        self.explain = False
+        self.slow_count = 0
+        self.slow_lock = threading.Lock()
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+        return record
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.records)
+
+    def summary(self, key='text', kind=None):
+        # {ключ: {count, p50, p95, p99, max, rows, errors}} по записах буфера;
+        # key='text' - по запитах (і назвах витрат інтерфейсу), key='source' - по каналах вікон
+        groups = {}
+        for record in self.snapshot():
+            if kind is None or record.kind == kind:
+                groups.setdefault((record.kind, getattr(record, key)), []).append(record)
+        summary = {}
+        for (record_kind, name), records in groups.items():
+            times = sorted(r.total_ms for r in records)
+            summary[(record_kind, name)] = {
+                'count': len(records),
+                'p50': percentile(times, 0.5),
+                'p95': percentile(times, 0.95),
+                'p99': percentile(times, 0.99),
+                'max': times[-1],
+                'rows': sum(r.rows for r in records) / len(records),
+                'errors': sum(1 for r in records if r.error),
+            }
+        return summary
+
+    def configure_slow_log(self, path, slow_ms=None, explain=None):
+        self.slow_log_path = path
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if explain is not None:
+            self.explain = explain
+
+    def is_slow(self, record):
+        return record.kind == SQL and record.total_ms >= self.slow_ms
+
+    def write_slow(self, record, plan=None):
+        self.slow_count += 1
+        if not self.slow_log_path:
+            return
+        lines = [f"{datetime.fromtimestamp(record.started).isoformat(timespec='milliseconds')} "
+                 f"{record.total_ms:.1f} ms (execute {record.execute_ms:.1f}, fetch {record.fetch_ms:.1f}) "
+                 f"rows {record.rows} [{record.source}]{' ERROR ' + record.error if record.error else ''}",
+                 f"    {record.text}"]
+        if record.params:
+            lines.append(f"    params: {record.params}")
+        lines += [f"    | {line}" for line in plan or ()]
+        with self.slow_lock:
+            try:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as log:
+                    log.write('\n'.join(lines) + '\n')
+            except OSError as e:
+                print(f"Error in slow query log: {e}")
+
+
+query_log = QueryLog()
+
+
+def current_source():
+    return getattr(_local, 'source', None) or threading.current_thread().name
+
+
+@contextmanager
+def query_source(name):
+    # Запити всередині блоку належать каналу name (QueryTask ставить канал свого завдання)
+    previous = getattr(_local, 'source', None)
+    _local.source = name
+    try:
+        yield
+    finally:
+        _local.source = previous
+
+
+@contextmanager
+def ui_timer(name, source=None, rows=0):
+    # Витрати інтерфейсу: заповнення таблиці, малювання графіка тощо
+    record = QueryRecord(UI, source or current_source(), name)
+    record.rows = rows
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.execute_ms = (time.perf_counter() - started) * 1000
+        query_log.add(record)
+
+
+def statement_text(text):
+    # EXECUTE q_... (data_access.execute_prepared) записується текстом підготовленого запиту
+    if text.startswith('EXECUTE '):
+        query = prepared_queries.get(text[len('EXECUTE '):].split('(', 1)[0].strip())
+        if query is not None:
+            return normalize_sql(query)
+    return text
+
+
+def _params_text(params):
+    if params is None:
+        return None
+    text = repr(params)
+    return text if len(text) <= PARAMS_CHARS else text[:PARAMS_CHARS] + '...'
+
+
+def explain_plan(connection, query, params):
+    # EXPLAIN (ANALYZE, BUFFERS) у точці збереження, щоб помилка не зламала транзакцію програми;
+    # для підготовленого запиту - EXPLAIN ... EXECUTE q_... з тими самими параметрами
+    text = statement_text(normalize_sql(query if isinstance(query, str) else query.as_string(connection)))
+    if not text.upper().startswith('SELECT'):
+        return None
+    statement = sql.SQL('EXPLAIN (ANALYZE, BUFFERS) ') + (sql.SQL(query) if isinstance(query, str) else query)
+    cursor = psycopg2.extensions.cursor(connection)
+    savepoint = not connection.autocommit
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT query_log_explain')
+        cursor.execute(statement, params)
+        plan = [line for line, in cursor.fetchall()]
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT query_log_explain')
+        return plan
+    except psycopg2.Error as e:
+        if savepoint:
+            try:
+                cursor.execute('ROLLBACK TO SAVEPOINT query_log_explain')
+            except psycopg2.Error:
+                pass
+        return [f'EXPLAIN failed: {e}'.strip()]
+    finally:
+        cursor.close()
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    # Звичайний курсор psycopg2, який записує кожен запит у query_log
+    record = None
+    query = None
+    query_params = None
+
+    def execute(self, query, params=None):
+        self._finish()
+        text = statement_text(normalize_sql(query if isinstance(query, str) else query.as_string(self.connection)))
+        record = QueryRecord(SQL, current_source(), text, _params_text(params))
+        self.record, self.query, self.query_params = record, query, params
+        started = time.perf_counter()
+        try:
+            return super().execute(query, params)
+        except Exception as e:
+            record.error = str(e).strip()
+            raise
+        finally:
+            record.execute_ms = (time.perf_counter() - started) * 1000
+            if self.name is None:
+                # Результат звичайного курсора вже на клієнті - кількість рядків відома одразу
+                record.rows = max(self.rowcount, 0)
+            query_log.add(record)
+            if self.name is None or record.error:
+                self._check_slow()
+
+    def copy_expert(self, query, file, size=8192):
+        self._finish()
+        record = query_log.add(QueryRecord(SQL, current_source(), normalize_sql(query)))
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(query, file, size)
+        except Exception as e:
+            record.error = str(e).strip()
+            raise
+        finally:
+            record.execute_ms = (time.perf_counter() - started) * 1000
+            record.rows = max(self.rowcount, 0)
+            if query_log.is_slow(record):
+                query_log.write_slow(record)
+
+    def _fetched(self, started, rows):
+        if self.record is not None:
+            self.record.fetch_ms += (time.perf_counter() - started) * 1000
+            if self.name is not None:
+                self.record.rows += len(rows)
+        return rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, [row] if row is not None else [])
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        return self._fetched(started, super().fetchmany() if size is None else super().fetchmany(size))
+
+    def fetchall(self):
+        started = time.perf_counter()
+        return self._fetched(started, super().fetchall())
+
+    def _check_slow(self):
+        record = self.record
+        if not query_log.is_slow(record):
+            return
+        plan = None
+        if query_log.explain and not record.error and not self.connection.closed:
+            plan = explain_plan(self.connection, self.query, self.query_params)
+        query_log.write_slow(record, plan)
+
+    def _finish(self):
+        # Серверний курсор читає рядки порціями - повний час відомий лише після читання
+        if self.record is not None and self.name is not None and not self.record.error:
+            self._check_slow()
+        self.record = None
+
+    def close(self):
+        if not self.closed:
+            self._finish()
+        super().close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default='dbname=MonitorAir')
+    parser.add_argument('--slow-ms', type=float, default=SLOW_QUERY_MS)
+    parser.add_argument('--explain', action='store_true', help='додати EXPLAIN (ANALYZE, BUFFERS) до повільних')
+    parser.add_argument('--log', default='slow_queries.log')
+    parser.add_argument('query')
+    parser.add_argument('params', nargs='*')
+    args = parser.parse_args()
+
+    query_log.configure_slow_log(args.log, args.slow_ms, args.explain)
+    connection = psycopg2.connect(args.dsn, cursor_factory=InstrumentedCursor)
+    cursor = connection.cursor()
+    cursor.execute(args.query, args.params or None)
+    cursor.fetchall()
+    cursor.close()
+    connection.close()
+    for record in query_log.snapshot():
+        print(f"{record.total_ms:8.1f} ms  rows {record.rows:>7}  {record.text[:100]}")
+    print(f"повільних: {query_log.slow_count} (журнал: {args.log})")
+
+
+if __name__ == '__main__':
+    main()
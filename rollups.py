@@ -0,0 +1,356 @@
+"""Погодинні та добові агрегати вимірювань станцій (rollups).
+
+Графік станції рахує MIN/MAX/AVG по сирих рядках station_measurment_time_view.
+Тут ці значення заздалегідь зберігаються по годинах і по добах (UTC) для кожної
+пари (Адреса, Вимір), а запит за довільний період збирається з найгрубіших
+агрегатів, що повністю покривають його, і сирих рядків лише для неповних годин
+на краях. MIN, MAX і кількість значень збігаються з сирим запитом точно; середнє
+рахується як SUM/COUNT у numeric і для стовпчиків з плаваючою комою може
+відрізнятися від сирого AVG в останніх знаках (AVG(float8) накопичує суму у
+float8, і результат залежить від порядку сканування) - не більше ніж на
+AVG_TOLERANCE відносно. Так перевіряє і команда verify.
+"Дата" у представленні має тип timestamptz, межі годин і діб рахуються в UTC.
+
+Оновлення інкрементне: перераховуються лише години від останньої позначки
+(watermark) мінус REFRESH_LOOKBACK, тож рядки, що запізнюються більше ніж на
+цей час, потрапляють у агрегати лише після повного перерахунку (--full).
+
+    python rollups.py --dsn "dbname=MonitorAir user=postgres" create
+    python rollups.py --dsn "dbname=MonitorAir user=postgres" refresh
+    python rollups.py --dsn "..." verify --address "..." --start 2023-11-01 --end 2023-11-30
+"""
+import argparse
+import math
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg2
+
+from data_access import execute_prepared
+
+SOURCE_VIEW = 'station_measurment_time_view'
+HOURLY_TABLE = 'station_measurment_rollup_hourly'
+DAILY_TABLE = 'station_measurment_rollup_daily'
+STATE_TABLE = 'station_measurment_rollup_state'
+
+REFRESH_LOOKBACK = timedelta(hours=2)
+AVG_TOLERANCE = 1e-9  # відносна різниця середнього з агрегатів і сирого AVG (float)
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+raw_aggregate_query = """
+    SELECT "Вимір", MIN("Величина"), MAX("Величина"), AVG("Величина")
+    FROM station_measurment_time_view
+    WHERE "Адреса" = %s AND "Дата" BETWEEN %s AND %s
+    GROUP BY "Вимір"
+"""
+
+# Для verify: те саме з кількістю значень
+raw_verify_query = """
+    SELECT "Вимір", MIN("Величина"), MAX("Величина"), AVG("Величина"), COUNT("Величина")
+    FROM station_measurment_time_view
+    WHERE "Адреса" = %s AND "Дата" BETWEEN %s AND %s
+    GROUP BY "Вимір"
+"""
+
+create_sql = f"""
+CREATE TABLE IF NOT EXISTS {HOURLY_TABLE} AS
+    SELECT date_trunc('hour', "Дата" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+           "Адреса", "Вимір",
+           MIN("Величина") AS min_value, MAX("Величина") AS max_value,
+           SUM("Величина"::numeric) AS sum_value, COUNT("Величина") AS count_value
+    FROM {SOURCE_VIEW}
+    GROUP BY 1, 2, 3
+    WITH NO DATA;
+CREATE INDEX IF NOT EXISTS {HOURLY_TABLE}_address_bucket ON {HOURLY_TABLE} ("Адреса", bucket);
+
+CREATE TABLE IF NOT EXISTS {DAILY_TABLE} (LIKE {HOURLY_TABLE});
+CREATE INDEX IF NOT EXISTS {DAILY_TABLE}_address_bucket ON {DAILY_TABLE} ("Адреса", bucket);
+
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    hourly_watermark timestamptz NOT NULL
+);
+"""
+
+
+def floor_to(moment, step):
+    moment = moment.astimezone(timezone.utc)
+    if step == DAY:
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_to(moment, step):
+    floored = floor_to(moment, step)
+    return floored if floored == moment else floored + step
+
+
+def plan_range(start, end, hourly_watermark):
+    # Ділить закритий інтервал [start, end] на:
+    #   daily  - напіввідкриті інтервали повних діб з добових агрегатів,
+    #   hourly - повні години з погодинних агрегатів,
+    #   raw    - краї, які беруться з сирих рядків (останній включає end).
+    plan = {'daily': [], 'hourly': [], 'raw': []}
+    if hourly_watermark is None or end < start:
+        plan['raw'].append((start, end))
+        return plan
+
+    hour_start = ceil_to(start, HOUR)
+    hour_end = min(floor_to(end, HOUR), floor_to(hourly_watermark, HOUR))
+    if hour_start >= hour_end:
+        plan['raw'].append((start, end))
+        return plan
+
+    if start < hour_start:
+        plan['raw'].append((start, hour_start))
+    day_start = ceil_to(hour_start, DAY)
+    day_end = floor_to(hour_end, DAY)
+    if day_start < day_end:
+        plan['daily'].append((day_start, day_end))
+        if hour_start < day_start:
+            plan['hourly'].append((hour_start, day_start))
+        if day_end < hour_end:
+            plan['hourly'].append((day_end, hour_end))
+    else:
+        plan['hourly'].append((hour_start, hour_end))
+    plan['raw'].append((hour_end, end))
+    return plan
+
+
+def _range_condition(column, ranges, params, inclusive_last=False):
+    parts = []
+    for i, (lower, upper) in enumerate(ranges):
+        upper_op = '<=' if inclusive_last and i == len(ranges) - 1 else '<'
+        parts.append(f'({column} >= %s AND {column} {upper_op} %s)')
+        params.extend((lower, upper))
+    return ' OR '.join(parts)
+
+
+def build_aggregate_query(address, plan, avg_cast='', with_count=False):
+    params = []
+    sources = []
+    for table, ranges in ((DAILY_TABLE, plan['daily']), (HOURLY_TABLE, plan['hourly'])):
+        if not ranges:
+            continue
+        params.append(address)
+        condition = _range_condition('bucket', ranges, params)
+        sources.append(f"""
+            SELECT "Вимір", min_value, max_value, sum_value, count_value
+            FROM {table} WHERE "Адреса" = %s AND ({condition})""")
+    if plan['raw']:
+        params.append(address)
+        condition = _range_condition('"Дата"', plan['raw'], params, inclusive_last=True)
+        sources.append(f"""
+            SELECT "Вимір", MIN("Величина"), MAX("Величина"), SUM("Величина"::numeric), COUNT("Величина")
+            FROM {SOURCE_VIEW} WHERE "Адреса" = %s AND ({condition})
+            GROUP BY 1""")
+    query = f"""
+        SELECT "Вимір", MIN(min_value), MAX(max_value),
+               (SUM(sum_value) / NULLIF(SUM(count_value), 0)){avg_cast}{', SUM(count_value)' if with_count else ''}
+        FROM ({' UNION ALL '.join(sources)}) AS parts (
+            "Вимір", min_value, max_value, sum_value, count_value)
+        GROUP BY "Вимір"
+    """
+    return query, params
+
+
+def rollup_state(connection):
+    # None, якщо агрегати ще не створені або жодного разу не оновлювались
+    cursor = connection.cursor()
+    execute_prepared(cursor, "SELECT to_regclass(%s) IS NOT NULL AND to_regclass(%s) IS NOT NULL",
+                     (STATE_TABLE, HOURLY_TABLE))
+    if not cursor.fetchone()[0]:
+        return None, ''
+    execute_prepared(cursor, f"SELECT hourly_watermark FROM {STATE_TABLE}")
+    row = cursor.fetchone()
+    if row is None:
+        return None, ''
+    # AVG по float повертає double precision, по numeric та цілих - numeric
+    execute_prepared(cursor, """
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attname = 'min_value'
+    """, (HOURLY_TABLE,))
+    value_type = cursor.fetchone()[0]
+    avg_cast = '::double precision' if value_type in ('real', 'double precision') else ''
+    return row[0], avg_cast
+
+
+def station_aggregates(connection, address, start, end):
+    # Те саме, що raw_aggregate_query, але з агрегатів, якщо вони є. Запит кожної форми плану
+    # (скільки діб/годин/країв) готується на з'єднанні один раз, далі змінюються лише параметри
+    watermark, avg_cast = rollup_state(connection)
+    cursor = connection.cursor()
+    if watermark is None:
+        execute_prepared(cursor, raw_aggregate_query, (address, start, end))
+    else:
+        query, params = build_aggregate_query(address, plan_range(start, end, watermark), avg_cast)
+        execute_prepared(cursor, query, params)
+    return cursor.fetchall()
+
+
+def daily_aggregates(connection, start, end, address=None, utc_offset=timedelta(hours=3)):
+    # MIN/MAX/SUM/COUNT по добах місцевого часу (UTC + utc_offset) для кожної пари (Адреса, Вимір);
+    # address=None - усі станції. Доба при цілогодинному зсуві складається з повних годин UTC,
+    # тому повні години беруться з погодинних агрегатів, а сирі рядки - лише на краях
+    watermark, _ = rollup_state(connection)
+    if utc_offset % HOUR:
+        watermark = None
+    plan = plan_range(start, end, watermark)
+    address_condition = '' if address is None else '"Адреса" = %s AND '
+    params = []
+    sources = []
+    hourly = plan['daily'] + plan['hourly']
+    if hourly:
+        params.append(utc_offset)
+        params.extend([address] if address is not None else [])
+        condition = _range_condition('bucket', hourly, params)
+        sources.append(f"""
+            SELECT "Адреса", "Вимір", ((bucket AT TIME ZONE 'UTC') + %s::interval)::date,
+                   min_value, max_value, sum_value, count_value
+            FROM {HOURLY_TABLE} WHERE {address_condition}({condition})""")
+    params.append(utc_offset)
+    params.extend([address] if address is not None else [])
+    condition = _range_condition('"Дата"', plan['raw'], params, inclusive_last=True)
+    sources.append(f"""
+        SELECT "Адреса", "Вимір", (("Дата" AT TIME ZONE 'UTC') + %s::interval)::date,
+               MIN("Величина"), MAX("Величина"), SUM("Величина"::numeric), COUNT("Величина")
+        FROM {SOURCE_VIEW} WHERE {address_condition}({condition})
+        GROUP BY 1, 2, 3""")
+    cursor = connection.cursor()
+    execute_prepared(cursor, f"""
+        SELECT "Адреса", "Вимір", day, MIN(min_value), MAX(max_value), SUM(sum_value), SUM(count_value)
+        FROM ({' UNION ALL '.join(sources)}) AS parts (
+            "Адреса", "Вимір", day, min_value, max_value, sum_value, count_value)
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+    """, params)
+    return cursor.fetchall()
+
+
+def create_rollups(connection):
+    cursor = connection.cursor()
+    cursor.execute(create_sql)
+    connection.commit()
+
+
+def refresh_rollups(connection, full=False, now=None):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT hourly_watermark FROM {STATE_TABLE} FOR UPDATE")
+    row = cursor.fetchone()
+    now = now or datetime.now(timezone.utc)
+    new_watermark = floor_to(now, HOUR)  # поточна година ще не завершена
+
+    if full or row is None:
+        refresh_from = None
+        cursor.execute(f"TRUNCATE {HOURLY_TABLE}, {DAILY_TABLE}")
+    else:
+        refresh_from = floor_to(row[0] - REFRESH_LOOKBACK, HOUR)
+        cursor.execute(f"DELETE FROM {HOURLY_TABLE} WHERE bucket >= %s", (refresh_from,))
+
+    params = []
+    where = 'WHERE "Дата" < %s'
+    if refresh_from is not None:
+        where += ' AND "Дата" >= %s'
+        params = [new_watermark, refresh_from]
+    else:
+        params = [new_watermark]
+    cursor.execute(f"""
+        INSERT INTO {HOURLY_TABLE}
+        SELECT date_trunc('hour', "Дата" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+               "Адреса", "Вимір",
+               MIN("Величина"), MAX("Величина"), SUM("Величина"::numeric), COUNT("Величина")
+        FROM {SOURCE_VIEW}
+        {where}
+        GROUP BY 1, 2, 3
+    """, params)
+
+    # Добові агрегати складаються з погодинних, лише для повністю завершених діб
+    day_from = floor_to(refresh_from, DAY) if refresh_from is not None else None
+    day_to = floor_to(new_watermark, DAY)
+    if day_from is not None:
+        cursor.execute(f"DELETE FROM {DAILY_TABLE} WHERE bucket >= %s", (day_from,))
+    cursor.execute(f"""
+        INSERT INTO {DAILY_TABLE}
+        SELECT date_trunc('day', bucket AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', "Адреса", "Вимір",
+               MIN(min_value), MAX(max_value), SUM(sum_value), SUM(count_value)
+        FROM {HOURLY_TABLE}
+        WHERE bucket < %s {'AND bucket >= %s' if day_from is not None else ''}
+        GROUP BY 1, 2, 3
+    """, [day_to] + ([day_from] if day_from is not None else []))
+
+    cursor.execute(f"""
+        INSERT INTO {STATE_TABLE} (id, hourly_watermark) VALUES (true, %s)
+        ON CONFLICT (id) DO UPDATE SET hourly_watermark = EXCLUDED.hourly_watermark
+    """, (new_watermark,))
+    connection.commit()
+    return new_watermark
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default='dbname=MonitorAir')
+    parser.add_argument('--full', action='store_true', help='перерахувати всі агрегати з нуля')
+    parser.add_argument('--address', help='адреса станції для verify')
+    parser.add_argument('--start', type=date.fromisoformat, help='перший день періоду для verify')
+    parser.add_argument('--end', type=date.fromisoformat, help='останній день періоду для verify')
+    parser.add_argument('command', choices=['create', 'refresh', 'verify'])
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(args.dsn)
+    if args.command == 'create':
+        create_rollups(connection)
+        print(f"Watermark: {refresh_rollups(connection, full=True)}")
+    elif args.command == 'refresh':
+        print(f"Watermark: {refresh_rollups(connection, full=args.full)}")
+    else:
+        print('OK' if verify(connection, args.address, args.start, args.end) else 'MISMATCH')
+    connection.close()
+
+
+def rows_match(raw, rolled):
+    # MIN, MAX і кількість - точно, середнє - з відносною похибкою AVG_TOLERANCE
+    if len(raw) != len(rolled):
+        return False
+    for raw_row, rolled_row in zip(raw, rolled):
+        name, raw_min, raw_max, raw_avg, raw_count = raw_row
+        if (name, raw_min, raw_max, raw_count) != (rolled_row[0], rolled_row[1], rolled_row[2], rolled_row[4]):
+            return False
+        rolled_avg = rolled_row[3]
+        if (raw_avg is None) != (rolled_avg is None):
+            return False
+        if raw_avg is not None and not math.isclose(float(raw_avg), float(rolled_avg), rel_tol=AVG_TOLERANCE):
+            return False
+    return True
+
+
+def verify(connection, address, first_day, last_day, tz=timezone(timedelta(hours=3))):
+    # Порівнює відповідь з агрегатів із сирим запитом за той самий період
+    start = datetime.combine(first_day, datetime.min.time(), tz)
+    end = datetime.combine(last_day, datetime.max.time().replace(microsecond=0), tz)
+    cursor = connection.cursor()
+    started = time.perf_counter()
+    cursor.execute(raw_verify_query, (address, start, end))
+    raw = sorted(cursor.fetchall())
+    raw_ms = (time.perf_counter() - started) * 1000
+    watermark, avg_cast = rollup_state(connection)
+    if watermark is None:
+        print('rollups are not created or not refreshed yet')
+        return False
+    started = time.perf_counter()
+    cursor.execute(*build_aggregate_query(address, plan_range(start, end, watermark), avg_cast, with_count=True))
+    rolled = sorted(cursor.fetchall())
+    rolled_ms = (time.perf_counter() - started) * 1000
+    print(f"raw: {raw_ms:.1f} ms, rollups: {rolled_ms:.1f} ms")
+    matched = rows_match(raw, rolled)
+    if not matched:
+        for raw_row, rolled_row in zip(raw, rolled):
+            if not rows_match([raw_row], [rolled_row]):
+                print(f"raw     {raw_row!r}\nrollups {rolled_row!r}")
+        for row in raw[len(rolled):] + rolled[len(raw):]:
+            print(f"extra   {row!r}")
+    return matched
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,473 @@
+from datetime import datetime, time, timedelta, timezone
+from functools import partial
+
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QComboBox,
+    QPushButton,
+    QFileDialog,
+    QMainWindow,
+    QHBoxLayout,
+    QDateEdit,
+    QSizePolicy
+)
+from PyQt5.QtCore import QDate
+import numpy as np
+from matplotlib import colors as mcolors
+from matplotlib import dates as mdates
+from matplotlib import pyplot as plt
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.patches import Patch
+
+from chart_export import bar_figure, export_chart, series_figure
+from downsample import lttb, minmax_downsample
+from query_cache import cached_fetch_all
+from query_log import ui_timer
+from query_executor import stream_rows
+from rollups import raw_aggregate_query, station_aggregates
+from tables_form import default_for_buttons, default_for_combobox, default_for_datetime, set_busy
+
+STATION_LIST_TTL = 300  # секунд
+OPEN_RANGE_TTL = 30     # секунд, для періодів, що включають поточний день
+STATION_TZ = timezone(timedelta(hours=3))
+
+BARS_MODE = 'Мін / макс / середнє'
+SERIES_MODE = 'Часовий ряд'
+BAR_KINDS = (('min', 'r'), ('max', 'b'), ('avg', 'g'))
+
+SERIES_ITERSIZE = 20000
+# Якщо точок у десятки разів більше, ніж пікселів, спершу стискаємо їх мін/макс-кошиками,
+# а LTTB обирає остаточні точки вже з них
+MINMAX_PREPASS_FACTOR = 8
+
+series_query = """
+    SELECT "Вимір", extract(epoch FROM "Дата")::float8, "Величина"::float8
+    FROM station_measurment_time_view
+    WHERE "Адреса" = %s AND "Дата" BETWEEN %s AND %s AND "Величина" IS NOT NULL
+    ORDER BY "Вимір", "Дата"
+"""
+
+
+series_since_query = """
+    SELECT "Вимір", extract(epoch FROM "Дата")::float8, "Величина"::float8
+    FROM station_measurment_time_view
+    WHERE "Адреса" = %s AND "Дата" > %s AND "Дата" <= %s AND "Величина" IS NOT NULL
+    ORDER BY "Вимір", "Дата"
+"""
+
+
+def read_series(connection, query, params):
+    # Рядки приходять порціями з серверного курсора й одразу складаються в масиви NumPy;
+    # повертає {вимір: (секунди від 1970-01-01, значення)}
+    chunks = {}
+    for rows in stream_rows(connection, query, params, SERIES_ITERSIZE):
+        names = np.array([row[0] for row in rows], dtype=object)
+        values = np.array([row[1:] for row in rows], dtype=float)
+        bounds = np.concatenate(([0], np.flatnonzero(names[1:] != names[:-1]) + 1, [len(rows)]))
+        for start_index, end_index in zip(bounds[:-1], bounds[1:]):
+            chunks.setdefault(names[start_index], []).append(values[start_index:end_index])
+    series = {}
+    for name, parts in chunks.items():
+        values = np.concatenate(parts)
+        series[name] = values[:, 0], values[:, 1]
+    return series
+
+
+def load_series(connection, address, start, end, points):
+    # Кожен вимір зменшується до points точок (ширина осі в пікселях)
+    series = []
+    for name, (x, y) in read_series(connection, series_query, (address, start, end)).items():
+        if len(x) > points * MINMAX_PREPASS_FACTOR:
+            x, y = minmax_downsample(x, y, points * MINMAX_PREPASS_FACTOR // 2)
+        x, y = lttb(x, y, points)
+        # Секунди від 1970-01-01 -> дні, у яких matplotlib рахує дати
+        series.append((name, x / 86400.0, y))
+    return series
+
+
+def load_series_since(connection, address, since, end):
+    # Лише точки, новіші за останню показану (для оновлення наживо)
+    return [(name, x / 86400.0, y)
+            for name, (x, y) in read_series(connection, series_since_query, (address, since, end)).items()]
+
+
+class ChartHover:
+    # Перехрестя й підпис під курсором малюються блітингом поверх знімка графіка,
+    # зробленого після останнього повного малювання, - сам графік при русі миші не перемальовується
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.background = None
+        self.overlays = {}   # axes -> (вертикальна лінія, горизонтальна лінія, підпис, describe)
+        self.visible = False
+        canvas.mpl_connect('draw_event', self.on_draw)
+        canvas.mpl_connect('motion_notify_event', self.on_move)
+        canvas.mpl_connect('figure_leave_event', self.on_leave)
+
+    def add_axes(self, ax, describe):
+        # describe(x, y) -> текст підпису або None, якщо під курсором нічого немає
+        line_style = dict(color='gray', linewidth=0.8, linestyle='--', animated=True, visible=False)
+        self.overlays[ax] = (
+            ax.axvline(0, **line_style),
+            ax.axhline(0, **line_style),
+            ax.text(0.01, 0.99, '', transform=ax.transAxes, va='top', animated=True, visible=False,
+                    bbox=dict(boxstyle='round', facecolor='white', alpha=0.8)),
+            describe,
+        )
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.visible = False
+
+    def on_move(self, event):
+        overlay = self.overlays.get(event.inaxes)
+        if self.background is None or (overlay is None and not self.visible):
+            return
+        self.canvas.restore_region(self.background)
+        self.visible = overlay is not None
+        if overlay is not None:
+            vline, hline, label, describe = overlay
+            vline.set_xdata([event.xdata])
+            hline.set_ydata([event.ydata])
+            text = describe(event.xdata, event.ydata)
+            label.set_text(text or '')
+            for artist in (vline, hline, label):
+                # Видимі лише на час блітингу, щоб relim(visible_only=True) їх не враховував
+                artist.set_visible(True)
+                event.inaxes.draw_artist(artist)
+                artist.set_visible(False)
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def on_leave(self, event):
+        if self.background is not None and self.visible:
+            self.canvas.restore_region(self.background)
+            self.canvas.blit(self.canvas.figure.bbox)
+            self.visible = False
+
+
+class ChartCanvas(FigureCanvas):
+    # Полотно matplotlib, кожне перемальовування якого записується в query_log як витрата каналу source
+    def __init__(self, figure, source):
+        super().__init__(figure)
+        self.source = source
+
+    def draw(self):
+        with ui_timer('chart draw', self.source):
+            super().draw()
+
+
+class PowerBIApp_first_graphic(QMainWindow):
+    def __init__(self, pool, executor):
+        super().__init__()
+        self.setWindowTitle('Power BI Report')
+        self.setGeometry(100, 100, 1500, 800)
+        self.pool = pool
+        self.executor = executor
+
+        main_layout = QVBoxLayout()
+
+        date_layout = QHBoxLayout()
+
+        self.start_date_edit = QDateEdit()
+        self.start_date_edit.setStyleSheet(default_for_datetime)
+        date_layout.addWidget(self.start_date_edit, stretch=1)
+        self.start_date_edit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        self.end_date_edit = QDateEdit()
+        self.end_date_edit.setStyleSheet(default_for_datetime)
+        date_layout.addWidget(self.end_date_edit, stretch=1)
+        self.end_date_edit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        main_layout.addLayout(date_layout)
+
+        self.comboBox = QComboBox()
+        self.comboBox.setStyleSheet(default_for_combobox)
+        main_layout.addWidget(self.comboBox)
+
+        self.mode_combobox = QComboBox()
+        self.mode_combobox.setStyleSheet(default_for_combobox)
+        self.mode_combobox.addItems([BARS_MODE, SERIES_MODE])
+        main_layout.addWidget(self.mode_combobox)
+
+        self.first_graphic_button = QPushButton('Показати', self)
+        main_layout.addWidget(self.first_graphic_button)
+        self.first_graphic_button.clicked.connect(self.handle_combobox_change)
+        self.first_graphic_button.setStyleSheet(default_for_buttons)
+
+        self.export_button = QPushButton('Зберегти в HTML', self)
+        main_layout.addWidget(self.export_button)
+        self.export_button.clicked.connect(self.export_html)
+        self.export_button.setStyleSheet(default_for_buttons)
+
+        self.figure, self.ax = plt.subplots(figsize=(5, 4))
+        # Часовий ряд має вісь дат, тому малюється на окремих осях у тому ж місці
+        self.series_ax = self.figure.add_subplot(111, label='series')
+        self.canvas = ChartCanvas(self.figure, 'chart')
+        main_layout.addWidget(self.canvas)
+
+        # Художники графіка створюються один раз і далі лише оновлюють свої дані
+        self.bars = None
+        self.bar_labels = []
+        self.lines = {}
+        # Що зараз показано - (режим, адреса, початок, кінець); за цим дописуються нові вимірювання
+        self.live_target = None
+        self.series_points = 0
+        self.series_last = {}  # вимір -> час останньої точки його лінії (дні matplotlib)
+        self.series_tail = {}  # вимір -> скільки точок у кінці лінії дописано наживо і ще не проріджено
+        # Станція, вибрана на карті до того, як завантажився список адрес
+        self.pending_address = None
+        self.setup_axes()
+        self.hover = ChartHover(self.canvas)
+        self.hover.add_axes(self.ax, self.describe_bar)
+        self.hover.add_axes(self.series_ax, self.describe_point)
+
+        central_widget = QWidget()
+        central_widget.setLayout(main_layout)
+        self.setCentralWidget(central_widget)
+
+        # Якщо користувач змінив вибір, результат попереднього запиту вже не потрібен
+        self.comboBox.currentIndexChanged.connect(self.cancel_chart_query)
+        self.mode_combobox.currentIndexChanged.connect(self.cancel_chart_query)
+        self.start_date_edit.dateChanged.connect(self.cancel_chart_query)
+        self.end_date_edit.dateChanged.connect(self.cancel_chart_query)
+        self.executor.busy_changed.connect(self.on_busy_changed)
+
+        self.populate_combobox()
+
+    def populate_combobox(self):
+        sql_query_db_names = "SELECT DISTINCT Адреса FROM connected_stations_without_dublicate"
+        self.executor.submit('stations', cached_fetch_all, sql_query_db_names, None, STATION_LIST_TTL,
+                             on_result=self.on_address_names)
+
+    def on_address_names(self, address_name):
+        address_names = [list(name)[0] for name in address_name]
+        self.comboBox.addItems(address_names)
+        if self.pending_address is not None:
+            self.show_station(self.pending_address)
+
+    def show_station(self, address):
+        # Відкриття з карти станцій (station_map): вибрати адресу і показати графік
+        index = self.comboBox.findText(address)
+        if index < 0:
+            self.pending_address = address
+            return
+        self.pending_address = None
+        self.comboBox.setCurrentIndex(index)
+        self.handle_combobox_change()
+
+    def cancel_chart_query(self):
+        self.executor.cancel('chart')
+        self.executor.cancel('chart_live')
+
+    def on_busy_changed(self, channel, busy):
+        if channel == 'chart':
+            set_busy(self.canvas, busy)
+            self.first_graphic_button.setEnabled(not busy)
+
+    def handle_combobox_change(self):
+        selected_address = self.comboBox.currentText()
+
+        # Період передаємо як моменти часу з поясом +03, як і раніше в тексті запиту
+        start_date = datetime.combine(self.start_date_edit.date().toPyDate(), time.min, STATION_TZ)
+        end_date = datetime.combine(self.end_date_edit.date().toPyDate(), time(23, 59, 59), STATION_TZ)
+
+        self.executor.cancel('chart_live')
+        self.live_target = (self.mode_combobox.currentText(), selected_address, start_date, end_date)
+        if self.mode_combobox.currentText() == SERIES_MODE:
+            points = max(int(self.series_ax.get_window_extent().width), 3)
+            self.series_points = points
+            self.executor.submit('chart', load_series, selected_address, start_date, end_date, points,
+                                 on_result=lambda series: self.draw_series(selected_address, series))
+            return
+
+        # Період, який повністю минув, уже не зміниться - його агрегати кешуємо без терміну
+        if self.end_date_edit.date() < QDate.currentDate():
+            ttl = None
+        else:
+            ttl = OPEN_RANGE_TTL
+        # Відповідь береться з погодинних/добових агрегатів, якщо їх створено (див. rollups.py)
+        fetch = partial(cached_fetch_all, ttl=ttl, fetch=station_aggregates)
+        self.executor.submit('chart', fetch, raw_aggregate_query, (selected_address, start_date, end_date),
+                             on_result=lambda results: self.draw_chart(selected_address, results))
+
+    def on_measurements_added(self, max_id):
+        # Основний запит ще виконується - нові рядки й так потраплять у його результат
+        if self.live_target is None or self.executor.is_busy('chart'):
+            return
+        mode, selected_address, start_date, end_date = self.live_target
+        if end_date < datetime.now(STATION_TZ):
+            return
+        if mode == SERIES_MODE:
+            # Від найстарішої з останніх точок ліній: вимір, що відстав від інших, не пропускає
+            # рядки між своєю останньою точкою й останніми точками інших (зайве відкидає append_series)
+            since = start_date
+            if self.series_last and all(name in self.series_last for name in self.lines):
+                since = datetime.fromtimestamp(min(self.series_last.values()) * 86400.0, STATION_TZ)
+            self.executor.submit('chart_live', load_series_since, selected_address, since, end_date,
+                                 on_result=lambda series: self.append_series(series, since > start_date))
+        else:
+            self.executor.submit('chart_live', station_aggregates, selected_address, start_date, end_date,
+                                 on_result=lambda results: self.draw_chart(selected_address, results))
+
+    def setup_axes(self):
+        self.ax.set_xlabel('Значення')
+        self.ax.set_ylabel('Величина вимірювання')
+        self.ax.legend(handles=[Patch(color=color, label=kind) for kind, color in BAR_KINDS])
+        self.ax.grid(True)
+        self.no_data_text = self.ax.text(0.5, 0.5, 'Немає даних за вибраний період', transform=self.ax.transAxes,
+                                         ha='center', va='center', visible=False)
+
+        self.series_ax.set_xlabel('Дата')
+        self.series_ax.set_ylabel('Значення')
+        self.series_ax.xaxis_date(STATION_TZ)
+        self.series_ax.tick_params(axis='x', labelrotation=30)
+        self.series_ax.grid(True)
+        self.series_ax.set_visible(False)
+
+    def show_axes(self, ax):
+        self.ax.set_visible(ax is self.ax)
+        self.series_ax.set_visible(ax is self.series_ax)
+
+    def request_redraw(self):
+        # draw_idle лише ставить малювання в чергу подій, тож кілька оновлень поспіль
+        # дають одне перемальовування
+        self.canvas.draw_idle()
+
+    def draw_chart(self, selected_address, results):
+        measurement_names = [row[0] for row in results]
+        # Рядок на вимір, стовпці min/max/avg; NULL стає NaN і стовпчик просто не малюється
+        values = np.array([row[1:4] for row in results], dtype=float).reshape(-1, len(BAR_KINDS))
+        widths = values.ravel()
+        labels = [f"{name}({kind})" for name in measurement_names for kind, _ in BAR_KINDS]
+
+        if not labels:
+            # За період немає жодного виміру - стовпчики прибираються, показується напис
+            if self.bars is not None:
+                self.bars.remove()
+                self.bars = None
+            self.ax.set_yticks([])
+            self.bar_labels = labels
+        elif self.bars is None or labels != self.bar_labels:
+            # Інший набір вимірів - стовпчики створюються заново одним викликом
+            if self.bars is not None:
+                self.bars.remove()
+            positions = np.arange(len(labels))
+            colors = [color for _ in measurement_names for _, color in BAR_KINDS]
+            self.bars = self.ax.barh(positions, widths, color=colors)
+            self.ax.set_yticks(positions)
+            self.ax.set_yticklabels(labels)
+            self.bar_labels = labels
+        else:
+            for rect, width in zip(self.bars, widths):
+                rect.set_width(width)
+        self.no_data_text.set_visible(not labels)
+
+        # Явне y вимикає пошук вільного місця над осями при кожному малюванні - зверху осей нічого немає
+        self.ax.set_title(f'Мінімальні, максимальні та середні значення для адреси: {selected_address}', y=1.0)
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view()
+        self.show_axes(self.ax)
+        self.request_redraw()
+
+    def draw_series(self, selected_address, series):
+        names = [name for name, _, _ in series]
+        for name, x, y in series:
+            line = self.lines.get(name)
+            if line is None:
+                self.lines[name], = self.series_ax.plot(x, y, linewidth=1, label=name)
+            else:
+                line.set_data(x, y)
+        for name in [name for name in self.lines if name not in names]:
+            self.lines.pop(name).remove()
+        self.series_last = {name: x[-1] for name, x, _ in series if len(x)}
+        self.series_tail = {}
+
+        self.series_ax.set_title(f'Виміри за період для адреси: {selected_address}', y=1.0)
+        self.update_series_view()
+
+    def append_series(self, series, partial=False):
+        # Нові точки дописуються в кінець наявних ліній без змін. Коли таких точок більше,
+        # ніж пікселів, проріджується лише цей сирий хвіст - до частки points, пропорційної
+        # його тривалості; вже проріджену частину лінії повторно не проріджуємо, щоб похибки
+        # LTTB не накопичувались з кожним оновленням
+        if not series:
+            return
+        if partial and any(name not in self.lines for name, _, _ in series):
+            # Вимір без лінії: запит ішов не від початку періоду, тож його старіші рядки
+            # пропущено - лінії читаються заново від start_date
+            _, selected_address, start_date, end_date = self.live_target
+            self.executor.submit('chart', load_series, selected_address, start_date, end_date, self.series_points,
+                                 on_result=lambda series: self.draw_series(selected_address, series))
+            return
+        for name, x, y in series:
+            last = self.series_last.get(name)
+            if last is not None:
+                # Запит іде від найстарішої останньої точки - цій лінії потрібні лише новіші за її власну
+                newer = x > last
+                x, y = x[newer], y[newer]
+            if not len(x):
+                continue
+            self.series_last[name] = x[-1]
+            line = self.lines.get(name)
+            if line is None:
+                self.lines[name], = self.series_ax.plot(x, y, linewidth=1, label=name)
+                self.series_tail[name] = len(x)
+                continue
+            tail = self.series_tail.get(name, 0) + len(x)
+            old_x, old_y = line.get_data()
+            x = np.concatenate((old_x, x))
+            y = np.concatenate((old_y, y))
+            if tail > self.series_points:
+                start = len(x) - tail
+                share = (x[-1] - x[start]) / (x[-1] - x[0]) if x[-1] > x[0] else 1.0
+                tail_x, tail_y = lttb(x[start:], y[start:], max(int(self.series_points * share), 3))
+                x = np.concatenate((x[:start], tail_x))
+                y = np.concatenate((y[:start], tail_y))
+                tail = 0
+            self.series_tail[name] = tail
+            line.set_data(x, y)
+        self.update_series_view()
+
+    def update_series_view(self):
+        # Легенда перебудовується лише тоді, коли змінився набір ліній
+        names = list(self.lines)
+        legend = self.series_ax.get_legend()
+        legend_names = [text.get_text() for text in legend.get_texts()] if legend is not None else []
+        if legend_names != names:
+            if legend is not None:
+                legend.remove()
+            if names:
+                self.series_ax.legend(handles=[self.lines[name] for name in names])
+
+        self.series_ax.relim(visible_only=True)
+        self.series_ax.autoscale_view()
+        self.show_axes(self.series_ax)
+        self.request_redraw()
+
+    def export_html(self):
+        # Поточний графік у компактний HTML: plotly.js і шаблон - у спільній папці assets поруч
+        if self.series_ax.get_visible():
+            offset_ms = STATION_TZ.utcoffset(None).total_seconds() * 1000
+            series = [(name, line.get_xdata() * 86400000.0 + offset_ms, line.get_ydata())
+                      for name, line in self.lines.items()]
+            figure = series_figure(self.series_ax.get_title(), series)
+        elif self.bars is not None:
+            figure = bar_figure(self.ax.get_title(), self.bar_labels, [rect.get_width() for rect in self.bars],
+                                [mcolors.to_hex(rect.get_facecolor()) for rect in self.bars])
+        else:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Зберегти графік", "", "HTML Files (*.html)")
+        if file_path:
+            try:
+                export_chart(figure, file_path, title=self.comboBox.currentText())
+            except Exception as e:
+                print(f"Error in export_html: {e}")
+
+    def describe_bar(self, x, y):
+        index = int(round(y))
+        if self.bars is None or not 0 <= index < len(self.bar_labels):
+            return None
+        return f"{self.bar_labels[index]}: {self.bars[index].get_width():.2f}"
+
+    def describe_point(self, x, y):
+        return f"{mdates.num2date(x, STATION_TZ):%Y-%m-%d %H:%M}  {y:.2f}"
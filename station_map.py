@@ -0,0 +1,392 @@
+"""Карта станцій: усі станції з координатами, колір - стан станції та її сервера MQTT.
+
+Координати (coordinates.longitude / latitude) проєктуються у Web Mercator і складаються
+в рівномірну сітку (GridIndex), тож при зсуві й масштабуванні перебираються лише станції
+з клітинок видимої області. Видимі станції групуються в кластери по клітинках CLUSTER_PX
+пікселів, прив'язаних до карти, а не до екрана (при зсуві кластери не перескакують):
+на дрібному масштабі десятки тисяч станцій - це кілька сотень кружків з кількістю.
+Клік по кластеру наближає до нього, клік по станції відкриває її графік вимірювань.
+Підкладки (тайлів) немає - лише координатна сітка, тож карта працює без мережі.
+"""
+import math
+
+import numpy as np
+from PyQt5.QtCore import QRectF, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter, QPen
+from PyQt5.QtWidgets import QHBoxLayout, QLabel, QMainWindow, QMenu, QPushButton, QToolTip, QVBoxLayout, QWidget
+
+from data_access import catalog
+from query_log import ui_timer
+from tables_form import default_for_buttons, set_busy
+
+GRID_CELLS = 256        # клітинок індексу по кожній осі світу
+CLUSTER_PX = 48         # розмір клітинки кластера на екрані
+MARKER_RADIUS = 5
+MAX_SCALE = 2 ** 26     # пікселів на ширину світу при найбільшому наближенні (кілька метрів на піксель)
+ZOOM_STEP = 1.25        # на одну поділку коліщати миші
+CLICK_SLOP_PX = 4       # зсув миші, до якого натискання ще вважається кліком
+MENU_STATIONS = 30      # станцій у меню кластера, який уже не розділити наближенням
+GRATICULE_PX = 90       # мінімальна відстань між лініями координатної сітки
+GRATICULE_STEPS = (30, 10, 5, 2, 1, 0.5, 0.2, 0.1, 0.05, 0.02, 0.01, 0.005, 0.002, 0.001)
+MAX_LATITUDE = 85.05112878
+
+CONNECTED, DISCONNECTED, SERVER_DOWN = 0, 1, 2
+STATUS_LABELS = {CONNECTED: 'Підключена', DISCONNECTED: 'Відключена', SERVER_DOWN: 'Сервер MQTT недоступний'}
+STATUS_COLORS = {CONNECTED: '#4CAF50', DISCONNECTED: '#e53935', SERVER_DOWN: '#ffa000'}
+
+# Адреса - так само, як "Адреса" у представленнях звітів, за нею графік знаходить станцію
+stations_query = """
+    SELECT s.city || ', ' || s.name_station, c.longitude::float8, c.latitude::float8,
+           s.status_station, coalesce(m.server_status, true)
+    FROM coordinates c
+    JOIN station s USING (id_station)
+    LEFT JOIN mqtt_server m USING (id_server)
+    WHERE c.longitude IS NOT NULL AND c.latitude IS NOT NULL
+"""
+
+
+def project(longitude, latitude):
+    # Web Mercator у світових координатах 0..1 (y росте донизу, як на екрані)
+    latitude = np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE)
+    x = (np.asarray(longitude, dtype=float) + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(latitude) / 2)) / (2 * np.pi)
+    return x, y
+
+
+def unproject(x, y):
+    return x * 360.0 - 180.0, math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+
+class GridIndex:
+    # Рівномірна сітка у світових координатах. Станції відсортовані за номером клітинки
+    # (рядок за рядком), тож клітинки одного рядка сітки - це один суцільний зріз order
+    def __init__(self, x, y, cells=GRID_CELLS):
+        self.cells = cells
+        self.x = x
+        self.y = y
+        keys = self._cells(y) * cells + self._cells(x)
+        self.order = np.argsort(keys, kind='stable')
+        self.starts = np.searchsorted(keys[self.order], np.arange(cells * cells + 1))
+
+    def _cells(self, values):
+        return np.clip((values * self.cells).astype(np.int64), 0, self.cells - 1)
+
+    def _cell(self, value):
+        return min(max(int(value * self.cells), 0), self.cells - 1)
+
+    def query(self, x0, y0, x1, y1):
+        # Індекси станцій у прямокутнику: кандидати з клітинок, що його перетинають,
+        # потім точна перевірка координат
+        if x1 < 0 or y1 < 0 or x0 > 1 or y0 > 1 or not len(self.order):
+            return np.empty(0, dtype=np.int64)
+        first_column, last_column = self._cell(x0), self._cell(x1)
+        parts = [self.order[self.starts[row * self.cells + first_column]:self.starts[row * self.cells + last_column + 1]]
+                 for row in range(self._cell(y0), self._cell(y1) + 1)]
+        candidates = np.concatenate(parts)
+        x, y = self.x[candidates], self.y[candidates]
+        return candidates[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)]
+
+
+class StationPoints:
+    def __init__(self, rows):
+        self.addresses = [row[0] for row in rows]
+        coordinates = np.array([(row[1], row[2]) for row in rows], dtype=float).reshape(-1, 2)
+        self.longitude, self.latitude = coordinates[:, 0], coordinates[:, 1]
+        self.x, self.y = project(self.longitude, self.latitude)
+        self.status = np.array([DISCONNECTED if not row[3] else CONNECTED if row[4] else SERVER_DOWN for row in rows],
+                               dtype=np.int8)
+        self.index = GridIndex(self.x, self.y)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def counts(self):
+        return {status: int(np.count_nonzero(self.status == status)) for status in STATUS_LABELS}
+
+
+def load_station_points(connection):
+    # У робочому потоці QueryExecutor: і запит, і побудова індексу
+    catalog.check_columns(connection, 'coordinates', ('id_station', 'longitude', 'latitude'))
+    cursor = connection.cursor()
+    cursor.execute(stations_query)
+    return StationPoints(cursor.fetchall())
+
+
+class Clusters:
+    # Станції видимої області, згруповані за клітинками CLUSTER_PX у пікселях карти (x * scale);
+    # кластер з однієї станції лишається на її точному місці
+    def __init__(self, points, indices, scale, cell_px=CLUSTER_PX):
+        x, y = points.x[indices], points.y[indices]
+        columns = np.floor(x * scale / cell_px).astype(np.int64)
+        rows = np.floor(y * scale / cell_px).astype(np.int64)
+        keys = rows * (int(scale / cell_px) + 2) + columns
+        _, first, self.inverse, self.counts = np.unique(keys, return_index=True, return_inverse=True,
+                                                        return_counts=True)
+        self.inverse = self.inverse.reshape(-1)
+        self.indices = indices
+        self.first = indices[first]
+        self.x = np.bincount(self.inverse, weights=x) / self.counts
+        self.y = np.bincount(self.inverse, weights=y) / self.counts
+        self.connected = np.bincount(self.inverse, weights=points.status[indices] == CONNECTED) / self.counts
+        self.screen_x = self.screen_y = self.radius = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    def members(self, cluster):
+        return self.indices[self.inverse == cluster]
+
+
+class StationMapView(QWidget):
+    station_clicked = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMouseTracking(True)
+        self.setMinimumSize(400, 300)
+        self.points = None
+        self.center = (0.5, 0.5)
+        self.scale = 512.0
+        self.clusters = None
+        self.visible = 0
+        self.press_pos = None
+        self.press_center = None
+        self.label_font = QFont()
+        self.label_font.setPixelSize(11)
+
+    def set_points(self, points):
+        self.points = points
+        self.fit()
+
+    def min_scale(self):
+        # Увесь світ уміщується у вікно
+        return max(min(self.width(), self.height()), 1)
+
+    def fit(self):
+        # Усі станції у вікні з полями по краях
+        if self.points is None or not len(self.points):
+            self.center, self.scale = (0.5, 0.5), self.min_scale()
+        else:
+            x0, x1 = self.points.x.min(), self.points.x.max()
+            y0, y1 = self.points.y.min(), self.points.y.max()
+            self.center = ((x0 + x1) / 2, (y0 + y1) / 2)
+            span_x, span_y = max(x1 - x0, 1e-9) * 1.2, max(y1 - y0, 1e-9) * 1.2
+            self.scale = min(max(min(self.width() / span_x, self.height() / span_y), self.min_scale()), MAX_SCALE)
+        self.update()
+
+    def to_world(self, x, y):
+        return (self.center[0] + (x - self.width() / 2) / self.scale,
+                self.center[1] + (y - self.height() / 2) / self.scale)
+
+    def to_screen(self, x, y):
+        return ((x - self.center[0]) * self.scale + self.width() / 2,
+                (y - self.center[1]) * self.scale + self.height() / 2)
+
+    def zoom(self, factor, x=None, y=None):
+        # Точка під курсором (x, y) лишається на місці
+        if x is None:
+            x, y = self.width() / 2, self.height() / 2
+        world_x, world_y = self.to_world(x, y)
+        self.scale = min(max(self.scale * factor, self.min_scale()), MAX_SCALE)
+        self.center = (world_x - (x - self.width() / 2) / self.scale, world_y - (y - self.height() / 2) / self.scale)
+        self.update()
+
+    def visible_clusters(self):
+        # Запас в одну клітинку кластера, щоб кластери на краю не з'являлися раптово
+        margin = CLUSTER_PX / self.scale
+        x0, y0 = self.to_world(0, 0)
+        x1, y1 = self.to_world(self.width(), self.height())
+        indices = self.points.index.query(x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+        clusters = Clusters(self.points, indices, self.scale)
+        clusters.screen_x, clusters.screen_y = self.to_screen(clusters.x, clusters.y)
+        clusters.radius = np.where(clusters.counts > 1, 10 + 4 * np.log10(clusters.counts), MARKER_RADIUS)
+        return clusters
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor('#121212'))
+        painter.setFont(self.label_font)
+        self.draw_graticule(painter)
+        if self.points is not None and len(self.points):
+            with ui_timer('map draw', 'map') as record:
+                self.clusters = self.visible_clusters()
+                self.draw_clusters(painter, self.clusters)
+                self.visible = len(self.clusters.indices)
+                record.rows = len(self.clusters)
+            painter.setPen(QColor('#888888'))
+            painter.drawText(QRectF(8, 4, self.width() - 16, 20), Qt.AlignLeft | Qt.AlignVCenter,
+                             f"На екрані: {self.visible} з {len(self.points)} станцій, позначок: {len(self.clusters)}")
+        painter.end()
+
+    def draw_graticule(self, painter):
+        # Лінії через "круглу" кількість градусів, не частіше ніж через GRATICULE_PX пікселів
+        pixels_per_degree = self.scale / 360.0
+        step = next((s for s in reversed(GRATICULE_STEPS) if s * pixels_per_degree >= GRATICULE_PX),
+                    GRATICULE_STEPS[0])
+        x0, y0 = self.to_world(0, 0)
+        x1, y1 = self.to_world(self.width(), self.height())
+        west, north = unproject(min(max(x0, 0.0), 1.0), min(max(y0, 0.0), 1.0))
+        east, south = unproject(min(max(x1, 0.0), 1.0), min(max(y1, 0.0), 1.0))
+        decimals = max(0, -math.floor(math.log10(step)))
+        painter.setPen(QPen(QColor('#2a2a2a'), 1))
+        for longitude in np.arange(math.ceil(west / step) * step, east + step / 2, step):
+            screen_x = self.to_screen(project(longitude, 0.0)[0], 0.0)[0]
+            painter.drawLine(int(screen_x), 0, int(screen_x), self.height())
+            painter.drawText(int(screen_x) + 3, self.height() - 4, f"{longitude:.{decimals}f}°")
+        for latitude in np.arange(math.ceil(south / step) * step, north + step / 2, step):
+            screen_y = self.to_screen(0.0, project(0.0, latitude)[1])[1]
+            painter.drawLine(0, int(screen_y), self.width(), int(screen_y))
+            painter.drawText(3, int(screen_y) - 3, f"{latitude:.{decimals}f}°")
+
+    def draw_clusters(self, painter, clusters):
+        painter.setPen(QPen(QColor('#121212'), 1))
+        singles = clusters.counts == 1
+        for status, color in STATUS_COLORS.items():
+            painter.setBrush(QColor(color))
+            for i in np.flatnonzero(singles & (self.points.status[clusters.first] == status)):
+                painter.drawEllipse(QRectF(clusters.screen_x[i] - MARKER_RADIUS, clusters.screen_y[i] - MARKER_RADIUS,
+                                           2 * MARKER_RADIUS, 2 * MARKER_RADIUS))
+        for i in np.flatnonzero(~singles):
+            # Від червоного (усі відключені) до зеленого (усі підключені)
+            painter.setPen(QPen(QColor('#121212'), 1))
+            painter.setBrush(QColor.fromHsvF(0.33 * clusters.connected[i], 0.75, 0.8))
+            radius = clusters.radius[i]
+            rect = QRectF(clusters.screen_x[i] - radius, clusters.screen_y[i] - radius, 2 * radius, 2 * radius)
+            painter.drawEllipse(rect)
+            painter.setPen(QColor('#ffffff'))
+            painter.drawText(rect, Qt.AlignCenter, str(clusters.counts[i]))
+
+    def cluster_at(self, x, y):
+        clusters = self.clusters
+        if clusters is None or not len(clusters):
+            return None
+        distance = np.hypot(clusters.screen_x - x, clusters.screen_y - y) - clusters.radius
+        nearest = int(np.argmin(distance))
+        return nearest if distance[nearest] <= 2 else None
+
+    def describe(self, cluster):
+        clusters = self.clusters
+        if clusters.counts[cluster] == 1:
+            station = clusters.first[cluster]
+            return (f"{self.points.addresses[station]}\n{STATUS_LABELS[self.points.status[station]]}\n"
+                    f"{self.points.latitude[station]:.5f}, {self.points.longitude[station]:.5f}")
+        count = clusters.counts[cluster]
+        return f"Станцій: {count}, підключених: {round(clusters.connected[cluster] * count)}"
+
+    def click(self, cluster, global_pos):
+        clusters = self.clusters
+        if clusters.counts[cluster] == 1:
+            self.station_clicked.emit(self.points.addresses[clusters.first[cluster]])
+            return
+        if self.scale < MAX_SCALE:
+            # Наближаємо до кластера, поки він не розпадеться на окремі станції
+            self.center = (clusters.x[cluster], clusters.y[cluster])
+            self.zoom(2.0)
+            return
+        # Станції в одній точці - вибір зі списку
+        menu = QMenu(self)
+        for station in clusters.members(cluster)[:MENU_STATIONS]:
+            address = self.points.addresses[station]
+            menu.addAction(address, lambda address=address: self.station_clicked.emit(address))
+        menu.exec_(global_pos)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.press_pos = event.pos()
+            self.press_center = self.center
+
+    def mouseMoveEvent(self, event):
+        if self.press_pos is not None:
+            delta = event.pos() - self.press_pos
+            self.center = (self.press_center[0] - delta.x() / self.scale, self.press_center[1] - delta.y() / self.scale)
+            self.update()
+            return
+        cluster = self.cluster_at(event.x(), event.y())
+        if cluster is None:
+            QToolTip.hideText()
+            self.unsetCursor()
+        else:
+            QToolTip.showText(event.globalPos(), self.describe(cluster), self)
+            self.setCursor(Qt.PointingHandCursor)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() != Qt.LeftButton or self.press_pos is None:
+            return
+        moved = (event.pos() - self.press_pos).manhattanLength()
+        self.press_pos = None
+        if moved <= CLICK_SLOP_PX:
+            cluster = self.cluster_at(event.x(), event.y())
+            if cluster is not None:
+                self.click(cluster, event.globalPos())
+
+    def mouseDoubleClickEvent(self, event):
+        if self.cluster_at(event.x(), event.y()) is None:
+            self.zoom(2.0, event.x(), event.y())
+
+    def wheelEvent(self, event):
+        self.zoom(ZOOM_STEP ** (event.angleDelta().y() / 120), event.x(), event.y())
+
+
+class StationMapWindow(QMainWindow):
+    station_selected = pyqtSignal(str)
+
+    def __init__(self, pool, executor):
+        super().__init__()
+        self.setWindowTitle('Карта станцій')
+        self.setGeometry(100, 100, 1200, 800)
+        self.pool = pool
+        self.executor = executor
+
+        main_layout = QVBoxLayout()
+        controls_layout = QHBoxLayout()
+        self.status_label = QLabel(self)
+        controls_layout.addWidget(self.status_label, 1)
+        fit_button = QPushButton('Усі станції', self)
+        fit_button.setStyleSheet(default_for_buttons)
+        controls_layout.addWidget(fit_button)
+        self.refresh_button = QPushButton('Оновити', self)
+        self.refresh_button.setStyleSheet(default_for_buttons)
+        controls_layout.addWidget(self.refresh_button)
+        main_layout.addLayout(controls_layout)
+
+        legend = '   '.join(f'<span style="color: {STATUS_COLORS[status]}">●</span> {label}'
+                           for status, label in STATUS_LABELS.items())
+        legend_label = QLabel(legend + '   (клік по станції - графік вимірювань)', self)
+        main_layout.addWidget(legend_label)
+
+        self.map_view = StationMapView(self)
+        self.map_view.station_clicked.connect(self.station_selected)
+        main_layout.addWidget(self.map_view, 1)
+        fit_button.clicked.connect(self.map_view.fit)
+        self.refresh_button.clicked.connect(self.refresh)
+
+        central_widget = QWidget()
+        central_widget.setLayout(main_layout)
+        self.setCentralWidget(central_widget)
+
+        self.executor.busy_changed.connect(self.on_busy_changed)
+        self.refresh()
+
+    def refresh(self):
+        self.executor.submit('map', load_station_points, on_result=self.on_points, on_error=self.on_error)
+
+    def on_busy_changed(self, channel, busy):
+        if channel == 'map':
+            set_busy(self.map_view, busy)
+            self.refresh_button.setEnabled(not busy)
+
+    def on_points(self, points):
+        fitted = self.map_view.points is not None
+        self.map_view.points = points
+        if not fitted:
+            self.map_view.fit()
+        else:
+            self.map_view.update()
+        counts = points.counts()
+        self.status_label.setText(f"Станцій на карті: {len(points)}  " + '  '.join(
+            f"{STATUS_LABELS[status].lower()}: {count}" for status, count in counts.items()))
+
+    def on_error(self, error):
+        self.status_label.setText(f"Помилка: {error}")
+        print(f"Error in station map: {error}")
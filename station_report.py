@@ -0,0 +1,415 @@
+import json
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtPrintSupport import QPrinter, QPrintDialog
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QPushButton, QMainWindow, QFileDialog, QHBoxLayout, QProgressDialog
+)
+
+from pdf_export import export_pdf, print_report
+from query_executor import stream_rows
+from query_log import ui_timer
+from tables_form import default_for_buttons, set_busy
+from web_views import view_pool
+
+REPORT_ITERSIZE = 2000  # Скільки рядків звіту серверний курсор віддає за один раз
+
+report_sql_query = "SELECT * FROM connected_stations_without_dublicate"
+report_title = 'Список підключених станцій'
+report_headers = ['Адреса', 'Статус', 'Вимір']
+report_column_widths = [5, 2, 3]
+
+# Легка оболонка звіту: рядки зберігаються в масиві JavaScript, а в DOM є лише ті, що видно
+# у вікні (віртуальна прокрутка), тож перше відображення не залежить від кількості рядків.
+# Сортування - клік по заголовку стовпчика, фільтр - поле над таблицею.
+report_shell_html = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+    <style>
+        html, body {
+            height: 100%;
+            margin: 0;
+        }
+        body {
+            font-family: Arial, sans-serif;
+            background-color: #FFFFFF;
+            color: #000000;
+            display: flex;
+            flex-direction: column;
+        }
+        h1 {
+            text-align: center;
+            color: #44244c;
+            margin: 20px 0 10px;
+        }
+        .toolbar {
+            width: 80%;
+            margin: 0 auto 10px;
+            display: flex;
+            gap: 20px;
+            align-items: center;
+        }
+        #filter {
+            flex: 1;
+            padding: 6px;
+            font-size: 14px;
+        }
+        #viewport {
+            flex: 1;
+            overflow-y: auto;
+            margin-bottom: 20px;
+        }
+        table {
+            width: 80%;
+            margin: 0 auto;
+            border-collapse: collapse;
+            table-layout: fixed;
+        }
+        th, td {
+            padding: 0 10px;
+            height: 40px;
+            text-align: left;
+            border-bottom: 1px solid #ddd;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }
+        th {
+            background-color: #723d7f;
+            color: white;
+            position: sticky;
+            top: 0;
+            cursor: pointer;
+            user-select: none;
+        }
+        tr.even {
+            background-color: #d7eaf9;
+        }
+        tr.spacer td {
+            padding: 0;
+            border: none;
+        }
+    </style>
+    <script>
+        var ROW_HEIGHT = 41;  // висота td + нижня рамка; уточнюється після першого малювання
+        var OVERSCAN = 10;    // запасні рядки над і під видимою частиною
+
+        var Report = {
+            rows: [],          // усі отримані рядки
+            view: [],          // рядки після фільтра й сортування
+            filter: '',
+            sortColumn: -1,
+            sortAscending: true,
+            dirty: false,
+            measured: false,
+            frame: 0,
+
+            append: function (rows) {
+                for (var i = 0; i < rows.length; i++) {
+                    this.rows.push(rows[i]);
+                }
+                if (this.filter === '' && this.sortColumn < 0) {
+                    this.view = this.rows;
+                    this.schedule(false);
+                } else {
+                    this.schedule(true);
+                }
+            },
+
+            setFilter: function (text) {
+                this.filter = text.toLowerCase();
+                this.schedule(true);
+            },
+
+            sortBy: function (column) {
+                if (this.sortColumn === column) {
+                    this.sortAscending = !this.sortAscending;
+                } else {
+                    this.sortColumn = column;
+                    this.sortAscending = true;
+                }
+                this.schedule(true);
+            },
+
+            matches: function (row) {
+                for (var i = 0; i < row.length; i++) {
+                    if (row[i].toLowerCase().indexOf(this.filter) !== -1) {
+                        return true;
+                    }
+                }
+                return false;
+            },
+
+            rebuildView: function () {
+                var self = this;
+                var view = this.filter === '' ? this.rows.slice() : this.rows.filter(function (row) {
+                    return self.matches(row);
+                });
+                if (this.sortColumn >= 0) {
+                    var column = this.sortColumn;
+                    var direction = this.sortAscending ? 1 : -1;
+                    var collator = new Intl.Collator('uk', {numeric: true, sensitivity: 'base'});
+                    view.sort(function (a, b) {
+                        return direction * collator.compare(a[column], b[column]);
+                    });
+                }
+                this.view = view;
+            },
+
+            visibleRange: function (scrollTop, height) {
+                var first = Math.max(0, Math.floor(scrollTop / ROW_HEIGHT) - OVERSCAN);
+                var last = Math.min(this.view.length, Math.ceil((scrollTop + height) / ROW_HEIGHT) + OVERSCAN);
+                return [first, last];
+            },
+
+            // Кілька порцій чи натискань клавіш за один кадр - одне перемальовування
+            schedule: function (rebuild) {
+                this.dirty = this.dirty || rebuild;
+                if (this.frame) {
+                    return;
+                }
+                var self = this;
+                this.frame = requestAnimationFrame(function () {
+                    self.frame = 0;
+                    if (self.dirty) {
+                        self.dirty = false;
+                        self.rebuildView();
+                    }
+                    self.render();
+                });
+            },
+
+            render: function () {
+                var viewport = document.getElementById('viewport');
+                var range = this.visibleRange(viewport.scrollTop, viewport.clientHeight);
+                var body = document.getElementById('rows');
+                var fragment = document.createDocumentFragment();
+                fragment.appendChild(spacer(range[0] * ROW_HEIGHT));
+                for (var i = range[0]; i < range[1]; i++) {
+                    var tr = document.createElement('tr');
+                    if (i % 2) {
+                        tr.className = 'even';
+                    }
+                    var row = this.view[i];
+                    for (var j = 0; j < row.length; j++) {
+                        var td = document.createElement('td');
+                        td.textContent = row[j];
+                        tr.appendChild(td);
+                    }
+                    fragment.appendChild(tr);
+                }
+                fragment.appendChild(spacer((this.view.length - range[1]) * ROW_HEIGHT));
+                body.textContent = '';
+                body.appendChild(fragment);
+                if (!this.measured && range[1] > range[0]) {
+                    this.measured = true;
+                    var height = body.children[1].getBoundingClientRect().height;
+                    if (height > 0 && height !== ROW_HEIGHT) {
+                        ROW_HEIGHT = height;
+                        this.schedule(false);
+                    }
+                }
+                document.getElementById('count').textContent =
+                    'Показано ' + this.view.length + ' з ' + this.rows.length;
+                var headers = document.querySelectorAll('th');
+                for (var k = 0; k < headers.length; k++) {
+                    var mark = k === this.sortColumn ? (this.sortAscending ? ' ▲' : ' ▼') : '';
+                    headers[k].textContent = headers[k].getAttribute('data-title') + mark;
+                }
+            }
+        };
+
+        function spacer(height) {
+            var tr = document.createElement('tr');
+            tr.className = 'spacer';
+            var td = document.createElement('td');
+            td.colSpan = 3;
+            td.style.height = height + 'px';
+            tr.appendChild(td);
+            return tr;
+        }
+
+        function appendRows(rows) {
+            Report.append(rows);
+        }
+
+        var filterTimer = 0;
+        document.addEventListener('DOMContentLoaded', function () {
+            document.getElementById('viewport').addEventListener('scroll', function () {
+                Report.schedule(false);
+            });
+            document.getElementById('filter').addEventListener('input', function (event) {
+                clearTimeout(filterTimer);
+                filterTimer = setTimeout(function () {
+                    Report.setFilter(event.target.value);
+                }, 150);
+            });
+            var headers = document.querySelectorAll('th');
+            for (var k = 0; k < headers.length; k++) {
+                headers[k].addEventListener('click', Report.sortBy.bind(Report, k));
+            }
+            window.addEventListener('resize', function () {
+                Report.schedule(false);
+            });
+        });
+    </script>
+</head>
+<body>
+    <h1>Список підключених станцій</h1>
+    <div class="toolbar">
+        <input id="filter" type="search" placeholder="Фільтр">
+        <span id="count"></span>
+    </div>
+    <div id="viewport">
+        <table>
+            <thead>
+                <tr>
+                    <th data-title="Адреса">Адреса</th>
+                    <th data-title="Статус">Статус</th>
+                    <th data-title="Вимір">Вимір</th>
+                </tr>
+            </thead>
+            <tbody id="rows"></tbody>
+        </table>
+    </div>
+</body>
+</html>
+"""
+
+
+class PowerLikeBIApp(QMainWindow):
+    def __init__(self, pool, executor, itersize=REPORT_ITERSIZE):
+        super().__init__()
+        self.pool = pool
+        self.executor = executor
+        self.itersize = itersize
+        self.page_loaded = False
+        self.pending_batches = []
+        self.progress = None
+        self.printer = None
+        self.report_view = None
+        self.initUI()
+
+    def initUI(self):
+        central_widget = QWidget(self)
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout()
+        central_widget.setLayout(layout)
+        self.main_layout = layout
+
+        self.convert_button = QPushButton('Конвертувати в pdf', self)
+        self.convert_button.clicked.connect(self.convertToPdf)
+        self.convert_button.setStyleSheet(default_for_buttons)
+        # layout.addWidget(convert_button)
+
+        self.print_button = QPushButton('Роздрукувати', self)
+        self.print_button.clicked.connect(self.printToPdf)
+        self.print_button.setStyleSheet(default_for_buttons)
+        # layout.addWidget(print_button)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.print_button)
+        button_layout.addWidget(self.convert_button)
+        layout.addLayout(button_layout)
+
+        self.setGeometry(100, 100, 800, 600)
+        self.setWindowTitle('Звіт')
+
+        self.executor.busy_changed.connect(self.on_busy_changed)
+
+    def showEvent(self, event):
+        # Переглядач береться з пулу лише на той час, поки вікно відкрите
+        if self.report_view is None:
+            self.open_report_view()
+        super().showEvent(event)
+
+    def closeEvent(self, event):
+        self.executor.cancel('report')
+        if self.report_view is not None:
+            self.main_layout.removeWidget(self.report_view)
+            view_pool.release(self.report_view)
+            self.report_view = None
+        super().closeEvent(event)
+
+    def open_report_view(self):
+        # Спочатку показуємо порожню таблицю, а рядки додаємо порціями, щойно вони приходять з бази
+        self.page_loaded = False
+        self.pending_batches = []
+        self.report_view = view_pool.acquire(self)
+        self.report_view.loadFinished.connect(self.on_page_loaded)
+        self.report_view.setHtml(report_shell_html)
+        self.main_layout.insertWidget(0, self.report_view)
+        self.report_view.show()
+        self.executor.submit_stream('report', stream_rows, report_sql_query, None, self.itersize,
+                                    on_batch=self.on_report_batch)
+
+    def on_busy_changed(self, channel, busy):
+        if channel in ('report', 'export'):
+            set_busy(self, busy)
+            self.print_button.setEnabled(not busy)
+            self.convert_button.setEnabled(not busy)
+
+    def on_page_loaded(self, ok):
+        self.page_loaded = True
+        # Порції, що прийшли до завантаження оболонки, передаємо одним викликом
+        rows = [row for batch in self.pending_batches for row in batch]
+        self.pending_batches = []
+        if rows:
+            self.inject_rows(rows)
+
+    def on_report_batch(self, rows):
+        if self.report_view is None:
+            return
+        if self.page_loaded:
+            self.inject_rows(rows)
+        else:
+            self.pending_batches.append(rows)
+
+    def inject_rows(self, rows):
+        with ui_timer('report rows', 'report', rows=len(rows)):
+            payload = json.dumps([[str(value) for value in row] for row in rows], ensure_ascii=False)
+            self.report_view.page().runJavaScript(f"appendRows({payload});")
+
+    def printToPdf(self):
+        printer = QPrinter(QPrinter.HighResolution)
+        dialog = QPrintDialog(printer, self)
+        if dialog.exec_() == QPrintDialog.Accepted:
+            self.printer = printer  # принтер має жити, доки звіт друкується у фоні
+            self.start_export(print_report, printer, 'Друк звіту...')
+
+    def convertToPdf(self):
+        options = QFileDialog.Options()
+        file_path, _ = QFileDialog.getSaveFileName(self, "Зберегти як PDF", "", "PDF Files (*.pdf);;All Files (*)",
+                                                   options=options)
+
+        if file_path:
+            self.start_export(export_pdf, file_path, 'Експорт у PDF...')
+
+    def start_export(self, export, target, label):
+        # Звіт малюється сторінка за сторінкою у фоновому потоці прямо з серверного курсора
+        self.progress = QProgressDialog(label, 'Скасувати', 0, 0, self)
+        self.progress.setWindowModality(Qt.WindowModal)
+        self.progress.setMinimumDuration(0)
+        self.progress.canceled.connect(lambda: self.executor.cancel('export'))
+        self.progress.show()
+        self.executor.submit_stream('export', export, target, report_sql_query, None, report_title,
+                                    report_headers, report_column_widths,
+                                    on_batch=self.on_export_progress,
+                                    on_result=self.on_export_finished,
+                                    on_error=self.on_export_failed)
+
+    def on_export_progress(self, progress):
+        rows, total_rows, pages = progress
+        if total_rows:
+            self.progress.setMaximum(total_rows)
+            self.progress.setValue(rows)
+        self.progress.setLabelText(f"Рядків: {rows} з {total_rows}, сторінок: {pages}")
+
+    def on_export_finished(self, result):
+        self.progress.reset()
+
+    def on_export_failed(self, error):
+        self.progress.reset()
+        print(f"Error in export: {error}")
@@ -0,0 +1,369 @@
+"""Вивантаження цілої таблиці (або представлення) у файл без прокручування переглядача.
+
+CSV пишеться через COPY ... TO STDOUT: PostgreSQL сам форматує рядки, а клієнт лише
+переписує байти у файл, тож швидкість обмежена диском і мережею, а не Python.
+Стовпчикові формати читаються серверним курсором порціями:
+    .npz      - архів NumPy, один масив на стовпчик (стиснений, завжди доступний);
+    .parquet  - лише якщо встановлено pyarrow, по одній групі рядків на порцію.
+Пам'ять не залежить від розміру таблиці: у ній лише одна порція (для .npz - ще
+тимчасові файли стовпчиків на диску). Файл з'являється під своїм іменем лише після
+успішного завершення.
+
+    python table_export.py --dsn "dbname=MonitorAir user=postgres" measument measument.csv
+    python table_export.py --dsn "..." measument measument.csv.gz
+    python table_export.py --dsn "..." measument_view measument.npz
+"""
+import argparse
+import gzip
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timezone
+
+import numpy as np
+import psycopg2
+from psycopg2 import sql
+
+from data_access import catalog
+from query_executor import stream_rows
+
+PROGRESS_INTERVAL = 0.25   # секунд між звітами про прогрес
+COLUMNAR_ITERSIZE = 50000  # рядків в одній порції для .npz і .parquet
+COPY_BUFFER = 1 << 20
+
+CSV, CSV_GZIP, NPZ, PARQUET = 'csv', 'csv.gz', 'npz', 'parquet'
+export_formats = {
+    CSV: 'CSV (*.csv)',
+    CSV_GZIP: 'CSV, gzip (*.csv.gz)',
+    NPZ: 'NumPy (*.npz)',
+    PARQUET: 'Parquet (*.parquet)',
+}
+
+# Типи PostgreSQL (oid з cursor.description) -> dtype стовпчика в .npz; решта - текст
+_bool_oids = {16}
+_int_oids = {20, 21, 23, 26}
+_float_oids = {700, 701, 1700}
+_date_oids = {1082}
+_timestamp_oids = {1114, 1184}
+
+
+def format_for_path(path):
+    for name in (CSV_GZIP, CSV, NPZ, PARQUET):
+        if path.lower().endswith('.' + name):
+            return name
+    raise ValueError(f'unknown export format: {path}')
+
+
+def available_formats():
+    formats = [CSV, CSV_GZIP, NPZ]
+    if importlib.util.find_spec('pyarrow') is not None:
+        formats.append(PARQUET)
+    return formats
+
+
+def select_query(table, where=None):
+    # where - sql.Composable з уже підставленими значеннями (для відфільтрованого перегляду);
+    # псевдонім t - як у запитах переглядача (пошук без текстових стовпчиків - t::text ILIKE)
+    query = sql.SQL('SELECT * FROM {} AS t').format(sql.Identifier(table))
+    if where is not None:
+        query = sql.SQL('{} WHERE {}').format(query, where)
+    return query
+
+
+def estimate_rows(connection, table, where=None):
+    # Оцінка з pg_class (після ANALYZE); для представлень - None. З умовою where -
+    # оцінка планувальника для відфільтрованого SELECT (reltuples - це вся таблиця)
+    cursor = connection.cursor()
+    if where is not None:
+        cursor.execute(sql.SQL('EXPLAIN (FORMAT JSON) {}').format(select_query(table, where)))
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    cursor.execute("SELECT relkind, reltuples FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    if row is None or row[0] not in ('r', 'p', 'm') or row[1] <= 0:
+        return None
+    return int(row[1])
+
+
+class _CountingWriter:
+    # Файл для copy_expert: рахує байти й рядки (переноси рядків) для звіту про прогрес
+    def __init__(self, target):
+        self.target = target
+        self.bytes = 0
+        self.lines = 0
+
+    def write(self, data):
+        self.target.write(data)
+        self.bytes += len(data)
+        self.lines += data.count(b'\n')
+
+
+def _progress(rows, total, bytes_written, started):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    return {'rows': rows, 'total': total, 'bytes': bytes_written, 'seconds': elapsed,
+            'rows_per_s': rows / elapsed, 'mb_per_s': bytes_written / elapsed / 2 ** 20}
+
+
+def export_csv(connection, table, path, where=None, gzipped=None, total=None):
+    # Генератор: COPY виконується в окремому потоці, а тут раз на PROGRESS_INTERVAL
+    # віддається прогрес. Закриття генератора (скасування) перериває COPY на сервері.
+    if gzipped is None:
+        gzipped = path.lower().endswith('.gz')
+    query = sql.SQL('COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)').format(select_query(table, where))
+    query = query.as_string(connection)
+    partial = path + '.part'
+    raw = open(partial, 'wb', buffering=COPY_BUFFER)
+    target = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=1) if gzipped else raw
+    writer = _CountingWriter(target)
+    outcome = {}
+
+    def copy():
+        try:
+            connection.cursor().copy_expert(query, writer, COPY_BUFFER)
+        except BaseException as e:
+            outcome['error'] = e
+
+    started = time.perf_counter()
+    worker = threading.Thread(target=copy, name='table-export-copy', daemon=True)
+    worker.start()
+    finished = False
+    try:
+        while worker.is_alive():
+            worker.join(PROGRESS_INTERVAL)
+            yield _progress(max(writer.lines - 1, 0), total, writer.bytes, started)
+        if 'error' in outcome:
+            raise outcome['error']
+        if gzipped:
+            target.close()
+        raw.close()
+        os.replace(partial, path)
+        finished = True
+        return _progress(max(writer.lines - 1, 0), total, writer.bytes, started)
+    finally:
+        if worker.is_alive():
+            try:
+                connection.cancel()
+            except psycopg2.Error:
+                pass
+            worker.join()
+        if not finished:
+            raw.close()
+            if os.path.exists(partial):
+                os.remove(partial)
+
+
+class _NpzWriter:
+    # Кожен стовпчик спершу дописується порціями у власний тимчасовий файл,
+    # а в кінці переписується в zip одним масивом - так у пам'яті лише одна порція
+    def __init__(self, path, description):
+        self.path = path
+        self.names = [column[0] for column in description]
+        self.oids = [column[1] for column in description]
+        self.directory = tempfile.mkdtemp(prefix='export_', dir=os.path.dirname(os.path.abspath(path)))
+        self.parts = [open(os.path.join(self.directory, f'{i}.parts'), 'wb') for i in range(len(self.names))]
+        self.masks = [open(os.path.join(self.directory, f'{i}.mask'), 'wb') for i in range(len(self.names))]
+        self.has_nulls = [False] * len(self.names)
+        self.widths = [1] * len(self.names)
+        self.chunks = 0
+        self.rows = 0
+
+    def column_array(self, index, values):
+        oid = self.oids[index]
+        if oid in _bool_oids:
+            return np.array([bool(v) for v in values], dtype=bool)
+        if oid in _int_oids:
+            return np.array([0 if v is None else v for v in values], dtype=np.int64)
+        if oid in _float_oids:
+            return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+        if oid in _date_oids:
+            return np.array(['NaT' if v is None else v for v in values], dtype='datetime64[D]')
+        if oid in _timestamp_oids:
+            # timestamptz зберігається в UTC, timestamp - як є
+            return np.array(['NaT' if v is None else
+                             (v.astimezone(timezone.utc).replace(tzinfo=None) if v.tzinfo else v)
+                             for v in values], dtype='datetime64[us]')
+        array = np.array(['' if v is None else str(v) for v in values], dtype=str)
+        self.widths[index] = max(self.widths[index], array.dtype.itemsize // 4)
+        return array
+
+    def final_dtype(self, index):
+        oid = self.oids[index]
+        if oid in _bool_oids:
+            return np.dtype(bool)
+        if oid in _int_oids:
+            return np.dtype(np.int64)
+        if oid in _float_oids:
+            return np.dtype(np.float64)
+        if oid in _date_oids:
+            return np.dtype('datetime64[D]')
+        if oid in _timestamp_oids:
+            return np.dtype('datetime64[us]')
+        # Рядки вирівнюються до найдовшого значення в усьому стовпчику
+        return np.dtype(f'U{self.widths[index]}')
+
+    def write(self, rows):
+        for index, values in enumerate(zip(*rows)):
+            mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+            self.has_nulls[index] = self.has_nulls[index] or bool(mask.any())
+            np.save(self.parts[index], self.column_array(index, values), allow_pickle=False)
+            self.masks[index].write(mask.tobytes())
+        self.chunks += 1
+        self.rows += len(rows)
+
+    def _write_member(self, archive, name, dtype, chunks):
+        header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (self.rows,)}
+        with archive.open(name + '.npy', 'w', force_zip64=True) as member:
+            np.lib.format.write_array_header_2_0(member, header)
+            for chunk in chunks:
+                member.write(np.ascontiguousarray(chunk, dtype=dtype).tobytes())
+
+    def close(self):
+        partial = self.path + '.part'
+        with zipfile.ZipFile(partial, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for index, name in enumerate(self.names):
+                self.parts[index].close()
+                self.masks[index].close()
+                with open(self.parts[index].name, 'rb') as parts:
+                    self._write_member(archive, name, self.final_dtype(index),
+                                       (np.load(parts) for _ in range(self.chunks)))
+                if self.has_nulls[index]:
+                    # Маска NULL лише для стовпчиків, де вони справді є: <стовпчик>__null
+                    with open(self.masks[index].name, 'rb') as masks:
+                        self._write_member(archive, name + '__null', np.dtype(bool), _read_blocks(masks))
+        os.replace(partial, self.path)
+
+    def discard(self):
+        for f in self.parts + self.masks:
+            f.close()
+        if os.path.exists(self.path + '.part'):
+            os.remove(self.path + '.part')
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _read_blocks(f):
+    while True:
+        block = f.read(COPY_BUFFER)
+        if not block:
+            return
+        yield np.frombuffer(block, dtype=bool)
+
+
+class _ParquetWriter:
+    def __init__(self, path, description):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.path = path
+        self.names = [column[0] for column in description]
+        self.writer = None
+        self.rows = 0
+
+    def write(self, rows):
+        table = self.pyarrow.table({name: list(values) for name, values in zip(self.names, zip(*rows))})
+        if self.writer is None:
+            # Схема береться з першої порції, наступні приводяться до неї
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.path + '.part', table.schema, compression='zstd')
+        self.writer.write_table(table.cast(self.writer.schema))
+        self.rows += len(rows)
+
+    def close(self):
+        if self.writer is None:
+            self.write_empty()
+        self.writer.close()
+        os.replace(self.path + '.part', self.path)
+
+    def write_empty(self):
+        table = self.pyarrow.table({name: self.pyarrow.array([], type=self.pyarrow.null()) for name in self.names})
+        self.writer = self.pyarrow.parquet.ParquetWriter(self.path + '.part', table.schema)
+
+    def discard(self):
+        if self.writer is not None:
+            self.writer.close()
+        if os.path.exists(self.path + '.part'):
+            os.remove(self.path + '.part')
+
+    def cleanup(self):
+        pass
+
+
+def _describe(connection, table, where):
+    # Імена й типи стовпчиків без читання рядків
+    cursor = connection.cursor()
+    cursor.execute(sql.SQL('{} LIMIT 0').format(select_query(table, where)))
+    return cursor.description
+
+
+def export_columnar(connection, table, path, where=None, fmt=None, total=None, itersize=COLUMNAR_ITERSIZE):
+    fmt = fmt or format_for_path(path)
+    description = _describe(connection, table, where)
+    writer = _NpzWriter(path, description) if fmt == NPZ else _ParquetWriter(path, description)
+    started = time.perf_counter()
+    finished = False
+    try:
+        for rows in stream_rows(connection, select_query(table, where), None, itersize):
+            writer.write(rows)
+            yield _progress(writer.rows, total, 0, started)
+        writer.close()
+        finished = True
+        return _progress(writer.rows, total, os.path.getsize(path), started)
+    finally:
+        if not finished:
+            writer.discard()
+        writer.cleanup()
+
+
+def export_table(connection, table, path, where=None, estimate=True):
+    # Для QueryExecutor.submit_stream: віддає словники прогресу
+    fmt = format_for_path(path)
+    catalog.relation(connection, table)  # лише таблиці з каталогу схеми, інакше UnknownIdentifier
+    total = estimate_rows(connection, table, where) if estimate else None
+    if fmt in (CSV, CSV_GZIP):
+        result = yield from export_csv(connection, table, path, where, fmt == CSV_GZIP, total)
+    else:
+        result = yield from export_columnar(connection, table, path, where, fmt, total)
+    # Останній елемент - підсумок з розміром готового файлу
+    yield result
+
+
+def export_view(connection, pager, path, estimate=True):
+    # Те, що показує переглядач: таблиця paging.KeysetPager з його фільтрами й пошуком
+    return export_table(connection, pager.table, path, pager.export_where(connection), estimate)
+
+
+def format_progress(progress):
+    rows = f"{progress['rows']:,}".replace(',', ' ')
+    if progress['total']:
+        rows += f" з ≈{progress['total']:,}".replace(',', ' ')
+    text = f"Рядків: {rows}   {progress['rows_per_s']:,.0f} рядків/с".replace(',', ' ')
+    if progress['bytes']:
+        text += f"   {progress['bytes'] / 2 ** 20:.1f} МБ, {progress['mb_per_s']:.1f} МБ/с"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default='dbname=MonitorAir')
+    parser.add_argument('table')
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(args.dsn)
+    progress = None
+    for progress in export_table(connection, args.table, args.path):
+        print('\r' + format_progress(progress), end='', flush=True)
+    print()
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+import sys
+from collections import OrderedDict
+from datetime import datetime, date, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+# OID типів PostgreSQL, які зберігаються у numpy-масивах (див. pg_type)
+INT_TYPE_OIDS = {20, 21, 23, 26}          # int8, int2, int4, oid
+FLOAT_TYPE_OIDS = {700, 701, 1700}        # float4, float8, numeric
+BOOL_TYPE_OIDS = {16}
+TIMESTAMP_TYPE_OIDS = {1114, 1184}        # timestamp, timestamptz
+DATE_TYPE_OIDS = {1082}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+EPOCH_DATE = date(1970, 1, 1)
+
+
+def column_kind(type_code, sample=None):
+    if type_code in BOOL_TYPE_OIDS:
+        return 'bool'
+    if type_code in INT_TYPE_OIDS:
+        return 'int'
+    if type_code in FLOAT_TYPE_OIDS:
+        return 'float'
+    if type_code in TIMESTAMP_TYPE_OIDS:
+        return 'timestamp'
+    if type_code in DATE_TYPE_OIDS:
+        return 'date'
+    if type_code is not None:
+        return 'text'
+    # Невідомий тип (наприклад, не psycopg2-курсор) - визначаємо за значенням
+    if isinstance(sample, bool):
+        return 'bool'
+    if isinstance(sample, int):
+        return 'int'
+    if isinstance(sample, (float, Decimal)):
+        return 'float'
+    if isinstance(sample, datetime):
+        return 'timestamp'
+    if isinstance(sample, date):
+        return 'date'
+    return 'text'
+
+
+class ColumnBuffer:
+    # Стовпчик таблиці: числа та час - у numpy-масиві з бітовою маскою NULL,
+    # текст - у списку інтернованих рядків (однакові значення займають пам'ять один раз)
+    dtypes = {'int': np.int64, 'float': np.float64, 'bool': np.bool_, 'timestamp': np.int64, 'date': np.int32}
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.size = 0
+        if kind == 'text':
+            self.values = []
+        else:
+            self.values = np.empty(0, dtype=self.dtypes[kind])
+            self.nulls = np.empty(0, dtype=np.bool_)
+        # Зсув часового поясу (у хвилинах) для кожного значення timestamptz
+        self.offsets = np.empty(0, dtype=np.int16) if kind == 'timestamp' else None
+        self.aware = False
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, count):
+        capacity = len(self.values)
+        if self.size + count <= capacity:
+            return
+        capacity = max(self.size + count, capacity * 2, 256)
+        self.values = np.resize(self.values, capacity)
+        self.nulls = np.resize(self.nulls, capacity)
+        if self.offsets is not None:
+            self.offsets = np.resize(self.offsets, capacity)
+
+    def append(self, values):
+        if self.kind == 'text':
+            self.values.extend(None if v is None else sys.intern(v if isinstance(v, str) else str(v))
+                               for v in values)
+            self.size += len(values)
+            return
+
+        count = len(values)
+        self._reserve(count)
+        start, end = self.size, self.size + count
+        self.nulls[start:end] = np.fromiter((v is None for v in values), dtype=np.bool_, count=count)
+
+        if self.kind == 'timestamp':
+            micros, offsets = self._encode_timestamps(values)
+            self.values[start:end] = micros
+            self.offsets[start:end] = offsets
+        elif self.kind == 'date':
+            self.values[start:end] = np.fromiter(
+                (0 if v is None else (v - EPOCH_DATE).days for v in values), dtype=np.int32, count=count)
+        else:
+            zero = self.values.dtype.type(0)
+            self.values[start:end] = np.fromiter(
+                (zero if v is None else v for v in values), dtype=self.values.dtype, count=count)
+        self.size = end
+
+    def _encode_timestamps(self, values):
+        micros = np.zeros(len(values), dtype=np.int64)
+        offsets = np.zeros(len(values), dtype=np.int16)
+        for i, v in enumerate(values):
+            if v is None:
+                continue
+            if v.tzinfo is not None:
+                self.aware = True
+                offset = v.utcoffset()
+                offsets[i] = offset.total_seconds() // 60
+                v = v.replace(tzinfo=None) - offset
+            delta = v - EPOCH.replace(tzinfo=None)
+            micros[i] = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+        return micros, offsets
+
+    def is_null(self, row):
+        if self.kind == 'text':
+            return self.values[row] is None
+        return bool(self.nulls[row])
+
+    def value(self, row):
+        if self.is_null(row):
+            return None
+        if self.kind == 'text':
+            return self.values[row]
+        raw = self.values[row]
+        if self.kind == 'timestamp':
+            moment = EPOCH + timedelta(microseconds=int(raw))
+            if not self.aware:
+                return moment.replace(tzinfo=None)
+            return moment.astimezone(timezone(timedelta(minutes=int(self.offsets[row]))))
+        if self.kind == 'date':
+            return EPOCH_DATE + timedelta(days=int(raw))
+        return raw.item()
+
+    def format(self, row):
+        value = self.value(row)
+        if value is None:
+            return ''
+        if self.kind == 'timestamp' and self.aware:
+            # Такий самий вигляд, як у str(datetime) з psycopg2: 2023-11-14 10:00:00+02:00
+            return value.isoformat(sep=' ')
+        return str(value)
+
+    @property
+    def nbytes(self):
+        if self.kind == 'text':
+            return sys.getsizeof(self.values)
+        total = self.values.nbytes + self.nulls.nbytes
+        if self.offsets is not None:
+            total += self.offsets.nbytes
+        return total
+
+
+class ColumnStore:
+    def __init__(self):
+        self.columns = []
+        self.column_names = []
+        self.row_count = 0
+
+    def set_schema(self, description, first_row=None):
+        self.column_names = [desc[0] for desc in description]
+        kinds = []
+        for col_num, desc in enumerate(description):
+            sample = first_row[col_num] if first_row is not None else None
+            kinds.append(column_kind(desc[1], sample))
+        self.columns = [ColumnBuffer(kind) for kind in kinds]
+        self.row_count = 0
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        for col_num, column in enumerate(self.columns):
+            column.append([row[col_num] for row in rows])
+        self.row_count += len(rows)
+
+    def format(self, row, column):
+        return self.columns[column].format(row)
+
+    def value(self, row, column):
+        return self.columns[column].value(row)
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns)
+
+
+class PagedTableModel(QAbstractTableModel):
+    # Таблиця довільного розміру: rowCount - оцінка кількості рядків у базі, а в пам'яті лише
+    # сторінки, які показувались нещодавно (не більше max_pages; найдавніше використані
+    # витісняються, крім сторінок у protected - навколо видимої області).
+    # Сторінки завантажує віджет (put_page); межові ключі сторінок зберігаються окремо
+    # і довше, щоб сусідню сторінку можна було прочитати від ключа, а не через OFFSET.
+    def __init__(self, page_size=200, max_pages=50, header_translation=None, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_page_keys = max_pages * 100
+        self.header_translation = header_translation or {}
+        self.column_names = []
+        self.pages = OrderedDict()      # номер сторінки -> ColumnStore
+        self.page_keys = OrderedDict()  # номер сторінки -> (перший ключ, останній ключ)
+        self.protected = set()
+        self.total = 0
+        self.exact = False  # False - total лише оцінка, кінець таблиці ще не бачили
+        self.end_bound = None  # рядків не більше (порожня сторінка за межею оцінки), поки немає точного числа
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.total
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.column_names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            page, row = divmod(index.row(), self.page_size)
+            store = self.pages.get(page)
+            # Незавантажена сторінка лишається порожньою, доки віджет її не підвантажить
+            if store is None or row >= store.row_count:
+                return None
+            return store.format(row, index.column())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            name = self.column_names[section]
+            return self.header_translation.get(name, name)
+        return None
+
+    def page_count(self):
+        # Поки кінця таблиці не бачили, завжди є щонайменше ще одна сторінка для запиту
+        pages = -(-self.total // self.page_size)
+        return pages if self.exact else max(pages, 1)
+
+    def neighbour_keys(self, page):
+        # (after, before) для читання сторінки від ключа сусідньої
+        after = self.page_keys.get(page - 1, (None, None))[1]
+        before = self.page_keys.get(page + 1, (None, None))[0]
+        return after, before
+
+    def set_row_count(self, total, exact):
+        if exact:
+            self.end_bound = None
+        if total == self.total:
+            self.exact = exact
+            return
+        if total > self.total:
+            self.beginInsertRows(QModelIndex(), self.total, total - 1)
+            self.total, self.exact = total, exact
+            self.endInsertRows()
+            return
+        self.beginRemoveRows(QModelIndex(), total, self.total - 1)
+        self.total, self.exact = total, exact
+        self.drop_after(total)
+        self.endRemoveRows()
+
+    def drop_after(self, total):
+        # Сторінки й ключі, що виходять за новий кінець таблиці, вже не відповідають їй
+        for page in [p for p, store in self.pages.items() if p * self.page_size + store.row_count > total]:
+            del self.pages[page]
+        for page in [p for p in self.page_keys if (p + 1) * self.page_size > total]:
+            del self.page_keys[page]
+
+    def set_estimate(self, total, exact):
+        # Результат count_rows; кінець таблиці, уже знайдений за сторінками, точніший за оцінку
+        if self.exact and not exact:
+            return
+        if not exact:
+            total = max(total, self.loaded_end())
+            if self.end_bound is not None:
+                total = min(total, self.end_bound)
+        self.set_row_count(total, exact)
+
+    def loaded_end(self):
+        return max((page * self.page_size + store.row_count for page, store in self.pages.items()), default=0)
+
+    def put_page(self, page, description, rows, first_key=None, last_key=None):
+        if not self.column_names and description:
+            self.beginInsertColumns(QModelIndex(), 0, len(description) - 1)
+            self.column_names = [desc[0] for desc in description]
+            self.endInsertColumns()
+        start = page * self.page_size
+        end = start + len(rows)
+        # Неповна сторінка - це кінець таблиці; повна сторінка за межею оцінки - таблиця більша.
+        # Порожня сторінка далі за першу лише каже, що рядків не більше, ніж start: оцінка була
+        # завищена, і точну кількість віджет рахує окремо (count_rows(exact=True))
+        if not rows:
+            if page == 0:
+                self.set_row_count(0, True)
+            elif not self.exact:
+                self.end_bound = start if self.end_bound is None else min(self.end_bound, start)
+                self.set_row_count(min(self.total, start), False)
+            return
+        if len(rows) < self.page_size or (self.end_bound is not None and end >= self.end_bound):
+            self.set_row_count(end, True)
+        elif end > self.total or (end == self.total and not self.exact):
+            self.set_row_count(end + 1, False)
+
+        store = ColumnStore()
+        store.set_schema(description, rows[0])
+        store.append_rows(rows)
+        self.pages[page] = store
+        self.pages.move_to_end(page)
+        if first_key is not None:
+            self.page_keys[page] = (first_key, last_key)
+            self.page_keys.move_to_end(page)
+            while len(self.page_keys) > self.max_page_keys:
+                self.page_keys.popitem(last=False)
+        self.evict()
+        self.dataChanged.emit(self.index(start, 0), self.index(end - 1, len(self.column_names) - 1))
+
+    def touch(self, pages):
+        # Сторінки у видимій області - щойно використані
+        self.protected = set(pages)
+        for page in pages:
+            if page in self.pages:
+                self.pages.move_to_end(page)
+
+    def evict(self):
+        for page in list(self.pages):
+            if len(self.pages) <= self.max_pages:
+                break
+            if page not in self.protected:
+                del self.pages[page]
+
+    def invalidate_tail(self):
+        # У таблиці з'явилися нові рядки: остання (можливо, неповна) сторінка вже не остання
+        if not self.exact:
+            return
+        last_page = (self.total - 1) // self.page_size if self.total else 0
+        self.pages.pop(last_page, None)
+        self.page_keys.pop(last_page, None)
+        self.set_row_count(self.total + 1, False)
+
+    def clear(self, keep_columns=False):
+        self.beginResetModel()
+        if not keep_columns:
+            self.column_names = []
+        self.pages.clear()
+        self.page_keys.clear()
+        self.protected = set()
+        self.total = 0
+        self.exact = False
+        self.end_bound = None
+        self.endResetModel()
+
+    def stats(self):
+        return {'pages': len(self.pages), 'max_pages': self.max_pages, 'rows': self.total, 'exact': self.exact,
+                'bytes': sum(store.nbytes for store in self.pages.values())}
+
+
+def format_page_stats(stats):
+    rows = f"{stats['rows']}" if stats['exact'] else f"~{stats['rows']}"
+    return (f"Рядків: {rows}  сторінок у пам'яті: {stats['pages']}/{stats['max_pages']} "
+            f"({stats['bytes'] / 2 ** 20:.1f} МБ)")
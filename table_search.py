@@ -0,0 +1,155 @@
+"""Пошук рядків у переглядачі таблиць за текстом у текстових стовпчиках.
+
+Рядок пошуку стає умовою WHERE (col1 ILIKE '%текст%' OR col2 ILIKE ...) над усіма
+текстовими стовпчиками таблиці (city, name_station, url, ...), а сторінки
+результату читаються тим самим KeysetPager, що й уся таблиця. "^текст" шукає
+лише з початку значення.
+
+ILIKE з '%' попереду не може скористатися звичайним btree-індексом, тож без
+індексу PostgreSQL переглядає всю таблицю. GIN-індекс з розширення pg_trgm
+(gin_trgm_ops) розбиває значення на трійки символів і знаходить кандидатів для
+будь-якого підрядка від MIN_SEARCH_CHARS символів (для пошуку з початку - і
+коротших), тож перші збіги повертаються за десятки мілісекунд і на сотнях тисяч
+рядків. Індекси створює команда indexes (CREATE INDEX CONCURRENTLY не блокує запис):
+
+    python table_search.py --dsn "dbname=MonitorAir user=postgres" indexes station mqtt_server
+    python table_search.py --dsn "..." search station Київ
+    python table_search.py --dsn "..." search station ^Льв --explain
+"""
+import argparse
+import re
+import time
+
+import psycopg2
+from psycopg2 import sql
+
+from data_access import catalog
+
+MIN_SEARCH_CHARS = 3  # коротший підрядок не містить жодної трійки і читає весь індекс
+SEARCH_DELAY_MS = 250  # пауза після останньої літери, перш ніж іде запит
+PREFIX = '^'
+
+
+def escape_like(text):
+    return re.sub(r'([\\%_])', r'\\\1', text)
+
+
+def search_pattern(text):
+    # Шаблон ILIKE для рядка пошуку або None, якщо рядок закороткий для пошуку
+    text = text.strip()
+    if text.startswith(PREFIX):
+        text = text[len(PREFIX):].strip()
+        return f"{escape_like(text)}%" if text else None
+    if len(text) < MIN_SEARCH_CHARS:
+        return None
+    return f"%{escape_like(text)}%"
+
+
+def text_columns(connection, table):
+    # Стовпчики text/varchar/char у порядку таблиці - з каталогу схеми (data_access)
+    return catalog.relation(connection, table).text_columns
+
+
+def search_condition(columns, pattern, literal=False):
+    # (col1 ILIKE p OR col2 ILIKE p ...) - кожен доданок окремо може взяти свій GIN-індекс (BitmapOr);
+    # у таблиці без текстових стовпчиків шукаємо в текстовому поданні всього рядка
+    value = sql.Literal(pattern) if literal else sql.Placeholder()
+    if not columns:
+        return sql.SQL('t::text ILIKE {}').format(value), [] if literal else [pattern]
+    condition = sql.SQL(' OR ').join(sql.SQL('{} ILIKE {}').format(sql.Identifier(c), value) for c in columns)
+    return condition, [] if literal else [pattern] * len(columns)
+
+
+def trigram_columns(connection, table):
+    # Стовпчики, з яких починається GIN/GiST-індекс з класом операторів pg_trgm
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT DISTINCT a.attname::text
+        FROM pg_index i
+        JOIN pg_opclass o ON o.oid = i.indclass[0]
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = to_regclass(%s) AND i.indisvalid AND i.indpred IS NULL
+          AND o.opcname IN ('gin_trgm_ops', 'gist_trgm_ops')
+    """, (table,))
+    return {name for name, in cursor.fetchall()}
+
+
+def trigram_index_sql(connection, table, column):
+    name = f"{table}_{column}_trgm"[:63]
+    return sql.SQL('CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} USING gin ({} gin_trgm_ops)').format(
+        sql.Identifier(name), sql.Identifier(table), sql.Identifier(column)).as_string(connection)
+
+
+def missing_trigram_indexes(connection, table):
+    # Оператори CREATE для текстових стовпчиків звичайної таблиці, які ще без trigram-індексу
+    cursor = connection.cursor()
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    if row is None or row[0] not in ('r', 'm'):
+        return []
+    columns = text_columns(connection, table)
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cursor.fetchone():
+        statements, indexed = [], trigram_columns(connection, table)
+    else:
+        statements, indexed = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'], set()
+    missing = [c for c in columns if c not in indexed]
+    if not missing:
+        return []
+    return statements + [trigram_index_sql(connection, table, c) for c in missing]
+
+
+def create_trigram_indexes(connection, table):
+    # CONCURRENTLY не можна виконувати в транзакції
+    statements = missing_trigram_indexes(connection, table)
+    connection.rollback()
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    try:
+        cursor = connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+    finally:
+        connection.autocommit = autocommit
+    return statements
+
+
+def search(connection, table, text, limit=100, explain=False):
+    pattern = search_pattern(text)
+    if pattern is None:
+        raise ValueError(f'рядок пошуку має бути щонайменше {MIN_SEARCH_CHARS} символи (або {PREFIX}початок)')
+    condition, params = search_condition(text_columns(connection, table), pattern)
+    query = sql.SQL('SELECT * FROM {} AS t WHERE {} LIMIT %s').format(sql.Identifier(table), condition)
+    if explain:
+        query = sql.SQL('EXPLAIN (ANALYZE, BUFFERS) ') + query
+    cursor = connection.cursor()
+    started = time.perf_counter()
+    cursor.execute(query, params + [limit])
+    rows = cursor.fetchall()
+    return rows, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dsn', default='dbname=MonitorAir')
+    parser.add_argument('--explain', action='store_true', help='надрукувати план запиту пошуку')
+    parser.add_argument('command', choices=['indexes', 'search'])
+    parser.add_argument('table')
+    parser.add_argument('text', nargs='*')
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(args.dsn)
+    if args.command == 'indexes':
+        for table in [args.table] + args.text:
+            for statement in create_trigram_indexes(connection, table) or [f'-- {table}: індекси вже є']:
+                print(statement)
+    else:
+        rows, ms = search(connection, args.table, ' '.join(args.text), explain=args.explain)
+        for row in rows:
+            print(*row, sep=' | ')
+        print(f"{len(rows)} рядків за {ms:.1f} ms")
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,34 @@
-from PyQt5.QtGui import QTextDocument
-from PyQt5.QtPrintSupport import QPrinter, QPrintPreviewDialog
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage
+import importlib
+
 from PyQt5.QtWidgets import (
     QWidget,
-    QVBoxLayout,
     QComboBox,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QHeaderView,
     QDesktopWidget,
     QPushButton,
-    QMainWindow,
-    QFileDialog,
-    QHBoxLayout,
     QGridLayout,
-    QDateEdit,
-    QSizePolicy
+    QLabel,
+    QCheckBox,
+    QFileDialog,
+    QProgressDialog,
+    QLineEdit,
+    QHBoxLayout
 )
-from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5 import QtGui
-import pdfkit
-from matplotlib import pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+from data_access import catalog
+from db_pool import format_pool_stats
+from live_updates import LiveListener
+from paging import KeysetPager
+from query_cache import query_cache, format_cache_stats
+from query_executor import QueryExecutor
+from perf_panel import install_perf_shortcut, toggle_perf_panel
+from query_log import ui_timer
+from table_export import available_formats, export_formats, export_view, format_progress
+from table_model import PagedTableModel, format_page_stats
+from table_search import SEARCH_DELAY_MS, search_pattern
 
 default_for_combobox = """
     QComboBox {
@@ -71,6 +78,16 @@ default_for_buttons = '''
     }
     '''
 
+default_for_search = """
+    QLineEdit {
+        background-color: #2E2E2E;
+        color: #FFFFFF;
+        border: 1px solid #555555;
+        padding: 5px;
+        font-size: 16px;
+    }
+"""
+
 default_for_datetime = """
     QDateEdit {
         background-color: #2E2E2E;
@@ -113,22 +130,181 @@ table_translation_dict = {
 }
 
 
-class LazyLoadTableWidget(QTableWidget):
+column_translation_dict = {
+    "id_server": "ID сервера",
+    "url": "URL",
+    "server_status": "Статус сервера",
+
+    "id_station": "ID станції",
+    "city": "Місто",
+    "name_station": "Назва станції",
+    "status_station": "Статус станції",
+    "id_saveecobot": "ID збереженого екобота",
 
-    def __init__(self, connection, *args, **kwargs):
+    "longitude": "Довгота",
+    "latitude": "Широта",
+    "coordinate": "Координати",
+    "category": "Категорії",
+    "user_name": "Ім'я користувача",
+
+    "id_category": "ID категорії",
+    "designation": "Позначення категорії",
+
+    "id_measured_unit": "ID одиниці вимірювання",
+    "title": "Заголовок",
+    "unit": "Одиниця вимірювання",
+
+    "bottom_border": "Нижня границя",
+    "upper_border": "Верхня границя",
+
+    "messages": "Повідомлення",
+    "order_mqtt_unit": "Порядок одиниці вимірювання",
+    "measured_unit": "Вимірювальна одиниця",
+    "id_measument": "ID вимірювання",
+    "time_meas": "Час вимірювання",
+    "value_meas": "Значення вимірювання"
+}
+
+# Таблиці, які показуються в переглядачі через представлення (view)
+table_view_translation_dict = {
+    "mqtt_server": "Сервер MQTT",
+    "station": "Станція",
+    "coordinates_view": "Координати",
+    "favourite_view": "Улюблене",
+    "category": "Категорія",
+    "measured_unit": "Одиниця вимірювання",
+    "optimal_value_view": "Оптимальні значення",
+    "mqtt_message_unit_view": "Повідомлення MQTT",
+    "measument_view": "Вимірювання"
+}
+table_view_names = {title: name for name, title in table_view_translation_dict.items()}
+
+MAX_CACHED_PAGES = 50  # сторінок переглядача в пам'яті; решта витісняється (LRU)
+PREFETCH_PAGES = 1     # скільки сторінок читати наперед з кожного боку видимої області
+PAGE_DELAY_MS = 40
+
+# Таблиці, у які нові вимірювання дописуються наживо (див. live_updates.py)
+live_tables = ("measument", "measument_view")
+
+
+def translated_table_names(names):
+    # Каталог схеми містить і службові таблиці (агрегати rollups, ...) - у списку лише ті, що мають переклад
+    return [table_translation_dict[name] for name in names if name in table_translation_dict]
+
+
+def set_busy(widget, busy):
+    if busy:
+        widget.setCursor(Qt.BusyCursor)
+    else:
+        widget.unsetCursor()
+
+
+class FilterHeader(QHeaderView):
+    # Заголовок таблиці з полем фільтра під назвою кожного стовпчика
+    filters_changed = pyqtSignal()
+
+    def __init__(self, parent):
+        super().__init__(Qt.Horizontal, parent)
+        self.editors = []
+        self.names = []
+        self.setSectionsClickable(True)
+        self.sectionResized.connect(self.position_editors)
+        self.sectionMoved.connect(self.position_editors)
+        parent.horizontalScrollBar().valueChanged.connect(self.position_editors)
+
+    def set_columns(self, names):
+        # Ті самі стовпчики (інше сортування чи фільтр) - поля з текстом лишаються
+        if names == self.names:
+            return
+        for editor in self.editors:
+            editor.deleteLater()
+        self.names = list(names)
+        self.editors = []
+        for name in self.names:
+            editor = QLineEdit(self)
+            editor.setPlaceholderText('фільтр')
+            editor.setToolTip('Текст - пошук підрядка; "> 5", "<= 2023-11-01", "= PM10" - порівняння')
+            editor.setClearButtonEnabled(True)
+            editor.textChanged.connect(self.filters_changed.emit)
+            editor.show()
+            self.editors.append(editor)
+        self.updateGeometries()
+
+    def filters(self):
+        return {name: editor.text() for name, editor in zip(self.names, self.editors) if editor.text().strip()}
+
+    def editor_height(self):
+        return self.editors[0].sizeHint().height() if self.editors else 0
+
+    def sizeHint(self):
+        size = super().sizeHint()
+        size.setHeight(size.height() + self.editor_height())
+        return size
+
+    def updateGeometries(self):
+        # Назви стовпчиків малюються у верхній частині, поля фільтрів - під ними
+        self.setViewportMargins(0, 0, 0, self.editor_height())
+        super().updateGeometries()
+        self.position_editors()
+
+    def position_editors(self):
+        top = super().sizeHint().height()
+        for index, editor in enumerate(self.editors):
+            editor.setGeometry(self.sectionViewportPosition(index), top,
+                               self.sectionSize(index), editor.sizeHint().height())
+
+
+class LazyLoadTableWidget(QTableView):
+    # Смуга прокрутки відповідає всій таблиці (оцінка кількості рядків з бази), а читаються
+    # лише сторінки навколо видимої області - туди, куди користувач перетягнув повзунок.
+    # Підказка CREATE INDEX для поточного сортування/фільтра (порожній рядок - індекси є)
+    index_hints_changed = pyqtSignal(str)
+
+    def __init__(self, pool, executor, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.connection = connection
-        self.batch_size = 100  # Кількість записів, які завантажуються за один раз
-        self.loaded_rows = 0
-        self.verticalHeader().setHidden(True)
-        # self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        # self.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
-        self.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)  # Растягиваем столбцы под содержимое
+        self.pool = pool
+        self.executor = executor
+        self.page_size = 200  # Кількість записів на сторінці
+        self.pager = None
+        self.exact_count_requested = False
+        self.requested = set()  # сторінки, які зараз читаються
+        self.columns_sized = False
+        self.sort = None    # (стовпчик, за спаданням) - сортує сервер, ORDER BY
+        self.filters = {}   # {стовпчик: текст фільтра} - WHERE
+        self.search = ''    # рядок пошуку по текстових стовпчиках (table_search)
+        self.pending_search = ''
+        self.table_model = PagedTableModel(self.page_size, MAX_CACHED_PAGES, column_translation_dict, self)
+        self.filter_header = FilterHeader(self)
+        self.setHorizontalHeader(self.filter_header)
+        self.setModel(self.table_model)
+        self.table_model.modelReset.connect(self.on_columns_changed)
+        self.table_model.columnsInserted.connect(self.on_columns_changed)
+        self.filter_header.sectionClicked.connect(self.on_header_clicked)
+        self.filter_header.filters_changed.connect(self.on_filters_edited)
+        # Запит іде, коли користувач перестав друкувати, а не на кожну літеру;
+        # попередній запит, що ще виконується, reload() скасовує на сервері
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(SEARCH_DELAY_MS)
+        self.filter_timer.timeout.connect(self.apply_filters)
+        # Поки повзунок тягнуть, сторінки не читаються; новий запит скасовує попередній
+        self.page_timer = QTimer(self)
+        self.page_timer.setSingleShot(True)
+        self.page_timer.setInterval(PAGE_DELAY_MS)
+        self.page_timer.timeout.connect(self.load_visible_pages)
+        self.verticalScrollBar().valueChanged.connect(self.schedule_pages)
+        self.table_model.rowsInserted.connect(self.schedule_pages)
+        self.executor.busy_changed.connect(self.on_busy_changed)
+        # Один шрифт на всю таблицю замість окремого QFont для кожної клітинки
+        self.setFont(QtGui.QFont("Arial", 14))
 
-        # Добавляем последний столбец, который будет растягиваться по ширине таблицы
-        last_column = self.columnCount()
-        self.insertColumn(last_column)
-        self.horizontalHeader().setSectionResizeMode(last_column, QHeaderView.Stretch)
+        self.verticalHeader().setHidden(True)
+        # Однакова висота рядків - QTableView не вимірює кожен рядок окремо
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 10)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        # Останній стовпчик розтягується по ширині таблиці
+        self.horizontalHeader().setStretchLastSection(True)
 
         header_style = """
         QHeaderView::section { 
@@ -139,112 +315,248 @@ class LazyLoadTableWidget(QTableWidget):
             }
             """
         self.setStyleSheet(header_style)
-        self.load_more_data()
-
-    def load_more_data(self):
-        table_translation_dict = {
-            "mqtt_server": "Сервер MQTT",
-            "station": "Станція",
-            "coordinates_view": "Координати",
-            "favourite_view": "Улюблене",
-            "category": "Категорія",
-            "measured_unit": "Одиниця вимірювання",
-            "optimal_value_view": "Оптимальні значення",
-            "mqtt_message_unit_view": "Повідомлення MQTT",
-            "measument_view": "Вимірювання"
-        }
-
-        cursor = self.connection.cursor()
-        selected_table = self.current_table_name()
-        for k, v in table_translation_dict.items():
-            if v == selected_table:
-                selected_table = k
-        sql_query = f"SELECT * FROM {selected_table} OFFSET {self.loaded_rows} LIMIT {self.batch_size};"
-        cursor.execute(sql_query)
-        data = cursor.fetchall()
-
-        translation_dict = {
-            "id_server": "ID сервера",
-            "url": "URL",
-            "server_status": "Статус сервера",
-
-            "id_station": "ID станції",
-            "city": "Місто",
-            "name_station": "Назва станції",
-            "status_station": "Статус станції",
-            "id_saveecobot": "ID збереженого екобота",
-
-            "longitude": "Довгота",
-            "latitude": "Широта",
-            "coordinate": "Координати",
-            "category": "Категорії",
-            "user_name": "Ім'я користувача",
-
-            "id_category": "ID категорії",
-            "designation": "Позначення категорії",
-
-            "id_measured_unit": "ID одиниці вимірювання",
-            "title": "Заголовок",
-            "unit": "Одиниця вимірювання",
-
-            "bottom_border": "Нижня границя",
-            "upper_border": "Верхня границя",
-
-            "messages": "Повідомлення",
-            "order_mqtt_unit": "Порядок одиниці вимірювання",
-            "measured_unit": "Вимірювальна одиниця",
-            "id_measument": "ID вимірювання",
-            "time_meas": "Час вимірювання",
-            "value_meas": "Значення вимірювання"
-        }
-
-        if data:
-            if self.loaded_rows == 0:
-                column_names = [desc[0] for desc in cursor.description]
-                # Перетворення назв стовпців за допомогою словника
-                translated_column_names = [translation_dict.get(col, col) for col in column_names]
-                self.setColumnCount(len(translated_column_names))
-                self.setHorizontalHeaderLabels(translated_column_names)
-
-            for row_data in data:
-                row_position = self.loaded_rows
 
-                self.insertRow(row_position)
-                for col_num, col_data in enumerate(row_data):
-                    item = QTableWidgetItem(str(col_data))
-                    item.setFont(QtGui.QFont("Arial", 14))  # Установите желаемый размер шрифта (например, 24)
-                    self.setItem(row_position, col_num, item)
-
-                self.loaded_rows += 1
-                self.loading = False
+    def load_table(self):
+        # Спершу pager визначає ключ і стовпчики пошуку (одне завдання), потім розмір таблиці
+        # і перші сторінки читаються паралельно тим самим pager, який вже лише читається
+        if not self.current_table_name():
+            return
+        self.pager = None
+        pager = KeysetPager(self.selected_table(), self.sort, self.filters, self.search)
+        self.executor.submit('table', pager.prepare, on_result=lambda result: self.on_pager_ready(pager),
+                             on_error=self.on_fetch_error)
+
+    def on_pager_ready(self, pager):
+        self.pager = pager
+        self.exact_count_requested = False
+        self.executor.submit('table_count', self.pager.count_rows,
+                             on_result=self.on_row_count, on_error=self.on_fetch_error)
+        self.load_visible_pages()
+
+    def on_row_count(self, result):
+        total, exact, hints = result
+        self.table_model.set_estimate(total, exact)
+        self.index_hints_changed.emit('\n'.join(hints))
+
+    def count_exactly(self):
+        # Сторінка за кінцем таблиці виявилась порожньою - оцінка завищена, рахуємо точно (один раз)
+        if self.exact_count_requested:
+            return
+        self.exact_count_requested = True
+        self.executor.submit('table_count', self.pager.count_rows, True,
+                             on_result=lambda result: self.table_model.set_estimate(*result[:2]),
+                             on_error=self.on_fetch_error)
+
+    def schedule_pages(self, *args):
+        self.page_timer.start()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_pages()
+
+    def visible_pages(self):
+        # Видимі сторінки за зростанням, потім по PREFETCH_PAGES після і перед ними
+        model = self.table_model
+        first = max(self.rowAt(0), 0)
+        last = self.rowAt(self.viewport().height() - 1)
+        if last < 0:
+            last = max(model.rowCount() - 1, first)
+        first_page, last_page = first // self.page_size, last // self.page_size
+        page_count = model.page_count()
+        pages = list(range(first_page, min(last_page + 1, page_count)))
+        pages += [p for p in range(last_page + 1, last_page + 1 + PREFETCH_PAGES) if p < page_count]
+        pages += [p for p in range(first_page - 1, first_page - 1 - PREFETCH_PAGES, -1) if p >= 0]
+        return pages
+
+    def load_visible_pages(self):
+        if self.pager is None:
+            return
+        pages = self.visible_pages()
+        self.table_model.touch(pages)
+        missing = [page for page in pages if page not in self.table_model.pages]
+        if not missing or set(missing) <= self.requested:
+            return
+        plan = [(page,) + self.table_model.neighbour_keys(page) for page in missing]
+        self.requested = set(missing)
+        self.executor.submit_stream('table', self.pager.fetch_pages, plan, self.page_size,
+                                    on_batch=self.on_page, on_result=self.on_pages_loaded,
+                                    on_error=self.on_fetch_error)
+
+    def on_page(self, result):
+        with ui_timer('table page', 'table', rows=len(result[2])):
+            self.table_model.put_page(*result)
+            if self.table_model.end_bound is not None:
+                self.count_exactly()
+            if not self.columns_sized and self.table_model.pages:
+                self.columns_sized = True
+                self.resizeColumnsToContents()
+
+    def on_pages_loaded(self, result):
+        self.requested = set()
+        self.schedule_pages()
+
+    def on_measurements_added(self, max_id=None):
+        # Без сортування нові рядки - у кінці таблиці: якщо кінець уже показано, він перестає бути
+        # кінцем, і остання сторінка перечитується, коли до неї догортають.
+        # При сортуванні за стовпчиком нові рядки можуть бути будь-де, тому наживо не дописуємо.
+        if self.pager is None or self.pager.table not in live_tables or self.sort is not None:
+            return
+        self.table_model.invalidate_tail()
+        self.schedule_pages()
+
+    def on_fetch_error(self, error):
+        self.requested = set()
+        # Найчастіше - значення фільтра, яке не приводиться до типу стовпчика
+        self.index_hints_changed.emit(f'Помилка запиту: {error}')
+        print(f'Error: {error}')
+
+    def on_busy_changed(self, channel, busy):
+        if channel == 'table':
+            set_busy(self.viewport(), busy)
 
     def current_table_name(self):
         return self.parent().table_combobox.currentText()
 
-    def scrollContentsBy(self, dx, dy):
-        # Викликається при прокручуванні вмісту
-        super().scrollContentsBy(dx, dy)
-        scrollbar = self.verticalScrollBar()
-        max_value = scrollbar.maximum()
-        current_value = scrollbar.value()
-        # Якщо користувач долистав до кінця таблиці
-        if current_value >= max_value:
-            self.load_more_data()
+    def selected_table(self):
+        # Назва таблиці в базі за її перекладом у списку
+        selected_table = self.current_table_name()
+        return table_view_names.get(selected_table, selected_table)
+
+    def on_columns_changed(self):
+        self.filter_header.set_columns(self.table_model.column_names)
+
+    def on_header_clicked(self, section):
+        # Зростання -> спадання -> порядок ключа таблиці
+        name = self.table_model.column_names[section]
+        if self.sort == (name, False):
+            self.sort = (name, True)
+        elif self.sort == (name, True):
+            self.sort = None
+        else:
+            self.sort = (name, False)
+        self.filter_header.setSortIndicatorShown(self.sort is not None)
+        if self.sort is not None:
+            self.filter_header.setSortIndicator(section, Qt.DescendingOrder if self.sort[1] else Qt.AscendingOrder)
+        self.reload()
+
+    def on_filters_edited(self):
+        self.filter_timer.start()
+
+    def set_search(self, text):
+        self.pending_search = text
+        self.filter_timer.start()
+
+    def apply_filters(self):
+        filters = self.filter_header.filters()
+        # Закороткий рядок пошуку (менше трьох символів) - показуємо всю таблицю
+        search = self.pending_search.strip() if search_pattern(self.pending_search) else ''
+        if (filters, search) != (self.filters, self.search):
+            self.filters = filters
+            self.search = search
+            if self.current_table_name():
+                self.reload()
+
+    def export_pager(self):
+        # Окремий pager з тими самими умовами - його prepare() виконується в потоці експорту
+        if not self.current_table_name():
+            return None
+        return KeysetPager(self.selected_table(), self.sort, self.filters, self.search)
+
+    def cancel_loading(self):
+        self.executor.cancel('table')
+        self.executor.cancel('table_count')
+        self.page_timer.stop()
+        self.requested = set()
+
+    def reload(self):
+        # Та сама таблиця з іншим ORDER BY / WHERE - з першої сторінки, стовпчики лишаються
+        self.cancel_loading()
+        self.table_model.clear(keep_columns=True)
+        self.scrollToTop()
+        self.load_table()
 
     def clear_table(self):
-        self.clearContents()
-        self.setRowCount(0)
-        self.loaded_rows = 0
+        # Сторінки попередньої таблиці, які ще завантажуються, вже не потрібні
+        self.cancel_loading()
+        self.filter_timer.stop()
+        self.pager = None
+        self.columns_sized = False
+        self.sort = None
+        self.filters = {}
+        self.filter_header.setSortIndicatorShown(False)
+        self.table_model.clear()
+        self.index_hints_changed.emit('')
+
+
+# Вікна звітів створюються лише тоді, коли користувач уперше їх відкриває:
+# модулі з QtWebEngine та matplotlib імпортуються тут же, а не під час запуску програми
+report_windows = {
+    'first': ('powerbi_reports', 'PowerBIApp_first', True),
+    'second': ('powerbi_reports', 'PowerBIApp_second', True),
+    'count_values': ('powerbi_reports', 'PowerBIReportCountValues', True),
+    'first_graphic': ('station_chart', 'PowerBIApp_first_graphic', True),
+    'like_bi': ('station_report', 'PowerLikeBIApp', True),
+    'map': ('station_map', 'StationMapWindow', True),
+}
+
+PREWARM_REPORTS = True  # Імпортувати модулі звітів, коли програма простоює після входу
+
+
+class ReportRegistry:
+    def __init__(self, pool, executor):
+        self.pool = pool
+        self.executor = executor
+        self.windows = {}
+        self.prewarm_queue = []
+
+    def get(self, name):
+        window = self.windows.get(name)
+        if window is None:
+            module_name, class_name, needs_executor = report_windows[name]
+            window_class = getattr(importlib.import_module(module_name), class_name)
+            if needs_executor:
+                window = window_class(self.pool, self.executor)
+            else:
+                window = window_class(self.pool)
+            install_perf_shortcut(window)
+            self.windows[name] = window
+        return window
+
+    def show(self, name):
+        window = self.get(name)
+        window.show()
+        window.raise_()
+        return window
+
+    def prewarm(self):
+        # По одному модулю за раз, щоб інтерфейс не завмирав на час усіх імпортів
+        self.prewarm_queue = sorted({module_name for module_name, _, _ in report_windows.values()})
+        QTimer.singleShot(0, self.prewarm_next)
+
+    def prewarm_next(self):
+        if not self.prewarm_queue:
+            return
+        module_name = self.prewarm_queue.pop(0)
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            # Помилку покаже вже саме вікно звіту, коли користувач його відкриє
+            print(f"Error in prewarm of {module_name}: {e}")
+        QTimer.singleShot(0, self.prewarm_next)
 
 
 class TablesWindow(QWidget):
-    def __init__(self, connection, login):
+    def __init__(self, pool, login):
         super().__init__()
         self.power_bi_app = None
         self.setWindowTitle('Засоби монітору якості повітря')
         self.setGeometry(0, 0, 1000, 800)
         self.setStyleSheet("background-color: #121212; color: #ffffff;")
-        self.connection = connection
+        self.pool = pool
+        self.executor = QueryExecutor(pool, self)
+        self.reports = ReportRegistry(pool, self.executor)
+        self.live_listener = None
+        self.export_progress = None
         self.login = login
         screen = QDesktopWidget().screenGeometry()
         window_size = self.geometry()
@@ -253,53 +565,15 @@ class TablesWindow(QWidget):
         self.move(x, y)
 
         if self.login == "access_tables":
-            cursor = connection.cursor()
-            sql_query = "SELECT tablename FROM pg_tables WHERE schemaname='public';"
-            cursor.execute(sql_query)
-            names = cursor.fetchall()
-
-            self.table_names = [table_translation_dict.get(name[0]) for name in names]
-
             layout = QGridLayout(self)
             layout.setAlignment(Qt.AlignTop)
-
-            self.table_combobox = QComboBox(self)
-            self.table_combobox.addItems(self.table_names)
-            self.table_combobox.setStyleSheet(default_for_combobox)
-            self.table_combobox.setFixedWidth(200)
-            self.table_combobox.currentIndexChanged.connect(self.on_combobox_change)
-            layout.addWidget(self.table_combobox, 0, 0, 1, 2)
-
-            self.table_widget = LazyLoadTableWidget(connection, self)
-            layout.addWidget(self.table_widget, 1, 0, 1, 2)
+            self.setup_table_browser(layout)
 
         elif self.login == "postgres":
-
-            cursor = connection.cursor()
-            sql_query = "SELECT tablename FROM pg_tables WHERE schemaname='public';"
-            cursor.execute(sql_query)
-            names = cursor.fetchall()
-
-            self.table_names = [table_translation_dict.get(name[0]) for name in names]
-
             layout = QGridLayout(self)
             layout.setAlignment(Qt.AlignTop)
 
-            self.table_combobox = QComboBox(self)
-            self.table_combobox.addItems(self.table_names)
-            self.table_combobox.setStyleSheet(default_for_combobox)
-            self.table_combobox.setFixedWidth(200)
-            self.table_combobox.currentIndexChanged.connect(self.on_combobox_change)
-            layout.addWidget(self.table_combobox, 0, 0, 1, 2)
-
-            self.table_widget = LazyLoadTableWidget(connection, self)
-            layout.addWidget(self.table_widget, 1, 0, 1, 2)
-
-            self.power_bi_app_first = PowerBIApp_first(connection)
-            self.power_bi_app_first_graphic = PowerBIApp_first_graphic(connection)
-            self.power_bi_app_second = PowerBIApp_second(connection)
-            self.power_like_bi_app = PowerLikeBIApp(connection)
-            self.power_bi_report_count_values = PowerBIReportCountValues(connection)
+            self.setup_table_browser(layout)
 
             self.report_like_BI_button = QPushButton(
                 'Звіт писок підключених станцій з можливістю друкувати та ковертувати в pdf', self)
@@ -307,13 +581,13 @@ class TablesWindow(QWidget):
             self.report_like_BI_button.setStyleSheet(default_for_buttons)
             layout.addWidget(self.report_like_BI_button, 2, 0)
 
-            self.report_BI_button = QPushButton('Список підключених станцій PowerBI', self)
+            self.report_BI_button = QPushButton('Список підключених станцій', self)
             self.report_BI_button.clicked.connect(self.report_bi_function)
             self.report_BI_button.setStyleSheet(default_for_buttons)
             layout.addWidget(self.report_BI_button, 2, 1)
 
             self.connected_stations_without_dublicate_button = QPushButton(
-                'Результати вимірювань станції за часовий період PowerBI', self)
+                'Результати вимірювань станції по добах', self)
             self.connected_stations_without_dublicate_button.clicked.connect(self.report_bi_second_function)
             self.connected_stations_without_dublicate_button.setStyleSheet(default_for_buttons)
             layout.addWidget(self.connected_stations_without_dublicate_button, 3, 0)
@@ -328,29 +602,28 @@ class TablesWindow(QWidget):
             self.count_values_view_button.setStyleSheet(default_for_buttons)
             layout.addWidget(self.count_values_view_button, 4, 0, 1, 2)
 
+            self.station_map_button = QPushButton('Карта станцій', self)
+            self.station_map_button.clicked.connect(self.report_station_map_function)
+            self.station_map_button.setStyleSheet(default_for_buttons)
+            layout.addWidget(self.station_map_button, 5, 0, 1, 2)
+
         elif self.login == "access_reports":
             layout = QGridLayout(self)
             layout.setAlignment(Qt.AlignTop)
 
-            self.power_bi_app_first = PowerBIApp_first(connection)
-            self.power_bi_app_first_graphic = PowerBIApp_first_graphic(connection)
-            self.power_bi_app_second = PowerBIApp_second(connection)
-            self.power_like_bi_app = PowerLikeBIApp(connection)
-            self.power_bi_report_count_values = PowerBIReportCountValues(connection)
-
             self.report_like_BI_button = QPushButton(
                 'Звіт писок підключених станцій з можливістю друкувати та ковертувати в pdf', self)
             self.report_like_BI_button.clicked.connect(self.report_like_bi_function)
             self.report_like_BI_button.setStyleSheet(default_for_buttons)
             layout.addWidget(self.report_like_BI_button, 2, 0)
 
-            self.report_BI_button = QPushButton('Список підключених станцій PowerBI', self)
+            self.report_BI_button = QPushButton('Список підключених станцій', self)
             self.report_BI_button.clicked.connect(self.report_bi_function)
             self.report_BI_button.setStyleSheet(default_for_buttons)
             layout.addWidget(self.report_BI_button, 2, 1)
 
             self.connected_stations_without_dublicate_button = QPushButton(
-                'Результати вимірювань станції за часовий період PowerBI', self)
+                'Результати вимірювань станції по добах', self)
             self.connected_stations_without_dublicate_button.clicked.connect(self.report_bi_second_function)
             self.connected_stations_without_dublicate_button.setStyleSheet(default_for_buttons)
             layout.addWidget(self.connected_stations_without_dublicate_button, 3, 0)
@@ -365,324 +638,217 @@ class TablesWindow(QWidget):
             self.count_values_view_button.setStyleSheet(default_for_buttons)
             layout.addWidget(self.count_values_view_button, 4, 0, 1, 2)
 
+            self.station_map_button = QPushButton('Карта станцій', self)
+            self.station_map_button.clicked.connect(self.report_station_map_function)
+            self.station_map_button.setStyleSheet(default_for_buttons)
+            layout.addWidget(self.station_map_button, 5, 0, 1, 2)
+
+        if hasattr(self, 'table_widget'):
+            # Порада щодо індексу для обраного сортування/фільтра - текст можна скопіювати
+            self.index_hint_label = QLabel(self)
+            self.index_hint_label.setStyleSheet('color: #c8a060; font-size: 11px;')
+            self.index_hint_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+            self.index_hint_label.hide()
+            self.table_widget.index_hints_changed.connect(self.show_index_hints)
+            layout.addWidget(self.index_hint_label, layout.rowCount(), 0, 1, 2)
+
+        # Статистика пулу з'єднань і кешу запитів, щоб було видно, чи вистачає з'єднань аналітикам
+        self.stats_label = QLabel(self)
+        self.stats_label.setStyleSheet('color: #888888; font-size: 11px;')
+        layout.addWidget(self.stats_label, layout.rowCount(), 0, 1, 2)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(2000)
+        self.update_stats()
+
+        self.live_checkbox = QCheckBox('Оновлення наживо', self)
+        self.live_checkbox.toggled.connect(self.set_live)
+        layout.addWidget(self.live_checkbox, layout.rowCount(), 0)
+
+        # Перцентилі запитів і витрат інтерфейсу по вікнах; у звітах - Ctrl+Shift+P
+        self.perf_button = QPushButton('Продуктивність (Ctrl+Shift+P)', self)
+        self.perf_button.clicked.connect(lambda: toggle_perf_panel(self))
+        layout.addWidget(self.perf_button, layout.rowCount() - 1, 1)
+        install_perf_shortcut(self)
+
         self.setLayout(layout)
 
+        if PREWARM_REPORTS and self.login != 'access_tables':
+            self.reports.prewarm()
+
+    def setup_table_browser(self, layout):
+        # Переглядач таблиць у рядках 0-1: вибір таблиці, пошук (запит іде після паузи
+        # у введенні, див. LazyLoadTableWidget.set_search), експорт і сама таблиця
+        top_layout = QHBoxLayout()
+        self.table_combobox = QComboBox(self)
+        self.table_combobox.setStyleSheet(default_for_combobox)
+        self.table_combobox.setFixedWidth(200)
+        self.table_combobox.currentIndexChanged.connect(self.on_combobox_change)
+        top_layout.addWidget(self.table_combobox)
+
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText('Пошук: місто, назва станції, URL... (^ - з початку)')
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setStyleSheet(default_for_search)
+        top_layout.addWidget(self.search_edit, 1)
+
+        self.export_button = QPushButton('Експорт', self)
+        self.export_button.clicked.connect(self.export_current_table)
+        self.export_button.setStyleSheet(default_for_buttons)
+        top_layout.addWidget(self.export_button)
+        layout.addLayout(top_layout, 0, 0, 1, 2)
+
+        self.table_widget = LazyLoadTableWidget(self.pool, self.executor, self)
+        layout.addWidget(self.table_widget, 1, 0, 1, 2)
+        self.search_edit.textChanged.connect(self.table_widget.set_search)
+        self.populate_table_combobox()
+
+    def show_index_hints(self, hints):
+        if hints and not hints.startswith('Помилка'):
+            hints = 'Запит без відповідного індексу, варто створити:\n' + hints
+        self.index_hint_label.setText(hints)
+        self.index_hint_label.setVisible(bool(hints))
+
+    def update_stats(self):
+        text = f"{format_pool_stats(self.pool.stats())}  {format_cache_stats(query_cache.stats())}"
+        if hasattr(self, 'table_widget'):
+            text += f"  {format_page_stats(self.table_widget.table_model.stats())}"
+        self.stats_label.setText(text)
+
+    def set_live(self, enabled):
+        if not enabled:
+            if self.live_listener is not None:
+                self.live_listener.stop()
+                self.live_listener = None
+            return
+        listener = LiveListener(self.pool.connect_kwargs, parent=self)
+        try:
+            listener.start()
+        except Exception as e:
+            print(f"Error in set_live: {e}")
+            self.live_checkbox.setChecked(False)
+            return
+        listener.measurements_added.connect(self.on_measurements_added)
+        listener.failed.connect(self.on_live_failed)
+        self.live_listener = listener
+
+    def on_live_failed(self, error):
+        print(f"Error in live updates: {error}")
+        self.live_listener = None
+        self.live_checkbox.setChecked(False)
+
+    def on_measurements_added(self, max_id):
+        if hasattr(self, 'table_widget'):
+            self.table_widget.on_measurements_added(max_id)
+        for window in self.reports.windows.values():
+            on_measurements_added = getattr(window, 'on_measurements_added', None)
+            if on_measurements_added is not None and window.isVisible():
+                on_measurements_added(max_id)
+
+    def populate_table_combobox(self):
+        # Каталог схеми читається один раз за сесію; переглядач, пошук і експорт беруть його з пам'яті
+        self.executor.submit('table_names', catalog.table_names, on_result=self.on_table_names)
+
+    def on_table_names(self, names):
+        self.table_names = translated_table_names(names)
+        self.table_combobox.addItems(self.table_names)
+
     def report_count_values_function(self) -> None:
         if self.login != 'access_tables':
             try:
-                self.power_bi_report_count_values.show()
+                self.reports.show('count_values')
             except Exception as e:
                 print(f"Error in report_BI_function: {e}")
 
     def report_bi_function(self) -> None:
         if self.login != 'access_tables':
             try:
-                self.power_bi_app_first.show()
+                self.reports.show('first')
             except Exception as e:
                 print(f"Error in report_BI_function: {e}")
 
     def report_graphic_like_bi_function(self) -> None:
         if self.login != 'access_tables':
             try:
-                self.power_bi_app_first_graphic.show()
+                self.reports.show('first_graphic')
             except Exception as e:
                 print(f"Error in report_graphic_Like_BI_function: {e}")
 
     def report_bi_second_function(self) -> None:
         if self.login != 'access_tables':
             try:
-                self.power_bi_app_second.show()
+                self.reports.show('second')
             except Exception as e:
                 print(f"Error in report_BI_second_function: {e}")
 
     def report_like_bi_function(self) -> None:
         if self.login != 'access_tables':
             try:
-                self.power_like_bi_app.show()
+                self.reports.show('like_bi')
             except Exception as e:
                 print(f"Error in report_like_BI_function: {e}")
 
+    def report_station_map_function(self) -> None:
+        if self.login != 'access_tables':
+            try:
+                created = 'map' not in self.reports.windows
+                window = self.reports.show('map')
+                if created:
+                    window.station_selected.connect(self.open_station_chart)
+            except Exception as e:
+                print(f"Error in report_station_map_function: {e}")
+
+    def open_station_chart(self, address):
+        try:
+            self.reports.show('first_graphic').show_station(address)
+        except Exception as e:
+            print(f"Error in open_station_chart: {e}")
+
+    def export_current_table(self):
+        table = self.table_widget.selected_table()
+        if not table:
+            return
+        formats = available_formats()
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Експорт таблиці", f"{table}.csv", ';;'.join(export_formats[name] for name in formats))
+        if not file_path:
+            return
+        if not any(file_path.lower().endswith('.' + name) for name in formats):
+            extension = next((name for name in formats if export_formats[name] == selected_filter), formats[0])
+            file_path += '.' + extension
+
+        # COPY пише файл у фоновому потоці; діалог лише показує швидкість і дає скасувати
+        self.export_progress = QProgressDialog(f'Експорт {table}...', 'Скасувати', 0, 0, self)
+        self.export_progress.setWindowModality(Qt.WindowModal)
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.canceled.connect(lambda: self.executor.cancel('table_export'))
+        self.export_progress.show()
+        # Вивантажується те, що відфільтровано в переглядачі
+        self.executor.submit_stream('table_export', export_view, self.table_widget.export_pager(), file_path,
+                                    on_batch=self.on_export_progress,
+                                    on_result=self.on_export_finished,
+                                    on_error=self.on_export_failed)
+
+    def on_export_progress(self, progress):
+        if progress['total']:
+            # Оцінка кількості рядків може бути меншою за справжню - не даємо діалогу закритися раніше
+            self.export_progress.setMaximum(max(progress['total'], progress['rows'] + 1))
+            self.export_progress.setValue(progress['rows'])
+        self.export_progress.setLabelText(format_progress(progress))
+
+    def on_export_finished(self, result):
+        self.export_progress.reset()
+
+    def on_export_failed(self, error):
+        self.export_progress.reset()
+        print(f"Error in export: {error}")
+
+    def closeEvent(self, event):
+        self.executor.cancel_all()
+        if self.live_listener is not None:
+            self.live_listener.stop()
+        super().closeEvent(event)
+
     def on_combobox_change(self):
-        self.table_widget.clearContents()
-        self.table_widget.setRowCount(0)
-        self.table_widget.loaded_rows = 0
-        self.table_widget.load_more_data()
         self.table_widget.clear_table()  # Очищаємо таблицю перед завантаженням нових даних
-        self.table_widget.load_more_data()
-
-
-class PowerBIReportCountValues(QMainWindow):
-    def __init__(self, connection):
-        super().__init__()
-        self.connection = connection
-        self.setGeometry(100, 100, 1800, 900)
-        self.initUI()
-
-    def initUI(self):
-        self.webview = QWebEngineView(self)
-        self.setCentralWidget(self.webview)
-
-        # Set custom web engine page to handle SSL certificate errors
-        page = CustomWebEnginePage(self.webview)
-        self.webview.setPage(page)
-
-        # URL of the Power BI report
-        report_url = "https://app.powerbi.com/groups/me/reports/a202ae3c-3b0d-4c76-a8d8-71fbe0072101/ReportSectionfd2a5a13900278aa8244?experience=power-bi"
-
-        # Load the Power BI report in the QWebEngineView
-        self.webview.load(QUrl(report_url))
-
-
-
-class PowerLikeBIApp(QMainWindow):
-    def __init__(self, connection):
-        super().__init__()
-        self.connection = connection
-        self.initUI()
-
-    def initUI(self):
-        self.web_view = QWebEngineView()
-        central_widget = QWidget(self)
-        self.setCentralWidget(central_widget)
-        layout = QVBoxLayout()
-        central_widget.setLayout(layout)
-
-        # Создаем HTML-код для таблицы
-        cursor = self.connection.cursor()
-        sql_query = "SELECT * FROM connected_stations_without_dublicate"
-        cursor.execute(sql_query)
-        data = cursor.fetchall()
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-        <meta charset="UTF-8">
-        <h1 style="text-align:center; color: #44244c;">Список підключених станцій</h1>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: #FFFFFF;
-                    color: #000000;
-                    margin: 20px;
-                }}
-                h1 {{
-                    text-align: center;
-                    color: #4CAF50;
-                }}
-                table {{
-                    width: 80%;
-                    margin: 20px auto;
-                    border-collapse: collapse;
-                }}
-                th, td {{
-                    padding: 10px;
-                    text-align: left;
-                    border-bottom: 1px solid #ddd;
-                }}
-                th {{
-                    background-color: #723d7f;
-                    color: white;
-                }}
-                tr:nth-child(even) {{
-                    background-color: #d7eaf9;
-                }}
-            </style>
-        </head>
-        <body>
-            <table border="1">
-                <tr>
-                    <th>Адреса</th>
-                    <th>Статус</th>
-                    <th>Вимір</th>
-                </tr>
-                {''.join(["<tr><td>{0}</td><td>{1}</td><td>{2}</td></tr>".format(i1, i2, i3) for i1, i2, i3 in data])}
-            </table>
-        </body>
-        </html>
-        """
-
-        web_view = QWebEngineView()
-        web_view.setHtml(html_content)  # Устанавливаем HTML-код в QWebEngineView
-        layout.addWidget(web_view)
-
-        convert_button = QPushButton('Конвертувати в pdf', self)
-        convert_button.clicked.connect(lambda: self.convertToPdf(html_content))
-        convert_button.setStyleSheet(default_for_buttons)
-        # layout.addWidget(convert_button)
-
-        print_button = QPushButton('Роздрукувати', self)
-        print_button.clicked.connect(lambda: self.printToPdf(html_content))
-        print_button.setStyleSheet(default_for_buttons)
-        # layout.addWidget(print_button)
-
-        button_layout = QHBoxLayout()
-        button_layout.addWidget(print_button)
-        button_layout.addWidget(convert_button)
-        layout.addLayout(button_layout)
-
-        self.setGeometry(100, 100, 800, 600)
-        self.setWindowTitle('Звіт')
-
-    def printToPdf(self, html_content):
-        document = QTextDocument()
-        document.setHtml(html_content)
-
-        printer = QPrinter()
-        printer.setOutputFormat(QPrinter.PdfFormat)
-
-        preview = QPrintPreviewDialog(printer)
-        preview.paintRequested.connect(
-            lambda: self.printPreview(document, printer))  # Подключаем слот для отображения содержимого
-        preview.exec_()
-
-    def printPreview(self, document, printer):
-        document.print_(printer)
-
-    def convertToPdf(self, html_content):
-        options = QFileDialog.Options()
-        file_path, _ = QFileDialog.getSaveFileName(self, "Зберегти як PDF", "", "PDF Files (*.pdf);;All Files (*)",
-                                                   options=options)
-
-        if file_path:
-            config = pdfkit.configuration(wkhtmltopdf='C:/Program Files/wkhtmltopdf/bin/wkhtmltopdf.exe')
-            pdfkit.from_string(html_content, file_path, configuration=config)
-
-
-class CustomWebEnginePage(QWebEnginePage):
-    def certificateError(self, error):
-        # Ignore SSL certificate errors
-        return True
-
-
-class PowerBIApp_second(QMainWindow):
-    def __init__(self, connection):
-        super().__init__()
-        self.setWindowTitle('Power BI Report')
-        self.setGeometry(100, 100, 1200, 800)
-        self.initUI()
-
-    def initUI(self):
-        self.webview = QWebEngineView(self)
-        self.setCentralWidget(self.webview)
-
-        # Set custom web engine page to handle SSL certificate errors
-        page = CustomWebEnginePage(self.webview)
-        self.webview.setPage(page)
-
-        # URL of the Power BI report
-        report_url = "https://app.powerbi.com/groups/me/reports/3afd1bfa-a43c-42a6-90dd-b6c284878b1e/ReportSection?ctid=b42ffd57-19ac-4d2f-867f-e971c16b5159&experience=power-bi"
-
-        # Load the Power BI report in the QWebEngineView
-        self.webview.load(QUrl(report_url))
-
-
-class PowerBIApp_first(QMainWindow):
-    def __init__(self, connection):
-        super().__init__()
-        self.setWindowTitle('Power BI Report')
-        self.setGeometry(100, 100, 1200, 800)
-        self.connection = connection
-        self.initUI()
-
-    def initUI(self):
-        self.webview = QWebEngineView(self)
-        self.setCentralWidget(self.webview)
-
-        page = CustomWebEnginePage(self.webview)
-        self.webview.setPage(page)
-
-        report_url = "https://app.powerbi.com/groups/me/reports/9abc14ba-e6cb-4f5e-9507-6fc776b81356/ReportSection?ctid=b42ffd57-19ac-4d2f-867f-e971c16b5159&pbi_source=shareVisual&visual=4872a1397275ad62d5d6&height=503.45&width=581.20&bookmarkGuid=b6ef4b18-ac65-423f-9b93-f8e5451ba06c"
-
-        self.webview.load(QUrl(report_url))
-
-
-class PowerBIApp_first_graphic(QMainWindow):
-    def __init__(self, connection):
-        super().__init__()
-        self.setWindowTitle('Power BI Report')
-        self.setGeometry(100, 100, 1500, 800)
-        self.connection = connection
-
-        main_layout = QVBoxLayout()
-
-        date_layout = QHBoxLayout()
-
-        self.start_date_edit = QDateEdit()
-        self.start_date_edit.setStyleSheet(default_for_datetime)
-        date_layout.addWidget(self.start_date_edit, stretch=1)
-        self.start_date_edit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-
-        self.end_date_edit = QDateEdit()
-        self.end_date_edit.setStyleSheet(default_for_datetime)
-        date_layout.addWidget(self.end_date_edit, stretch=1)
-        self.end_date_edit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-
-        main_layout.addLayout(date_layout)
-
-        self.comboBox = QComboBox()
-        self.comboBox.setStyleSheet(default_for_combobox)
-        main_layout.addWidget(self.comboBox)
-
-        self.first_graphic_button = QPushButton('Показати', self)
-        main_layout.addWidget(self.first_graphic_button)
-        self.first_graphic_button.clicked.connect(self.handle_combobox_change)
-        self.first_graphic_button.setStyleSheet(default_for_buttons)
-
-        self.figure, self.ax = plt.subplots(figsize=(5, 4))
-        self.canvas = FigureCanvas(self.figure)
-        main_layout.addWidget(self.canvas)
-
-        central_widget = QWidget()
-        central_widget.setLayout(main_layout)
-        self.setCentralWidget(central_widget)
-
-        self.populate_combobox()
-
-    def populate_combobox(self):
-        cursor = self.connection.cursor()
-        sql_query_db_names = "SELECT DISTINCT Адреса FROM connected_stations_without_dublicate"
-        cursor.execute(sql_query_db_names)
-        address_name = cursor.fetchall()
-
-        address_names = [list(name)[0] for name in address_name]
-        self.comboBox.addItems(address_names)
-
-    def handle_combobox_change(self):
-        selected_address = self.comboBox.currentText()
-
-        cursor = self.connection.cursor()
-        sql_query = """
-            SELECT "Вимір", MIN("Величина"), MAX("Величина"), AVG("Величина")
-            FROM station_measurment_time_view
-            WHERE "Адреса" = %s AND "Дата" BETWEEN %s AND %s
-            GROUP BY "Вимір"
-        """
-        start_date = self.start_date_edit.date().toString("yyyy-MM-dd 00:00:00+03")
-        end_date = self.end_date_edit.date().toString("yyyy-MM-dd 23:59:59+03")
-
-        cursor.execute(sql_query, (selected_address, start_date, end_date))
-        results = cursor.fetchall()
-
-        measurement_names = [row[0] for row in results]
-        min_values = [row[1] for row in results]
-        max_values = [row[2] for row in results]
-        avg_values = [row[3] for row in results]
-
-        self.ax.clear()
-
-        for i, name in enumerate(measurement_names):
-            min_val = min_values[i]
-            max_val = max_values[i]
-            avg_val = avg_values[i]
-
-            self.ax.barh(f"{name}(min)", min_val, color='r')
-            self.ax.barh(f"{name}(max)", max_val, color='b', left=0)
-            self.ax.barh(f"{name}(avg)", avg_val, color='g', left=0)
-
-        self.ax.set_xlabel('Значення')
-        self.ax.set_ylabel('Величина вимірювання')
-        self.ax.set_title(f'Мінімальні, максимальні та середні значення для адреси: {selected_address}')
-        self.ax.legend()
-        self.ax.grid(True)
-
-        self.canvas.draw()
+        self.table_widget.load_table()
@@ -0,0 +1,89 @@
+"""Заміники бази даних для тестів: каталог схеми без сервера, текст запитів без з'єднання
+і з'єднання для пулу."""
+from types import SimpleNamespace
+
+import psycopg2
+from psycopg2 import extensions, sql
+
+from data_access import Relation
+
+
+def relation(name, columns, kind='r', unique_key=None):
+    # columns - {стовпчик: тип}; усі стовпчики NOT NULL лише якщо вони в ключі
+    result = Relation(name, kind)
+    result.columns = list(columns)
+    result.types = dict(columns)
+    result.not_null = {c: c in (unique_key or ()) for c in columns}
+    result.unique_key = tuple(unique_key) if unique_key else None
+    return result
+
+
+def use_catalog(monkeypatch, *relations):
+    # Каталог, уже "прочитаний" з бази: жоден запит до pg_class не виконується
+    from data_access import catalog
+    monkeypatch.setattr(catalog, 'relations', {r.name: r for r in relations})
+
+
+def render(query):
+    # Текст sql.Composable без з'єднання (as_string вимагає справжнє з'єднання psycopg2)
+    if isinstance(query, sql.Composed):
+        return ''.join(render(part) for part in query)
+    if isinstance(query, sql.SQL):
+        return query.string
+    if isinstance(query, sql.Identifier):
+        return '.'.join('"' + s.replace('"', '""') + '"' for s in query.strings)
+    if isinstance(query, sql.Literal):
+        value = query.wrapped
+        return "'" + str(value).replace("'", "''") + "'" if isinstance(value, str) else str(value)
+    if isinstance(query, sql.Placeholder):
+        return '%s'
+    return str(query)
+
+
+class FakeConnection:
+    # З'єднання для db_pool: alive=False - сервер "зник", запити падають з OperationalError
+    def __init__(self, number=0):
+        self.number = number
+        self.closed = 0
+        self.alive = True
+        self.rollbacks = 0
+        self.info = SimpleNamespace(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if not self.alive:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def __repr__(self):
+        return f'FakeConnection({self.number})'
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        if not self.connection.alive:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.connection.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+
+    def fetchone(self):
+        return (1,)
+
+
+def fake_connect(monkeypatch):
+    # psycopg2.connect у db_pool відкриває FakeConnection; повертає список відкритих з'єднань
+    opened = []
+
+    def connect(**kwargs):
+        opened.append(FakeConnection(len(opened)))
+        return opened[-1]
+    monkeypatch.setattr(psycopg2, 'connect', connect)
+    return opened
@@ -0,0 +1,56 @@
+import gc
+
+import data_access
+from data_access import execute_prepared, prepared_queries, statement_name
+
+
+class FakeConnection:
+    autocommit = True
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    name = None
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        self.connection.statements.append(query.split()[0])
+
+
+def run(connection, count, first=0):
+    cursor = connection.cursor()
+    for i in range(first, first + count):
+        execute_prepared(cursor, f'SELECT * FROM station WHERE id_station = %s AND {i} = {i}', (i,))
+    return [statement_name(f'SELECT * FROM station WHERE id_station = %s AND {i} = {i}')
+            for i in range(first, first + count)]
+
+
+def test_query_texts_follow_deallocation(monkeypatch):
+    monkeypatch.setattr(data_access, 'MAX_PREPARED', 3)
+    connection = FakeConnection()
+    names = run(connection, 10)
+    assert connection.statements.count('DEALLOCATE') == 7
+    assert [name for name in names if name in prepared_queries] == names[-3:]
+
+
+def test_query_text_kept_while_another_connection_has_it(monkeypatch):
+    monkeypatch.setattr(data_access, 'MAX_PREPARED', 3)
+    first, second = FakeConnection(), FakeConnection()
+    shared = run(first, 1, first=100)[0]
+    run(second, 1, first=100)
+    names = run(first, 3, first=200)  # на першому з'єднанні shared витіснено
+    assert shared in prepared_queries
+    del second
+    gc.collect()
+    assert shared not in prepared_queries
+    assert all(name in prepared_queries for name in names)
+    del first
+    gc.collect()
+    assert not any(name in prepared_queries for name in names)
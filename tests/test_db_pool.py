@@ -0,0 +1,143 @@
+import threading
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+import db_pool
+from db_pool import ConnectionPool, PoolTimeout
+from tests.fakes import fake_connect
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    return fake_connect(monkeypatch)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db_pool.time, 'monotonic', clock)
+    return clock
+
+
+def test_getconn_times_out_when_pool_is_exhausted(opened):
+    pool = ConnectionPool(minconn=1, maxconn=2)
+    first = pool.getconn()
+    pool.getconn()
+    assert len(opened) == 2
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.05)
+    stats = pool.stats()
+    assert (stats['timeouts'], stats['in_use'], stats['size']) == (1, 2, 2)
+    pool.putconn(first)
+    assert pool.getconn(timeout=0.05) is first
+
+
+def test_waiting_checkout_gets_returned_connection(opened):
+    pool = ConnectionPool(minconn=1, maxconn=1)
+    connection = pool.getconn()
+    timer = threading.Timer(0.05, pool.putconn, (connection,))
+    timer.start()
+    assert pool.getconn(timeout=5) is connection
+    timer.join()
+    assert pool.stats()['waits'] == 1
+
+
+def test_idle_connection_is_checked_and_replaced_when_broken(opened, clock):
+    pool = ConnectionPool(minconn=1, maxconn=2, health_check_interval=30)
+    connection = pool.getconn()
+    pool.putconn(connection)
+    clock.now += 10
+    assert pool.getconn() is connection  # недавно повернуте - без перевірки
+    pool.putconn(connection)
+    clock.now += 60
+    assert pool.getconn() is connection  # перевірка SELECT 1 пройшла, транзакцію відкочено
+    assert connection.rollbacks == 1
+    pool.putconn(connection)
+    connection.alive = False
+    clock.now += 60
+    replacement = pool.getconn()
+    assert replacement is opened[1] and connection.closed
+    stats = pool.stats()
+    assert (stats['reconnects'], stats['health_check_failures'], stats['size']) == (1, 1, 1)
+
+
+def test_closed_connection_is_replaced_without_query(opened):
+    pool = ConnectionPool(minconn=1)
+    opened[0].close()
+    assert pool.getconn() is opened[1]
+    assert pool.stats()['reconnects'] == 1
+
+
+def test_connection_returned_after_exception(opened):
+    pool = ConnectionPool(minconn=1, maxconn=1)
+    with pytest.raises(psycopg2.errors.DivisionByZero):
+        with pool.connection() as connection:
+            connection.info.transaction_status = extensions.TRANSACTION_STATUS_INERROR
+            raise psycopg2.errors.DivisionByZero('division by zero')
+    # Зламану транзакцію відкочено, з'єднання знову вільне
+    assert connection.rollbacks == 1
+    assert pool.getconn(timeout=0.05) is connection
+
+
+def test_connection_dropped_after_it_breaks(opened):
+    pool = ConnectionPool(minconn=1, maxconn=1)
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as connection:
+            connection.alive = False
+            connection.close()
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+    assert pool.stats()['size'] == 0
+    assert pool.getconn(timeout=0.05) is opened[1]
+
+
+def test_failed_rollback_discards_connection(opened):
+    pool = ConnectionPool(minconn=1)
+    connection = pool.getconn()
+    connection.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+    connection.alive = False
+    pool.putconn(connection)
+    assert connection.closed and pool.stats()['idle'] == 0
+
+
+def test_failed_connect_releases_reserved_slot(opened, monkeypatch):
+    pool = ConnectionPool(minconn=0, maxconn=1)
+
+    def refuse(**kwargs):
+        raise psycopg2.OperationalError('could not connect to server')
+    monkeypatch.setattr(psycopg2, 'connect', refuse)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.stats()['size'] == 0
+
+
+def test_stats_count_checkouts_and_peak(opened):
+    pool = ConnectionPool(minconn=0, maxconn=4)
+    connections = [pool.getconn() for _ in range(3)]
+    for connection in connections:
+        pool.putconn(connection)
+    pool.putconn(pool.getconn())
+    stats = pool.stats()
+    assert {key: stats[key] for key in ('size', 'max', 'in_use', 'idle', 'peak_in_use', 'checkouts', 'waits')} == {
+        'size': 3, 'max': 4, 'in_use': 0, 'idle': 3, 'peak_in_use': 3, 'checkouts': 4, 'waits': 0}
+    assert "З'єднання: 0/3" in db_pool.format_pool_stats(stats)
+
+
+def test_closeall_rejects_new_checkouts(opened):
+    pool = ConnectionPool(minconn=2)
+    connection = pool.getconn()
+    pool.closeall()
+    assert opened[1].closed or opened[0].closed
+    with pytest.raises(psycopg2.InterfaceError):
+        pool.getconn()
+    pool.putconn(connection)
+    assert all(c.closed for c in opened)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from downsample import lttb, minmax_downsample
+
+
+def noisy_series(n, seed=1):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.uniform(0.5, 1.5, n))
+    return x, np.sin(x / 50) * 10 + rng.normal(0, 1, n)
+
+
+@pytest.mark.parametrize('n, threshold', [(1000, 100), (1000, 3), (57, 10), (10000, 999)])
+def test_lttb_keeps_ends_and_threshold(n, threshold):
+    x, y = noisy_series(n)
+    small_x, small_y = lttb(x, y, threshold)
+    assert len(small_x) == len(small_y) == threshold
+    assert (small_x[0], small_y[0], small_x[-1], small_y[-1]) == (x[0], y[0], x[-1], y[-1])
+    assert np.all(np.diff(small_x) > 0)
+    # Лише точки вихідного ряду
+    assert np.all(np.isin(small_x, x)) and np.array_equal(small_y, y[np.searchsorted(x, small_x)])
+
+
+@pytest.mark.parametrize('threshold', [100, 101, 500, 2])
+def test_lttb_passes_short_input_through(threshold):
+    x, y = noisy_series(100)
+    small_x, small_y = lttb(x, y, threshold)
+    assert small_x is x and small_y is y
+
+
+def test_lttb_keeps_a_single_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[437] = 50.0
+    assert 50.0 in lttb(x, y, 20)[1]
+
+
+@pytest.mark.parametrize('n, buckets', [(1000, 10), (1001, 7), (5000, 100)])
+def test_minmax_keeps_extremes_of_every_bucket(n, buckets):
+    x, y = noisy_series(n)
+    small_x, small_y = minmax_downsample(x, y, buckets)
+    assert len(small_x) <= buckets * 2
+    assert np.all(np.diff(small_x) > 0)
+    assert small_y.max() == y.max() and small_y.min() == y.min()
+    for part in np.array_split(np.arange(n), buckets):
+        assert y[part].max() in small_y and y[part].min() in small_y
+
+
+def test_minmax_passes_short_input_through():
+    x, y = noisy_series(20)
+    small_x, small_y = minmax_downsample(x, y, 10)
+    assert small_x is x and small_y is y
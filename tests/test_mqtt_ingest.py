@@ -0,0 +1,133 @@
+import csv
+import io
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import psycopg2
+import psycopg2.errors
+import pytest
+
+from mqtt_ingest import BatchWriter, IngestMetrics, Ingestor, LocalBroker, MessageMapper, MqttSource, parse_payload
+
+
+class FakeConnection:
+    # Записує рядки, які BatchWriter передає в COPY FROM STDIN
+    def __init__(self, written):
+        self.written = written
+        self.closed = 0
+
+    def cursor(self):
+        return self
+
+    def copy_expert(self, query, buffer):
+        assert query.startswith('COPY measument')
+        self.written.extend(csv.reader(io.StringIO(buffer.read())))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def test_local_broker_to_batch_writer():
+    written = []
+    metrics = IngestMetrics()
+    mapper = MessageMapper(units=[(1, 1, 'PM2.5'), (1, 2, 'PM10'), (2, 1, 'Temp')],
+                           stations=[('SE123', 7), ('SE456', 8)])
+    writer = BatchWriter(lambda: FakeConnection(written), metrics, flush_size=3, flush_interval=0.05)
+    writer.start()
+    ingestor = Ingestor(mapper, writer, metrics)
+    broker = LocalBroker()
+    ingestor.add_source(broker.source(1, 'stations/1/+'))
+
+    broker.publish('stations/1/SE123', b'12.5, 30')
+    broker.publish('stations/1/SE456', '[1, "n/a"]')
+    broker.publish('stations/1/UNKNOWN', '5')
+    broker.publish('stations/2/SE123', '20')  # не відповідає підписці
+    ingestor.stop()
+
+    assert [(int(row[0]), row[2], float(row[3])) for row in written] == [
+        (7, 'PM2.5', 12.5), (7, 'PM10', 30.0), (8, 'PM2.5', 1.0)]
+    snapshot = metrics.snapshot()
+    assert (snapshot['messages'], snapshot['unmapped'], snapshot['rows_written']) == (3, 1, 3)
+    assert not writer.is_alive()
+
+
+def test_mqtt_source_uses_version2_callbacks():
+    mqtt = pytest.importorskip('paho.mqtt.client')
+    received = []
+    source = MqttSource(1, 'mqtt://127.0.0.1:1', topic='stations/#')
+    source.start(lambda *args: received.append(args))
+    try:
+        subscribed = []
+        client = SimpleNamespace(subscribe=lambda topic, qos: subscribed.append((topic, qos)))
+        source.on_connect(client, None, None, mqtt.ReasonCode(mqtt.PacketTypes.CONNACK, identifier=0), None)
+        source.on_client_message(client, None, SimpleNamespace(topic='stations/1/SE123', payload=b'1'))
+    finally:
+        source.stop()
+    assert subscribed == [('stations/#', 1)]
+    assert received == [(1, 'stations/1/SE123', b'1')]
+
+
+class RejectingConnection(FakeConnection):
+    # Як PostgreSQL: помилка в COPY скасовує всю транзакцію, тож рядки видно лише після commit
+    def __init__(self, written, rejected_station, rollback_error=None):
+        super().__init__(written)
+        self.rejected_station = rejected_station
+        self.rollback_error = rollback_error
+        self.pending = []
+        self.rollbacks = 0
+
+    def copy_expert(self, query, buffer):
+        rows = list(csv.reader(io.StringIO(buffer.read())))
+        if any(int(row[0]) == self.rejected_station for row in rows):
+            raise psycopg2.errors.ForeignKeyViolation('station is not present')
+        self.pending.extend(rows)
+
+    def commit(self):
+        self.written.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.pending = []
+        if self.rollback_error is not None:
+            raise self.rollback_error
+
+
+def written_rows(batch_size, rejected_station, rollback_error=None):
+    written = []
+    connections = []
+
+    def connect():
+        connections.append(RejectingConnection(written, rejected_station, rollback_error))
+        return connections[-1]
+
+    metrics = IngestMetrics()
+    writer = BatchWriter(connect, metrics, retry_delays=())
+    batch = [(station, datetime(2024, 1, 1, tzinfo=timezone.utc), 'PM10', float(station))
+             for station in range(batch_size)]
+    return writer.flush(batch), [int(row[0]) for row in written], metrics.snapshot(), connections
+
+
+def test_flush_drops_only_rejected_rows():
+    ok, written, snapshot, connections = written_rows(10, rejected_station=6)
+    assert not ok
+    assert written == [0, 1, 2, 3, 4, 5, 7, 8, 9]
+    assert (snapshot['rows_written'], snapshot['rows_failed']) == (9, 1)
+    assert len(connections) == 1 and connections[0].rollbacks > 0
+
+
+def test_flush_reconnects_when_rollback_fails():
+    ok, written, snapshot, connections = written_rows(
+        4, rejected_station=0, rollback_error=psycopg2.InterfaceError('connection already closed'))
+    assert not ok
+    assert written == [1, 2, 3]
+    assert snapshot['rows_failed'] == 1
+    assert all(connection.closed for connection in connections[:-1])
+
+
+def test_parse_payload_skips_non_finite_values():
+    assert parse_payload('1.5, nan, inf, -Infinity, x') == [1.5, None, None, None, None]
+    assert parse_payload('[NaN, 2, Infinity, null]') == [None, 2.0, None, None]
@@ -0,0 +1,178 @@
+import sqlite3
+
+import pytest
+
+from paging import CTID, KEYSET, OFFSET, KeysetPager
+from tests.fakes import relation, render, use_catalog
+
+STATION = relation('station', {'id_station': 'integer', 'name': 'text', 'city': 'text'}, unique_key=['id_station'])
+PAIR = relation('pair', {'k1': 'integer', 'k2': 'integer', 'value': 'text'}, unique_key=['k1', 'k2'])
+LOG = relation('log', {'logged': 'timestamp', 'message': 'text'})
+REPORT = relation('report', {'name': 'text', 'total': 'integer'}, kind='v')
+
+STATION_ROWS = [(1, 'b', 'x'), (2, None, 'y'), (3, 'a', 'x'), (4, 'b', None), (5, None, 'z'), (6, 'c', 'x')]
+
+
+@pytest.fixture(autouse=True)
+def schema(monkeypatch):
+    use_catalog(monkeypatch, STATION, PAIR, LOG, REPORT)
+
+
+def prepared(table, sort=None, filters=None):
+    pager = KeysetPager(table, sort, filters)
+    pager.prepare(None)
+    return pager
+
+
+def postgres_order(rows, column, descending):
+    # Порядок PostgreSQL за замовчуванням: NULL - найбільше значення (в кінці при зростанні)
+    def key(row):
+        value = row[column]
+        return (value is None, value if value is not None else '', row[0])
+    return sorted(rows, key=key, reverse=descending)
+
+
+def matching_ids(pager, key, reverse=False):
+    # Умову WHERE сторінки виконуємо в SQLite (рядкові порівняння там такі самі)
+    query, params = pager.page_query(100, key=key, reverse=reverse)
+    text = render(query)
+    where = text[text.index(' WHERE ') + 7:text.index(' ORDER BY ')]
+    database = sqlite3.connect(':memory:')
+    database.execute('CREATE TABLE station (id_station, name, city)')
+    database.executemany('INSERT INTO station VALUES (?, ?, ?)', STATION_ROWS)
+    rows = database.execute(f'SELECT id_station FROM station WHERE {where.replace("%s", "?")}', params[:-1])
+    return {row[0] for row in rows}
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('reverse', [False, True])
+def test_nullable_sort_continues_after_every_row(descending, reverse):
+    pager = prepared('station', ('name', descending))
+    assert pager.sort_nullable and pager.key_positions == [1, 0]
+    ordered = postgres_order(STATION_ROWS, 1, descending != reverse)
+    for i, row in enumerate(ordered):
+        key = (row[1], row[0])
+        assert matching_ids(pager, key, reverse) == {r[0] for r in ordered[i + 1:]}, key
+
+
+def test_sort_direction_and_reverse_page_order():
+    query, params = prepared('station', ('name', True)).page_query(50, key=('b', 3), reverse=True)
+    assert render(query).endswith('ORDER BY "name", "id_station" LIMIT %s')
+    assert params == ['b', 'b', 3, 50]
+    query, params = prepared('station').page_query(50, key=(7,), reverse=True)
+    assert render(query) == ('SELECT * FROM "station" AS t WHERE (("id_station") < (%s)) '
+                             'ORDER BY "id_station" DESC LIMIT %s')
+    assert params == [7, 50]
+
+
+def test_composite_key_with_filter():
+    pager = prepared('pair', filters={'value': '= PM10'})
+    assert pager.order_key.kind == KEYSET and pager.key_positions == [0, 1]
+    query, params = pager.page_query(20, key=(1, 2))
+    assert render(query) == ('SELECT * FROM "pair" AS t WHERE ("value" = %s) AND (("k1", "k2") > (%s, %s)) '
+                             'ORDER BY "k1", "k2" LIMIT %s')
+    assert params == ['PM10', 1, 2, 20]
+
+
+def test_ctid_fallback_for_table_without_key():
+    pager = prepared('log', ('logged', False))
+    assert pager.order_key.kind == CTID and pager.key_positions == [0, 2]
+    query, params = pager.page_query(10, key=(None, '(0,3)'))
+    assert render(query) == ('SELECT *, ctid FROM "log" AS t WHERE (("logged" IS NULL AND ("ctid") > (%s::tid))) '
+                             'ORDER BY "logged", "ctid" LIMIT %s')
+    assert params == ['(0,3)', 10]
+
+
+def test_offset_fallback_for_view_without_key():
+    pager = prepared('report', ('total', True))
+    assert pager.order_key.kind == OFFSET and pager.key_positions is None
+    query, params = pager.page_query(10, offset=30)
+    assert render(query) == 'SELECT * FROM "report" AS t ORDER BY "total" DESC, t::text OFFSET %s LIMIT %s'
+    assert params == [30, 10]
+
+
+class FakeConnection:
+    # Відповідає на запити по черзі заготовленими рядками і запам'ятовує текст запитів
+    def __init__(self, columns, *results):
+        self.description = [(c,) for c in columns]
+        self.results = list(results)
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    name = None
+    prepared_statements = False
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = connection.description
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.connection.queries.append((render(query), list(params or [])))
+        self.rows = self.connection.results.pop(0)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+def test_page_after_known_key():
+    connection = FakeConnection(['id_station', 'name', 'city'], [(4, 'b', None), (5, None, 'z')])
+    description, rows, first_key, last_key = prepared('station').fetch_page(connection, 3, 2, after=(3,))
+    assert (rows, first_key, last_key) == ([(4, 'b', None), (5, None, 'z')], (4,), (5,))
+    assert connection.queries == [('SELECT * FROM "station" AS t WHERE (("id_station") > (%s)) '
+                                   'ORDER BY "id_station" LIMIT %s', [3, 2])]
+
+
+def test_page_before_known_key_is_read_backwards():
+    connection = FakeConnection(['id_station', 'name', 'city'], [(3, 'a', 'x'), (2, None, 'y')])
+    _, rows, first_key, last_key = prepared('station').fetch_page(connection, 1, 2, before=(4,))
+    assert (rows, first_key, last_key) == ([(2, None, 'y'), (3, 'a', 'x')], (2,), (3,))
+    assert connection.queries == [('SELECT * FROM "station" AS t WHERE (("id_station") < (%s)) '
+                                   'ORDER BY "id_station" DESC LIMIT %s', [4, 2])]
+
+
+def test_jump_to_row_number_looks_up_key_first():
+    connection = FakeConnection(['id_station', 'name', 'city'], [(1000,)], [(1001, 'a', 'x')])
+    _, rows, first_key, _ = prepared('station').fetch_page(connection, 1000, 1)
+    assert first_key == (1001,)
+    assert connection.queries == [
+        ('SELECT "id_station" FROM "station" AS t ORDER BY "id_station" OFFSET %s LIMIT %s', [999, 1]),
+        ('SELECT * FROM "station" AS t WHERE (("id_station") > (%s)) ORDER BY "id_station" LIMIT %s', [1000, 1])]
+
+
+def test_page_past_the_end_is_empty():
+    connection = FakeConnection(['id_station', 'name', 'city'], [], [])
+    description, rows, first_key, last_key = prepared('station').fetch_page(connection, 100, 50)
+    assert description == [('id_station',), ('name',), ('city',)]
+    assert (rows, first_key, last_key) == ([], None, None)
+    assert connection.queries[-1] == ('SELECT * FROM "station" AS t ORDER BY "id_station" LIMIT %s', [0])
+
+
+def test_ctid_page_hides_ctid_column():
+    connection = FakeConnection(['logged', 'message', 'ctid'], [('t1', 'a', '(0,1)'), ('t2', 'b', '(0,2)')])
+    description, rows, first_key, last_key = prepared('log').fetch_page(connection, 0, 2)
+    assert description == [('logged',), ('message',)]
+    assert rows == [('t1', 'a'), ('t2', 'b')]
+    assert (first_key, last_key) == (('(0,1)',), ('(0,2)',))
+
+
+def test_offset_page_has_no_keys():
+    connection = FakeConnection(['name', 'total'], [('a', 1)])
+    _, rows, first_key, last_key = prepared('report').fetch_page(connection, 20, 10, after=('ignored',))
+    assert (rows, first_key, last_key) == ([('a', 1)], None, None)
+    assert connection.queries[0][1] == [20, 10]
+
+
+def test_fetch_pages_chains_keys_of_neighbours():
+    connection = FakeConnection(['id_station', 'name', 'city'],
+                                [(1, 'b', 'x'), (2, None, 'y')], [(3, 'a', 'x'), (4, 'b', None)], [])
+    pages = list(prepared('station').fetch_pages(connection, [(0, None, None), (1, None, None), (2, None, None)], 2))
+    assert [(page, rows[-1][0] if rows else None) for page, _, rows, _, _ in pages] == [(0, 2), (1, 4), (2, None)]
+    assert [params for _, params in connection.queries] == [[2], [2, 2], [4, 2]]
@@ -0,0 +1,11 @@
+from powerbi_reports import NO_STATUS, summarize_stations
+
+
+def test_station_without_status_is_summarized():
+    rows = [('Київ, 1', 'online', 'PM10'), ('Київ, 1', 'online', 'PM2.5'),
+            ('Львів, 2', None, 'PM10'), ('Одеса, 3', 'offline', None)]
+    table, status_counts, unit_counts = summarize_stations(rows)
+    assert table == [('Київ, 1', 'online', 2, 'PM10, PM2.5'), ('Львів, 2', NO_STATUS, 1, 'PM10'),
+                     ('Одеса, 3', 'offline', 0, '')]
+    assert sorted(status_counts, key=str) == ['offline', 'online', NO_STATUS]
+    assert unit_counts == {'PM10': 2, 'PM2.5': 1}
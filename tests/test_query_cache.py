@@ -0,0 +1,109 @@
+import pytest
+
+import query_cache
+from query_cache import QueryCache, cached_fetch_all, normalize_sql
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, 'monotonic', clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryCache(default_ttl=60)
+    cache.put('default', 1)
+    cache.put('short', 2, ttl=5)
+    cache.put('forever', 3, ttl=None)
+    clock.now += 5
+    assert cache.get('short') == (False, None)
+    assert cache.get('default') == (True, 1)
+    clock.now += 10 ** 6
+    assert cache.get('default') == (False, None)
+    assert cache.get('forever') == (True, 3)
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses'], stats['expirations']) == (1, 2, 2, 2)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == (True, 1)  # тепер найдавніше використаний - b
+    cache.put('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1) and cache.get('c') == (True, 3)
+    cache.put('a', 4)  # повторний put оновлює значення і теж рахується використанням
+    cache.put('d', 5)
+    assert sorted(cache.entries) == ['a', 'd']
+    assert cache.stats()['evictions'] == 2
+
+
+def test_normalize_sql_keeps_quoted_text():
+    assert normalize_sql("  SELECT *\n\tFROM  station\n WHERE name = 'a  b'  ") == \
+        "SELECT * FROM station WHERE name = 'a  b'"
+    assert normalize_sql('SELECT "Вимір  1",  \'it\'\'s  x\'') == 'SELECT "Вимір  1", \'it\'\'s  x\''
+
+
+def test_keys_ignore_layout_but_not_parameters():
+    key = QueryCache.key("SELECT *\n  FROM t WHERE a = %s", [1, [2, 3]])
+    assert key == QueryCache.key("SELECT * FROM t WHERE a = %s", (1, (2, 3)))
+    assert key != QueryCache.key("SELECT * FROM t WHERE a = %s", (2, (2, 3)))
+    assert QueryCache.key('q', {'b': 1, 'a': [2]}) == QueryCache.key('q', {'a': (2,), 'b': 1})
+    hash(QueryCache.key('q', {'a': [1, {'b': [2]}]}))
+
+
+def test_invalidate_by_query_text(clock):
+    cache = QueryCache()
+    cache.put(QueryCache.key('SELECT * FROM station'), 1)
+    cache.put(QueryCache.key('SELECT * FROM measument WHERE id = %s', (1,)), 2)
+    cache.put(QueryCache.key('SELECT * FROM measument WHERE id = %s', (2,)), 3)
+    cache.invalidate(lambda query: 'measument' in query)
+    assert list(cache.entries) == [QueryCache.key('SELECT * FROM station')]
+    cache.invalidate()
+    assert cache.stats()['size'] == 0
+
+
+class FakeCursor:
+    name = None
+    prepared_statements = False
+
+    def __init__(self, executed):
+        self.executed = executed
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return [('row', len(self.executed))]
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self.executed)
+
+
+def test_cached_fetch_all_runs_query_once_per_ttl(clock):
+    cache = QueryCache()
+    connection = FakeConnection()
+    first = cached_fetch_all(connection, 'SELECT 1 WHERE %s', (1,), ttl=10, cache=cache)
+    assert cached_fetch_all(connection, 'SELECT  1\nWHERE %s', [1], ttl=10, cache=cache) is first
+    clock.now += 10
+    assert cached_fetch_all(connection, 'SELECT 1 WHERE %s', (1,), ttl=10, cache=cache) == [('row', 2)]
+    # Інше джерело того самого результату кешується під ключем query
+    rows = cached_fetch_all(connection, 'SELECT 2 WHERE %s', ('a',), cache=cache,
+                            fetch=lambda connection, value: [value])
+    assert rows == ['a'] and cache.get(QueryCache.key('SELECT 2 WHERE %s', ('a',))) == (True, ['a'])
+    assert len(connection.executed) == 2
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+from query_executor import QueryExecutor
+from tests.fakes import FakeConnection
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+class FakePool:
+    maxconn = 4
+
+    def __init__(self, on_getconn=None):
+        self.on_getconn = on_getconn
+        self.opened = []
+        self.returned = []
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        if self.on_getconn is not None:
+            self.on_getconn()
+        with self.lock:
+            self.opened.append(CancellableConnection())
+            return self.opened[-1]
+
+    def putconn(self, connection, discard=False):
+        with self.lock:
+            self.returned.append(connection)
+
+
+class CancellableConnection(FakeConnection):
+    # cancel() перериває запит, який чекає в run_query, як pg_cancel_backend
+    def __init__(self):
+        super().__init__()
+        self.cancel_requested = threading.Event()
+
+    def cancel(self):
+        self.cancel_requested.set()
+
+
+def run_query(connection, started, value):
+    started.set()
+    if connection.cancel_requested.wait(5):
+        raise psycopg2.extensions.QueryCanceledError('canceling statement due to user request')
+    return value
+
+
+def wait_for(app, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def recorder(executor):
+    events = []
+    executor.busy_changed.connect(lambda channel, busy: events.append(('busy', channel, busy)))
+    return events
+
+
+def test_new_query_on_channel_cancels_the_previous_one(app):
+    pool = FakePool()
+    executor = QueryExecutor(pool)
+    events = recorder(executor)
+    first_started = threading.Event()
+    executor.submit('chart', run_query, first_started, 'old',
+                    on_result=lambda result: events.append(('result', result)),
+                    on_error=lambda error: events.append(('error', error)))
+    assert first_started.wait(5)
+    executor.submit('chart', lambda connection: 'new', on_result=lambda result: events.append(('result', result)))
+    wait_for(app, lambda: len(pool.returned) == 2 and not executor.jobs)
+    # Застарілий результат і помилка скасування до віджета не доходять
+    assert [e for e in events if e[0] != 'busy'] == [('result', 'new')]
+    assert pool.opened[0].cancel_requested.is_set() and not pool.opened[1].cancel_requested.is_set()
+    assert not executor.is_busy('chart')
+
+
+def test_cancel_stops_query_on_server(app):
+    pool = FakePool()
+    executor = QueryExecutor(pool)
+    events = recorder(executor)
+    started = threading.Event()
+    executor.submit('table', run_query, started, 'rows', on_result=lambda result: events.append(('result', result)),
+                    on_error=lambda error: events.append(('error', error)))
+    assert started.wait(5)
+    executor.cancel('table')
+    assert events == [('busy', 'table', True), ('busy', 'table', False)]
+    wait_for(app, lambda: not executor.jobs)
+    assert pool.returned[0].cancel_requested.is_set()
+    assert events == [('busy', 'table', True), ('busy', 'table', False)]
+
+
+def test_cancel_while_connection_is_taken_from_pool(app):
+    # Скасування між перевіркою cancelled і тим, як завдання отримало з'єднання
+    calls = []
+
+    def cancel_job():
+        executor.jobs[job_id].cancel()
+    pool = FakePool(on_getconn=cancel_job)
+    executor = QueryExecutor(pool)
+    executor.thread_pool.setMaxThreadCount(1)
+    gate = threading.Event()
+    executor.thread_pool.start(gate.wait)  # завдання стане в чергу, поки ми не знаємо його номер
+    job_id = executor.submit('chart', lambda connection: calls.append(connection),
+                             on_error=lambda error: calls.append(error))
+    gate.set()
+    wait_for(app, lambda: pool.returned and not executor.jobs)
+    assert calls == []
+    assert not pool.returned[0].cancel_requested.is_set()
+
+
+def test_streamed_batches_reach_widget_in_order(app):
+    executor = QueryExecutor(FakePool())
+    batches = []
+    finished = []
+
+    def pages(connection, count):
+        for page in range(count):
+            yield page
+    executor.submit_stream('table', pages, 3, on_batch=batches.append, on_result=finished.append)
+    wait_for(app, lambda: finished)
+    assert batches == [0, 1, 2] and finished == [None]
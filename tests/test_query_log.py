@@ -0,0 +1,15 @@
+import pytest
+
+from query_log import percentile
+
+
+@pytest.mark.parametrize('fraction, expected', [(0.5, 3), (0.95, 6), (0.99, 6), (0.0, 1), (1.0, 6), (1 / 6, 1)])
+def test_percentile_nearest_rank_even_count(fraction, expected):
+    assert percentile([1, 2, 3, 4, 5, 6], fraction) == expected
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert [percentile(values, f) for f in (0.07, 0.5, 0.95, 0.99)] == [7, 50, 95, 99]
+    assert percentile([42], 0.5) == 42
+    assert percentile([], 0.5) == 0.0
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from rollups import DAILY_TABLE, HOURLY_TABLE, SOURCE_VIEW, build_aggregate_query, plan_range, rows_match
+
+UTC = timezone.utc
+WATERMARK = datetime(2024, 1, 10, tzinfo=UTC)
+
+
+def at(day, hour=0, minute=0):
+    return datetime(2024, 1, day, hour, minute, tzinfo=UTC)
+
+
+def test_range_inside_one_hour_is_raw():
+    start, end = at(3, 10, 10), at(3, 10, 50)
+    assert plan_range(start, end, WATERMARK) == {'daily': [], 'hourly': [], 'raw': [(start, end)]}
+
+
+def test_hour_aligned_edges():
+    plan = plan_range(at(3, 10), at(3, 13), WATERMARK)
+    # Кінцева мить включно - з сирих рядків
+    assert plan == {'daily': [], 'hourly': [(at(3, 10), at(3, 13))], 'raw': [(at(3, 13), at(3, 13))]}
+
+
+def test_day_aligned_edges():
+    plan = plan_range(at(1), at(3), WATERMARK)
+    assert plan == {'daily': [(at(1), at(3))], 'hourly': [], 'raw': [(at(3), at(3))]}
+
+
+def test_partial_hours_and_days():
+    plan = plan_range(at(1, 22, 30), at(3, 1, 15), WATERMARK)
+    assert plan == {
+        'daily': [(at(2), at(3))],
+        'hourly': [(at(1, 23), at(2)), (at(3), at(3, 1))],
+        'raw': [(at(1, 22, 30), at(1, 23)), (at(3, 1), at(3, 1, 15))],
+    }
+
+
+def test_range_past_watermark_reads_raw_rows_after_it():
+    watermark = at(2, 5, 30)
+    plan = plan_range(at(1), at(4), watermark)
+    assert plan == {'daily': [(at(1), at(2))], 'hourly': [(at(2), at(2, 5))], 'raw': [(at(2, 5), at(4))]}
+
+
+def test_range_before_any_rollup_or_empty():
+    start, end = at(3), at(4)
+    assert plan_range(start, end, None) == {'daily': [], 'hourly': [], 'raw': [(start, end)]}
+    assert plan_range(end, start, WATERMARK) == {'daily': [], 'hourly': [], 'raw': [(end, start)]}
+
+
+def test_time_zone_offsets_are_planned_in_utc():
+    kyiv = timezone(timedelta(hours=3))
+    plan = plan_range(datetime(2024, 1, 2, tzinfo=kyiv), datetime(2024, 1, 4, 23, 59, 59, tzinfo=kyiv), WATERMARK)
+    assert plan['daily'] == [(at(2), at(4))]
+    assert plan['hourly'] == [(at(1, 21), at(2)), (at(4), at(4, 20))]
+    assert plan['raw'] == [(at(4, 20), datetime(2024, 1, 4, 23, 59, 59, tzinfo=kyiv))]
+
+
+def test_build_aggregate_query_parameters_follow_plan():
+    plan = plan_range(at(1, 22, 30), at(3, 1, 15), WATERMARK)
+    query, params = build_aggregate_query('Київ, 1', plan, '::double precision')
+    assert query.count('%s') == len(params)
+    assert params == ['Київ, 1', at(2), at(3),
+                      'Київ, 1', at(1, 23), at(2), at(3), at(3, 1),
+                      'Київ, 1', at(1, 22, 30), at(1, 23), at(3, 1), at(3, 1, 15)]
+    assert query.index(DAILY_TABLE) < query.index(HOURLY_TABLE) < query.index(SOURCE_VIEW)
+    # Лише останній сирий інтервал включає кінець
+    assert query.count('"Дата" <= %s') == 1 and query.count('"Дата" < %s') == 1
+    assert '::double precision' in query and query.count('SUM(count_value)') == 1
+
+
+def test_build_aggregate_query_raw_only():
+    query, params = build_aggregate_query('a', {'daily': [], 'hourly': [], 'raw': [(at(1), at(2))]})
+    assert params == ['a', at(1), at(2)]
+    assert DAILY_TABLE not in query and HOURLY_TABLE not in query
+    counted, _ = build_aggregate_query('a', plan_range(at(1), at(2), WATERMARK), with_count=True)
+    assert counted.count('SUM(count_value)') == 2
+
+
+def test_rows_match_tolerates_last_digit_of_avg_only():
+    raw = [('PM10', 1.0, 9.0, 0.1 + 0.2, 3)]
+    assert rows_match(raw, [('PM10', 1.0, 9.0, 0.3, Decimal(3))])
+    assert not rows_match(raw, [('PM10', 1.0, 9.0, 0.31, 3)])
+    assert not rows_match(raw, [('PM10', 1.0, 9.5, 0.3, 3)])
+    assert not rows_match(raw, [('PM10', 1.0, 9.0, 0.3, 4)])
+    assert not rows_match(raw, [])
@@ -0,0 +1,61 @@
+from paging import KeysetPager
+from table_export import estimate_rows, select_query
+from tests.fakes import relation, render, use_catalog
+
+CONNECTION = object()  # prepare() бере все з каталогу, до з'єднання не звертається
+
+
+def export_query(pager):
+    return render(select_query(pager.table, pager.export_where(CONNECTION)))
+
+
+def test_export_with_search_uses_text_columns(monkeypatch):
+    use_catalog(monkeypatch, relation('station', {'id_station': 'integer', 'city': 'text',
+                                                  'name_station': 'character varying(100)'}, unique_key=['id_station']))
+    # pager ще не підготовлений (таблиця в переглядачі не встигла завантажитися)
+    query = export_query(KeysetPager('station', search='Київ'))
+    assert query == ('SELECT * FROM "station" AS t WHERE '
+                     """("city" ILIKE '%Київ%' OR "name_station" ILIKE '%Київ%')""")
+
+
+def test_export_with_search_without_text_columns(monkeypatch):
+    use_catalog(monkeypatch, relation('measument', {'id_measument': 'bigint', 'value_meas': 'real'},
+                                      unique_key=['id_measument']))
+    query = export_query(KeysetPager('measument', filters={'value_meas': '> 5'}, search='123'))
+    # Пошук у текстовому поданні рядка посилається на псевдонім t
+    assert query.startswith('SELECT * FROM "measument" AS t WHERE ')
+    assert """(t::text ILIKE '%123%')""" in query
+    assert """("value_meas" > '5')""" in query
+
+
+def test_export_without_conditions(monkeypatch):
+    use_catalog(monkeypatch, relation('station', {'id_station': 'integer'}, unique_key=['id_station']))
+    assert export_query(KeysetPager('station')) == 'SELECT * FROM "station" AS t'
+
+
+class ExplainConnection:
+    # Відповідає на EXPLAIN планом з оцінкою рядків, на запит до pg_class - reltuples усієї таблиці
+    def __init__(self):
+        self.queries = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.queries.append(render(query) if not isinstance(query, str) else query)
+
+    def fetchone(self):
+        if self.queries[-1].startswith('EXPLAIN'):
+            return ('[{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 1234}}]',)
+        return ('r', 5000000.0)
+
+
+def test_filtered_export_estimates_filtered_rows(monkeypatch):
+    use_catalog(monkeypatch, relation('measument', {'id_measument': 'bigint', 'value_meas': 'real'},
+                                      unique_key=['id_measument']))
+    pager = KeysetPager('measument', filters={'value_meas': '> 5'})
+    connection = ExplainConnection()
+    assert estimate_rows(connection, 'measument', pager.export_where(CONNECTION)) == 1234
+    assert connection.queries == [
+        """EXPLAIN (FORMAT JSON) SELECT * FROM "measument" AS t WHERE ("value_meas" > '5')"""]
+    assert estimate_rows(connection, 'measument') == 5000000
@@ -0,0 +1,50 @@
+from table_model import PagedTableModel
+
+DESCRIPTION = [('id', 23)]
+SIZE = 10
+
+
+def rows(start, count):
+    return [(i,) for i in range(start, start + count)]
+
+
+def model_with_estimate(total):
+    model = PagedTableModel(SIZE, max_pages=100)
+    model.set_estimate(total, False)
+    return model
+
+
+def test_short_page_is_exact_end():
+    model = model_with_estimate(1000)
+    model.put_page(3, DESCRIPTION, rows(30, 4), (30,), (33,))
+    assert (model.total, model.exact) == (34, True)
+
+
+def test_empty_page_past_stale_estimate_is_not_exact():
+    model = model_with_estimate(1000)
+    for page in (0, 1, 2, 50):
+        model.put_page(page, DESCRIPTION, rows(page * SIZE, SIZE), (page * SIZE,), (page * SIZE + SIZE - 1,))
+    # Оцінка завищена: сторінка 40 порожня, отже рядків не більше 400, але скільки саме - невідомо
+    model.put_page(40, DESCRIPTION, [])
+    assert (model.total, model.exact, model.end_bound) == (400, False, 400)
+    assert 50 not in model.pages and 50 not in model.page_keys
+    assert set(model.pages) == {0, 1, 2}
+    # Оцінка, що прийде пізніше, не виходить за знайдену межу
+    model.set_estimate(1000, False)
+    assert model.total == 400
+    model.set_estimate(25, True)
+    assert (model.total, model.exact, model.end_bound) == (25, True, None)
+    assert set(model.pages) == {0, 1} and set(model.page_keys) == {0, 1}
+
+
+def test_full_page_at_bound_is_exact_end():
+    model = model_with_estimate(1000)
+    model.put_page(40, DESCRIPTION, [])
+    model.put_page(39, DESCRIPTION, rows(390, SIZE))
+    assert (model.total, model.exact) == (400, True)
+
+
+def test_empty_first_page_is_empty_table():
+    model = model_with_estimate(1000)
+    model.put_page(0, DESCRIPTION, [])
+    assert (model.total, model.exact) == (0, True)
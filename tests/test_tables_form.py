@@ -0,0 +1,6 @@
+from tables_form import translated_table_names
+
+
+def test_untranslated_tables_are_skipped():
+    names = ['measument', 'station', 'station_measurment_rollup_daily', 'station_measurment_rollup_hourly']
+    assert translated_table_names(names) == ['Вимірювання', 'Станція']
@@ -0,0 +1,103 @@
+"""Спільний профіль QtWebEngine і пул переглядачів для вікон звітів.
+
+Раніше кожне вікно створювало власний QWebEngineView зі сторінкою у профілі за
+замовчуванням (тобто без дискового кешу), а кожна сторінка - окремий процес рендерера.
+Тепер усі сторінки працюють в одному іменованому профілі з дисковим HTTP-кешем,
+кількість процесів рендерера обмежена, а вікно бере переглядач з пулу, коли його
+показують, і повертає, коли його закривають.
+
+    from web_views import view_pool
+    view = view_pool.acquire(parent)
+    ...
+    view_pool.release(view)
+"""
+import os
+
+from PyQt5 import sip
+from PyQt5.QtCore import QStandardPaths, QUrl
+from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineProfile, QWebEngineView
+from PyQt5.QtWidgets import QApplication
+
+PROFILE_NAME = 'MonitorAir'
+HTTP_CACHE_SIZE = 100 * 2 ** 20  # байтів
+RENDERER_PROCESS_LIMIT = 2
+MAX_IDLE_VIEWS = 2  # скільки вільних переглядачів тримати напоготові
+
+_profile = None
+
+
+def _limit_renderer_processes():
+    # Chromium читає прапорці під час створення першого профілю, тобто саме тут
+    flags = os.environ.get('QTWEBENGINE_CHROMIUM_FLAGS', '')
+    if '--renderer-process-limit' not in flags:
+        os.environ['QTWEBENGINE_CHROMIUM_FLAGS'] = f"{flags} --renderer-process-limit={RENDERER_PROCESS_LIMIT}".strip()
+
+
+def shared_profile():
+    global _profile
+    if _profile is None:
+        _limit_renderer_processes()
+        app = QApplication.instance()
+        # Іменований профіль не є off-the-record: кеш і сховище лишаються на диску між запусками
+        _profile = QWebEngineProfile(PROFILE_NAME, app)
+        cache_root = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+        if cache_root:
+            _profile.setCachePath(os.path.join(cache_root, 'webengine'))
+        _profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+        _profile.setHttpCacheMaximumSize(HTTP_CACHE_SIZE)
+        # Сторінки мають бути видалені раніше за профіль, інакше Chromium попереджає під час виходу
+        app.aboutToQuit.connect(view_pool.clear)
+    return _profile
+
+
+class ViewPool:
+    def __init__(self, max_idle=MAX_IDLE_VIEWS):
+        self.max_idle = max_idle
+        self.idle = []
+        self.views = []   # усі створені й ще не видалені переглядачі
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, parent=None):
+        if self.idle:
+            view = self.idle.pop()
+            self.reused += 1
+        else:
+            # Профіль - першим: саме він запускає QtWebEngine з потрібними прапорцями
+            profile = shared_profile()
+            view = QWebEngineView()
+            view.setPage(QWebEnginePage(profile, view))
+            self.views.append(view)
+            self.created += 1
+        view.setParent(parent)
+        return view
+
+    def release(self, view):
+        # Від'єднуємо сигнали попереднього власника і звільняємо пам'ять сторінки
+        for signal in (view.loadFinished, view.loadStarted, view.loadProgress):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass
+        view.setParent(None)
+        view.hide()
+        if len(self.idle) < self.max_idle:
+            view.setUrl(QUrl('about:blank'))
+            self.idle.append(view)
+        else:
+            self.views.remove(view)
+            view.deleteLater()
+
+    def clear(self):
+        # Видаляємо одразу, а не через deleteLater: після aboutToQuit цикл подій уже не крутиться
+        for view in self.views:
+            if not sip.isdeleted(view):
+                sip.delete(view)
+        self.views = []
+        self.idle = []
+
+    def stats(self):
+        return {'created': self.created, 'reused': self.reused, 'idle': len(self.idle)}
+
+
+view_pool = ViewPool()